@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+자동 예약 신청(--auto-hold) 종단 확인 + 지연 측정 (가짜 업스트림의 예약 엔드포인트 사용)
+  python bench/bench_autohold.py
+  python bench/bench_autohold.py --latency-ms 30 --facilities 10 --courts 24
+
+  1회차: 스캔 → 규칙에 맞는 예약가능 슬롯을 전부 신청했는지, 가짜 서버 예약 수와 일치하는지
+  2회차: 같은 슬롯을 다시 신청하지 않는지, 신청한 슬롯이 예약완료로 보이는지
+  응답 수신 → 신청 시작(queue) / 신청 완료(total) 지연 분포를 출력. 불일치 시 exit 1.
+"""
+
+import json
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu   # noqa: E402
+
+RULES = """
+[sungnam]
+FAC1 All All
+FAC2 주말 18:00~
+[yongin]
+100001 All All
+기흥구 주말 All
+"""
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _matching(holder, city, entries):
+    key = (lambda e: (e["fac_id"], e["date"], e["court"], e["time"])) if city == "sungnam" \
+        else (lambda e: (e["resve_id"], e["date"], "", e["time"]))
+    return {key(e) for e in entries if holder._match(city, e) is not None}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="자동 예약 신청 종단 확인")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="가짜 서버 평균 응답 지연")
+    ap.add_argument("--facilities", type=int, default=5, help="성남 시설 수")
+    ap.add_argument("--courts", type=int, default=12, help="용인 코트 수")
+    ap.add_argument("--avail-ratio", type=float, default=0.2)
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    sn_srv, sn_state = fu.start_server(fu.FakeConfig(city="sungnam", facilities=args.facilities,
+                                                     latency_ms=args.latency_ms, avail_ratio=args.avail_ratio))
+    yn_srv, yn_state = fu.start_server(fu.FakeConfig(city="yongin", facilities=args.courts,
+                                                     latency_ms=args.latency_ms, avail_ratio=args.avail_ratio))
+    tmp = tempfile.mkdtemp(prefix="autohold-")
+    os.environ.update(TCM_SN_BASE_URL=f"http://127.0.0.1:{sn_srv.server_address[1]}",
+                      TCM_YN_BASE_URL=f"http://127.0.0.1:{yn_srv.server_address[1]}/publicsports",
+                      TCM_STATE_DIR=tmp, idSungnam1="bench", pwdSungnam1="bench",
+                      idYongin1="bench", pwdYongin1="bench",
+                      # 가짜 서버의 예약 엔드포인트/폼 필드 (실제 사이트는 기본값 없음 — 직접 확인해 지정해야 함).
+                      # 가짜 서버는 이 필드를 받도록 만든 것이라 실제 신청 프로토콜을 검증하지 않는다
+                      TCM_SN_BOOK_PATH="rest_reservation.do",
+                      TCM_SN_BOOK_FIELDS=json.dumps({"facId": "{fac_id}", "resdate": "{resdate}",
+                                                     "court": "{court_no}", "time": "{time}"}),
+                      TCM_YN_BOOK_PATH="sports/insertFcltyRceptResveApply.do",
+                      TCM_YN_BOOK_FIELDS=json.dumps({"resveId": "{resve_id}", "dateVal": "{date_val}",
+                                                     "useTm": "{time}"}))
+    import tennis_court_monitor_all as tcm
+    tcm.SN_REQUEST_GAP = 0
+    tcm.YN_PAGE_GAP    = 0
+    tcm.NOTIFY_TABLE   = os.path.join(tmp, "__no_notify_table__")
+    tcm._upstream_cache.ttl = 0   # 2회차가 신청 전 응답을 재사용하지 않도록
+    table = os.path.join(tmp, "AutoHoldTable.txt")
+    with open(table, "w", encoding="utf-8") as f:
+        f.write(RULES)
+
+    holder = tcm.AutoHolder(tcm.load_autohold_table(table), path=os.path.join(tmp, "autohold.json"),
+                            max_wins=10 ** 6)   # 한도 없이 전부 신청해 정확성 확인
+    holder.drain()   # 세션 미리 로그인
+    tcm._autohold = holder
+    accounts   = [{"username": "bench", "password": "bench"}]
+    facilities = [{"id": f"FAC{i}", "name": f"시설{i}", "weekday_times": ["ALL"], "weekend_times": ["ALL"]}
+                  for i in range(1, args.facilities + 1)]
+
+    failed = []
+    t0 = time.perf_counter()
+    sn_avail, sn_courts = tcm.sn_run_once(accounts, facilities)
+    yn_avail, yn_courts, _ = tcm.yn_run_once()
+    holder.drain()
+    wall = time.perf_counter() - t0
+
+    expected = {("sungnam",) + k for k in _matching(holder, "sungnam", [c for c in sn_courts if c["is_available"]])}
+    expected |= {("yongin",) + k for k in _matching(holder, "yongin", yn_avail)}
+    history  = list(holder.history)
+    tried    = {(h["city"], h["target"], h["date"], h["court"], h["time"]) for h in history}
+    booked   = sn_state.stats["bookings"] + yn_state.stats["bookings"]
+    n_ok     = sum(h["ok"] for h in history)
+    print(f"1회차: 규칙에 맞는 예약가능 {len(expected)}건, 신청 {len(history)}건, 성공 {n_ok}건, "
+          f"가짜 서버 예약 {booked}건 ({wall:.2f}초)")
+    if tried != expected:
+        failed.append(f"신청 대상 불일치: 누락 {len(expected - tried)}, 초과 {len(tried - expected)}")
+    if n_ok != len(history) or booked != n_ok:   # 경쟁자가 없으므로 전부 성공해야 함
+        failed.append(f"성공/예약 수 불일치: 신청 {len(history)}, 성공 {n_ok}, 서버 {booked}")
+
+    sn_avail2, sn_courts2 = tcm.sn_run_once(accounts, facilities)
+    _, yn_courts2, _ = tcm.yn_run_once()
+    holder.drain()
+    still = {("sungnam", c["fac_id"], c["date"], c["court"], c["time"]) for c in sn_courts2 if c["is_available"]}
+    still |= {("yongin", c["resve_id"], c["date"], "", c["time"]) for c in yn_courts2 if c["is_available"]}
+    print(f"2회차: 추가 신청 {len(holder.history) - len(history)}건, 신청한 슬롯 중 아직 예약가능 {len(still & tried)}건")
+    if len(holder.history) != len(history):
+        failed.append("같은 슬롯 재신청")
+    if still & tried:
+        failed.append("신청 성공한 슬롯이 여전히 예약가능으로 보임")
+
+    queue_ms = [h["queue_ms"] for h in history]
+    total_ms = [h["total_ms"] for h in history]
+    if history:
+        print(f"\n{'':18} {'p50':>8} {'p95':>8} {'max':>8}")
+        print(f"{'응답→신청 시작 ms':18} {statistics.median(queue_ms):>8.2f} {_pct(queue_ms, 0.95):>8.2f} "
+              f"{max(queue_ms):>8.2f}")
+        print(f"{'응답→신청 완료 ms':18} {statistics.median(total_ms):>8.1f} {_pct(total_ms, 0.95):>8.1f} "
+              f"{max(total_ms):>8.1f}   (서버 지연 {args.latency_ms:g}ms)")
+        for city in ("sungnam", "yongin"):
+            first = min((h for h in history if h["city"] == city), key=lambda h: h["at"], default=None)
+            if first:   # 대기열 없이 처리된 첫 신청 = 실제 반응 시간
+                print(f"  {city} 첫 신청: 응답 후 {first['queue_ms']}ms 에 시작, {first['total_ms']}ms 에 완료")
+    if failed:
+        print("\n❌ " + " / ".join(failed))
+        sys.exit(1)
+    print("\n✅ 자동 예약 신청 확인 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+콜드 스타트 벤치마크: 모니터 프로세스 실행 → 도시별 첫 스냅샷이 /api/<city> 에 보이기까지 시간
+  python bench/bench_coldstart.py
+  python bench/bench_coldstart.py --latency-ms 80 --runs 5 --scanner-procs
+
+  가짜 업스트림 2개를 띄우고, 빈 상태 디렉터리로 모니터를 매번 새로 실행해
+  /api/sungnam, /api/yongin 의 last_update 가 처음 채워지는 시점을 50ms 간격으로 확인.
+  모듈 import 시간도 함께 출력. 모니터 버전에 상관없이 바깥에서 재므로 변경 전/후 비교에 사용.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu   # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as r:
+            return json.loads(r.read())
+    except (OSError, ValueError):
+        return None
+
+
+def import_seconds():
+    out = subprocess.run([sys.executable, "-c",
+                          "import time; t = time.perf_counter(); import tennis_court_monitor_all; "
+                          "print(time.perf_counter() - t)"],
+                         cwd=_ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def run_once(env, args):
+    port = _free_port()
+    cmd  = [sys.executable, os.path.join(_ROOT, "tennis_court_monitor_all.py"), "--port", str(port)]
+    if args.scanner_procs:
+        cmd.append("--scanner-procs")
+    t0   = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = {}
+    try:
+        while len(first) < 2 and time.perf_counter() - t0 < args.timeout:
+            for city in ("sungnam", "yongin"):
+                if city in first:
+                    continue
+                d = _get(f"http://127.0.0.1:{port}/api/{city}")
+                if d and d.get("last_update") and not d.get("stale"):
+                    first[city] = time.perf_counter() - t0
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return first
+
+
+def main():
+    ap = argparse.ArgumentParser(description="시작 → 첫 스냅샷 시간 측정")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="가짜 서버 평균 응답 지연")
+    ap.add_argument("--facilities", type=int, default=5, help="성남 시설 수")
+    ap.add_argument("--courts", type=int, default=24, help="용인 코트 수")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--scanner-procs", action="store_true", help="--scanner-procs 로 실행")
+    args = ap.parse_args()
+
+    sn_srv, _ = fu.start_server(fu.FakeConfig(city="sungnam", facilities=args.facilities,
+                                              latency_ms=args.latency_ms))
+    yn_srv, _ = fu.start_server(fu.FakeConfig(city="yongin", facilities=args.courts,
+                                              latency_ms=args.latency_ms))
+    tmp  = tempfile.mkdtemp(prefix="coldstart-")
+    env  = dict(os.environ,
+                TCM_SN_BASE_URL=f"http://127.0.0.1:{sn_srv.server_address[1]}",
+                TCM_YN_BASE_URL=f"http://127.0.0.1:{yn_srv.server_address[1]}/publicsports",
+                idSungnam1="bench", pwdSungnam1="bench",
+                idYongin1="bench", pwdYongin1="bench", idYongin2="bench2", pwdYongin2="bench2")
+
+    imp = import_seconds()
+    print(f"모듈 import: {imp * 1000:.0f}ms   (서버 지연 {args.latency_ms:g}ms, "
+          f"성남 {args.facilities}시설, 용인 {args.courts}코트)")
+    results = {"sungnam": [], "yongin": []}
+    for i in range(args.runs):
+        state = os.path.join(tmp, f"run{i}")
+        first = run_once(dict(env, TCM_STATE_DIR=state), args)
+        for city in results:
+            if city in first:
+                results[city].append(first[city])
+        print(f"  run {i + 1}: " + "  ".join(f"{c} {first[c]:.2f}s" if c in first else f"{c} -"
+                                           for c in results), flush=True)
+
+    print(f"\n{'city':8} {'median':>8} {'min':>8} {'max':>8}")
+    for city, vals in results.items():
+        if vals:
+            print(f"{city:8} {statistics.median(vals):>7.2f}s {min(vals):>7.2f}s {max(vals):>7.2f}s")
+    print("\n(모니터 내부 값은 /metrics 의 tcm_first_snapshot_seconds)")
+
+
+if __name__ == "__main__":
+    main()
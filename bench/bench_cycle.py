@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sn_run_once / yn_run_once 종단 벤치마크 (가짜 업스트림 사용, 실제 사이트 접속 없음)
+  python bench/bench_cycle.py --city all --sizes 10,100,1000
+  python bench/bench_cycle.py --city yongin --sizes 100 --latency-ms 30 --out after.json --compare before.json
+  python bench/bench_cycle.py --city yongin --replay capture.ndjson.gz   # 실제 기록 페이로드로 측정
+
+  측정 항목: 회차 wall time, 초당 요청 수, CPU 시간, 최대 RSS, 업스트림 요청/바이트 수
+  각 (도시, 규모) 는 새 프로세스에서 측정하므로 RSS/CPU 가 서로 섞이지 않음.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _fake_stats(port):
+    import urllib.request
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/__stats", timeout=5) as r:
+        return json.loads(r.read())
+
+
+def run_child(args):
+    """측정 프로세스: 모니터 모듈을 가짜 업스트림에 연결해 1회 실행"""
+    import logging
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    sys.path.insert(0, _ROOT)
+    import tennis_court_monitor_all as tcm
+
+    if not args.keep_gaps:
+        tcm.SN_REQUEST_GAP = 0
+        tcm.YN_PAGE_GAP    = 0
+    tcm.NOTIFY_TABLE = os.path.join(_HERE, "__no_notify_table__")   # 구/시간 필터 없이 전체 스캔
+
+    if args.replay:
+        tcm._transport_adapter = tcm.ReplayAdapter(args.replay, args.replay_timing)
+        fac_ids = sorted({dict(tcm.parse_qsl(e["request"]["postData"])).get("facId")
+                          for e in tcm._transport_adapter.entries
+                          if e["request"]["url"].endswith("/otherTimetable.do")})
+    else:
+        fac_ids = [f"FAC{i}" for i in range(1, args.size + 1)]
+
+    before = _fake_stats(args.port) if not args.replay else None
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    if args.city == "sungnam":
+        facilities = [{"id": fid, "name": fid, "weekday_times": ["ALL"],
+                       "weekend_times": ["ALL"]} for fid in fac_ids]
+        avail, courts = tcm.sn_run_once([{"username": "bench", "password": "bench"}], facilities)
+    else:
+        avail, courts, _ = tcm.yn_run_once()
+    wall = time.perf_counter() - t0
+    cpu  = time.process_time() - cpu0
+    if args.replay:
+        reqs     = tcm._transport_adapter.served
+        bytes_in = None
+        errors   = tcm._transport_adapter.misses   # archive 에 없는 요청
+    else:
+        after    = _fake_stats(args.port)
+        reqs     = after["requests"] - before["requests"] - 1   # 직전 /__stats 호출 제외
+        bytes_in = after["bytes_out"] - before["bytes_out"]
+        errors   = after["errors"] - before["errors"]
+
+    print(json.dumps({
+        "city":         args.city,
+        "size":         args.size,
+        "wall_s":       round(wall, 3),
+        "cpu_s":        round(cpu, 3),
+        "req_per_s":    round(reqs / wall, 1) if wall else 0,
+        "requests":     reqs,
+        "bytes_in":     bytes_in,
+        "errors":       errors,
+        "peak_rss_mb":  _peak_rss_mb(),
+        "available":    len(avail),
+        "slots":        len(courts),
+    }))
+
+
+def measure_replay(city, args):
+    env = dict(os.environ, idYongin1="replay", pwdYongin1="replay")
+    cmd = [sys.executable, os.path.abspath(__file__), "--_child", "--city", city, "--size", "0",
+           "--replay", args.replay, "--replay-timing", args.replay_timing]
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(city, size, args):
+    if args.replay:
+        return measure_replay(city, args)
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(_HERE, "fake_upstream.py"), "--city", city,
+         "--facilities", str(size), "--latency-ms", str(args.latency_ms),
+         "--error-rate", str(args.error_rate), "--session-ttl", str(args.session_ttl)],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        port = json.loads(fake.stdout.readline())["port"]
+        env  = dict(os.environ,
+                    TCM_SN_BASE_URL=f"http://127.0.0.1:{port}",
+                    TCM_YN_BASE_URL=f"http://127.0.0.1:{port}/publicsports",
+                    idYongin1="bench", pwdYongin1="bench")
+        cmd = [sys.executable, os.path.abspath(__file__), "--_child", "--city", city,
+               "--size", str(size), "--port", str(port)]
+        if args.keep_gaps:
+            cmd.append("--keep-gaps")
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    ap = argparse.ArgumentParser(description="성남/용인 1회차 종단 벤치마크")
+    ap.add_argument("--city", choices=["sungnam", "yongin", "all"], default="all")
+    ap.add_argument("--sizes", default="10,100,1000", help="시설/코트 수 목록 (쉼표 구분)")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--session-ttl", type=float, default=0.0)
+    ap.add_argument("--keep-gaps", action="store_true", help="요청 간 대기(SN_REQUEST_GAP 등) 유지")
+    ap.add_argument("--replay", help="가짜 서버 대신 기록된 archive(--record) 로 재생")
+    ap.add_argument("--replay-timing", choices=["fast", "recorded"], default="fast")
+    ap.add_argument("--out", help="결과 JSON 저장 경로")
+    ap.add_argument("--compare", help="이전 결과 JSON 과 비교")
+    ap.add_argument("--_child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    ap.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._child:
+        return run_child(args)
+
+    cities  = ["sungnam", "yongin"] if args.city == "all" else [args.city]
+    sizes   = [int(x) for x in args.sizes.split(",") if x] if not args.replay else [0]
+    results = []
+    print(f"{'city':8} {'size':>6} {'wall_s':>8} {'cpu_s':>7} {'req/s':>8} {'reqs':>7} {'rss_mb':>7}")
+    for city in cities:
+        for size in sizes:
+            r = measure(city, size, args)
+            results.append(r)
+            print(f"{r['city']:8} {r['size']:>6} {r['wall_s']:>8} {r['cpu_s']:>7} "
+                  f"{r['req_per_s']:>8} {r['requests']:>7} {r['peak_rss_mb']!s:>7}", flush=True)
+
+    report = {"rev": _git_rev(), "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "params": {"latency_ms": args.latency_ms, "error_rate": args.error_rate,
+                         "session_ttl": args.session_ttl, "keep_gaps": args.keep_gaps},
+              "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = {(r["city"], r["size"]): r for r in json.load(f)["results"]}
+        print("\n비교 (이전 → 현재)")
+        for r in results:
+            b = base.get((r["city"], r["size"]))
+            if not b:
+                continue
+            for k in ("wall_s", "cpu_s", "req_per_s", "peak_rss_mb"):
+                if b.get(k) and r.get(k) is not None:
+                    print(f"  {r['city']:8} {r['size']:>6} {k:12} {b[k]:>9} → {r[k]:>9} "
+                          f"({(r[k] - b[k]) / b[k] * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로깅 파이프라인 측정: 호출한 스레드가 로그 1줄에 쓰는 시간 (이전 동기 FileHandler ↔ 큐 + 리스너)
+  python bench/bench_logging.py
+  python bench/bench_logging.py --lines 50000 --slow-disk-ms 2
+
+  --slow-disk-ms: 파일 쓰기마다 지연을 넣어 느린 디스크를 흉내 (동기 방식은 스캔 스레드가 그대로 기다림).
+  꺼진 핫패스 로그(_log_sn.debug) 비용과, 작은 크기로 회전시켜 .gz 압축/보관 수/JSON 형식도 확인. 실패 시 exit 1.
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import tennis_court_monitor_all as tcm   # noqa: E402
+
+
+class _SlowFile(logging.FileHandler):
+    delay_s = 0.0
+
+    def emit(self, record):
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().emit(record)
+
+
+def _reset_root():
+    root = logging.getLogger()
+    tcm.stop_logging()
+    for h in root.handlers:
+        h.close()
+    root.handlers[:] = []
+
+
+def _per_call_us(n):
+    lat = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        logging.info(f"[SN] 시설{i % 10} 2026-10-{i % 28 + 1:02d}: 예약가능 {i % 7}개")
+        lat.append((time.perf_counter() - t0) * 1e6)
+    lat.sort()
+    return statistics.mean(lat), lat[int(0.99 * (len(lat) - 1))]
+
+
+def run_sync(tmp, n, delay):
+    """이전 setup_logging: basicConfig(FileHandler + StreamHandler), 호출한 스레드에서 바로 기록"""
+    _reset_root()
+    _SlowFile.delay_s = delay
+    fh = _SlowFile(os.path.join(tmp, "sync.log"), encoding="utf-8")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s",
+                        handlers=[fh, logging.StreamHandler()], force=True)
+    t0 = time.perf_counter()
+    mean, p99 = _per_call_us(n)
+    return mean, p99, time.perf_counter() - t0
+
+
+def run_queue(tmp, n, delay):
+    _reset_root()
+    tcm.LOG_DIR, tcm.LOG_ROTATE, tcm.LOG_LEVELS = tmp, "0", ""
+    tcm.setup_logging("queue")
+    fh = tcm._log_listener.handlers[0]
+    orig = fh.emit
+
+    def slow_emit(record):
+        if delay:
+            time.sleep(delay)
+        orig(record)
+    fh.emit = slow_emit
+    t0 = time.perf_counter()
+    mean, p99 = _per_call_us(n)
+    call_s = time.perf_counter() - t0
+    tcm.stop_logging()                # 남은 레코드를 다 쓸 때까지 대기
+    return mean, p99, call_s
+
+
+def hot_path_ns(n):
+    """시설·코트마다 찍던 로그: 이전(f-string + logging.info, INFO 켜짐) ↔ 지금(_log_sn.debug, 꺼짐)"""
+    _reset_root()
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()], force=True)
+    tcm._log_sn.setLevel(logging.INFO)
+    name, day, k = "탄천 테니스장", "2026-10-20", 3
+    t0 = time.perf_counter()
+    for _ in range(n):
+        logging.info(f"[SN] {name} {day}: 예약가능 {k}개")
+    old = (time.perf_counter() - t0) / n * 1e9
+    t0 = time.perf_counter()
+    for _ in range(n):
+        tcm._log_sn.debug("[SN] %s %s: 예약가능 %d개", name, day, k)
+    new = (time.perf_counter() - t0) / n * 1e9
+    return old, new
+
+
+def check_rotation(tmp):
+    d = os.path.join(tmp, "rot")
+    _reset_root()
+    tcm.LOG_DIR, tcm.LOG_ROTATE, tcm.LOG_BACKUPS = d, "0.05MB", 3
+    tcm.LOG_LEVELS, tcm.LOG_FORMAT = "SN=DEBUG", "json"
+    tcm.setup_logging()
+    sched = tcm.CycleScheduler("sungnam", 90)
+    sched.begin()
+    for i in range(3000):
+        tcm._log_sn.debug("[SN] 시설%d: 예약가능 %d개", i, i % 5)
+    # 회차 루프가 아닌 스레드(재스캔·핫 워치 등)의 로그에는 회차 ID 가 붙지 않아야 함
+    other = threading.Thread(target=lambda: logging.info("[SN] 다른 스레드"), name="rescan-sungnam")
+    other.start()
+    other.join()
+    try:
+        raise RuntimeError("테스트 예외")
+    except RuntimeError:
+        logging.exception("[YN] 예외 기록 확인")
+    tcm.stop_logging()
+    _reset_root()
+
+    failed = []
+    gz = sorted(glob.glob(os.path.join(d, "all.log.*.gz")))
+    if not gz or len(gz) > 3:
+        failed.append(f"회전 파일 수 {len(gz)} (1~3 이어야 함)")
+    for path in gz:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            f.readline()
+    with open(os.path.join(d, "all.log"), encoding="utf-8") as f:
+        docs = [json.loads(line) for line in f]
+    if not all(doc["component"] == "SN" and doc["cycle"] == "sn-1" for doc in docs[:-2]):
+        failed.append("component/cycle 필드 누락")
+    if docs[-2]["cycle"] != "":
+        failed.append(f"회차 루프가 아닌 스레드에 회차 ID: {docs[-2]['cycle']!r}")
+    if docs[-1]["component"] != "YN" or "테스트 예외" not in docs[-1].get("exc", ""):
+        failed.append("예외 기록 누락")
+    print(f"\n회전: 50KB 단위, 보관 3개 → .gz {len(gz)}개, 현재 파일 {len(docs)}줄 (JSON)")
+    print(f"  예: {json.dumps(docs[0], ensure_ascii=False)}")
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="로깅 파이프라인 측정")
+    ap.add_argument("--lines", type=int, default=20000)
+    ap.add_argument("--slow-disk-ms", type=float, default=1.0, help="느린 디스크 흉내: 파일 쓰기마다 지연")
+    args = ap.parse_args()
+
+    tmp    = tempfile.mkdtemp(prefix="logbench-")
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")   # 콘솔 출력은 버림 (StreamHandler 는 생성 시 sys.stderr 를 잡음)
+    try:
+        rows = []
+        for delay_ms in (0.0, args.slow_disk_ms):
+            n = args.lines if not delay_ms else min(args.lines, 2000)
+            rows.append(("동기", delay_ms, n) + run_sync(tmp, n, delay_ms / 1000))
+            rows.append(("큐", delay_ms, n) + run_queue(tmp, n, delay_ms / 1000))
+        old_ns, new_ns = hot_path_ns(200000)
+        failed = check_rotation(tmp)
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    print(f"\n{'방식':4} {'디스크 지연':>10} {'줄 수':>6} {'호출 평균 µs':>12} {'호출 p99 µs':>12} {'호출 스레드 총 s':>15}")
+    for name, delay_ms, n, mean, p99, total in rows:
+        print(f"{name:4} {delay_ms:>8g}ms {n:>6} {mean:>12.1f} {p99:>12.1f} {total:>15.3f}")
+    print(f"\n꺼진 핫패스 로그: 이전 f-string + logging.info {old_ns:.0f}ns → _log_sn.debug {new_ns:.0f}ns")
+    if failed:
+        print("\n❌ " + " / ".join(failed))
+        sys.exit(1)
+    print("\n✅ 회전/압축/JSON 확인 완료")
+
+
+if __name__ == "__main__":
+    main()
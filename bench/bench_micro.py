@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+파서/규칙 엔진 마이크로벤치마크 + 회귀 게이트
+  python bench/bench_micro.py                 # 측정만
+  python bench/bench_micro.py --save          # 기준선 저장 (bench/micro_baseline.json)
+  python bench/bench_micro.py --check         # 기준선 대비 --threshold 이상 느려지면 exit 1 (기준선 없으면 exit 2)
+  python bench/bench_micro.py -k yn_          # 이름 필터
+
+  픽스처: 성남 8코트 타임테이블 HTML, 용인 31일 × 60코트 한 달치 슬롯 등 실제 규모.
+  기준선은 머신마다 다르므로 저장소에 넣지 않음(.gitignore) — 비교할 두 커밋을 같은 머신에서 차례로
+  --save (기준 커밋) → --check (새 커밋) 로 잴 것.
+"""
+
+import os
+import sys
+import json
+import timeit
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import tennis_court_monitor_all as tcm   # noqa: E402
+import fake_upstream as fu               # noqa: E402
+
+BASELINE = os.path.join(_HERE, "micro_baseline.json")
+
+
+# ─────────────────────────────────────────────────────────
+# 픽스처
+# ─────────────────────────────────────────────────────────
+def build_fixtures():
+    cfg   = fu.FakeConfig(courts_per_facility=8, avail_ratio=0.2, open_days=62)
+    today = datetime.now(tcm.KST)
+
+    sn_html = fu.sn_timetable_html(cfg, "FAC26", today.strftime("%Y-%m-%d"))
+    _, sn_slots = tcm.sn_parse_timetable(sn_html)
+    sn_rules = ["~09:00", "18:00~", "19:00 ~ 20:50"]
+
+    # 성남 4일 × 10시설 예약가능 목록 (알림 메시지/키용)
+    sn_avail = []
+    for d in range(4):
+        date = today + timedelta(days=d)
+        for f in range(10):
+            html = fu.sn_timetable_html(cfg, f"FAC{f}", date.strftime("%Y-%m-%d"))
+            for s in tcm.sn_parse_timetable(html)[0]:
+                sn_avail.append({"date": date.strftime("%Y-%m-%d"), "day_of_week": tcm._DOW_KO[date.weekday()],
+                                 "facility_name": f"시설{f}", "fac_id": f"FAC{f}",
+                                 "court": s["court"], "time": s["time"]})
+
+    # 용인 31일 × 60코트 한 달
+    courts  = [{"resve_id": str(100000 + i), "name": f"[유료] 테니스장 {i}번_코트",
+                "location": f"용인시 {fu.YN_GUS[i % 3]}"} for i in range(60)]
+    results = []
+    for c in courts:
+        for d in range(31):
+            raw = fu.yn_time_json(cfg, c["resve_id"], (today + timedelta(days=d)).strftime("%Y%m%d"))
+            results.append((c, {
+                "date_str":    raw["formatedDate"],
+                "day_of_week": raw["formatedDay"] + "요일",
+                "available":   [{"time": s["timeContent"]} for s in raw["resveTmList"]],
+                "all":         [{"time": s["useTm"], "status": s["rsvctmStts"],
+                                 "name": s["frstRegisterNmApply"]} for s in raw["fcltRceptRsvctmTime"]],
+            }))
+    yn_month = [e for c, r in results for e in tcm.yn_merge_slots(c, r)]
+    yn_avail = [e for e in yn_month if e["is_available"]]
+    yn_table = {"기흥구": {"weekday": ["~08:00", "18:00~"], "weekend_all": True},
+                "수지구": {"weekday": ["19:00~"], "weekend_all": True}}
+    from bench_yn_list import site_page
+    return {"sn_html": sn_html, "sn_slots": sn_slots, "sn_rules": sn_rules, "sn_avail": sn_avail,
+            "yn_results": results, "yn_month": yn_month, "yn_avail": yn_avail, "yn_table": yn_table,
+            "yn_list_html": site_page(8)}
+
+
+def build_cases(fx):
+    """이름 → (설명, 호출 가능 객체)"""
+    def sn_time_match_all():
+        for s in fx["sn_slots"]:
+            for r in fx["sn_rules"]:
+                tcm.sn_time_match(s["time"], r)
+
+    def yn_merge_month():
+        for c, r in fx["yn_results"]:
+            tcm.yn_merge_slots(c, r)
+
+    def yn_filter_month():
+        table = fx["yn_table"]
+        for e in fx["yn_month"]:
+            tcm.yn_passes_filter(e, table)
+
+    return {
+        "sn_parse_timetable":  (f"8코트 HTML {len(fx['sn_html']) // 1024}KB",
+                                lambda: tcm.sn_parse_timetable(fx["sn_html"])),
+        "sn_time_match":       (f"{len(fx['sn_slots'])}슬롯 × {len(fx['sn_rules'])}규칙", sn_time_match_all),
+        "yn_merge_slots":      (f"31일 × 60코트 ({len(fx['yn_results'])}회)", yn_merge_month),
+        "yn_passes_filter":    (f"한 달 {len(fx['yn_month'])}슬롯", yn_filter_month),
+        "yn_parse_court_list": (f"목록 페이지 8항목 {len(fx['yn_list_html']) // 1024}KB",
+                                lambda: tcm.yn_parse_court_list(fx["yn_list_html"])),
+        "courts_key_sn":       (f"{len(fx['sn_avail'])}슬롯", lambda: tcm._courts_key(fx["sn_avail"])),
+        "courts_key_yn":       (f"{len(fx['yn_avail'])}슬롯", lambda: tcm._courts_key(fx["yn_avail"])),
+        "sn_build_msg":        (f"{len(fx['sn_avail'])}슬롯", lambda: tcm._sn_build_msg(fx["sn_avail"])),
+        "yn_build_msg":        (f"{len(fx['yn_avail'])}슬롯", lambda: tcm._yn_build_msg(fx["yn_avail"])),
+    }
+
+
+def measure(fn, repeat=7, min_time=0.2):
+    """autorange 로 반복 횟수를 정한 뒤 repeat 번 측정 → 1회 호출당 (median, min) 초"""
+    timer     = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number    = max(1, int(number * min_time / 0.2))
+    runs      = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return statistics.median(runs), min(runs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="파서/규칙 엔진 마이크로벤치마크")
+    ap.add_argument("-k", default="", help="이름에 포함된 항목만 실행")
+    ap.add_argument("--save", action="store_true", help="현재 결과를 기준선으로 저장")
+    ap.add_argument("--check", action="store_true", help="기준선 대비 회귀 시 exit 1")
+    ap.add_argument("--threshold", type=float, default=0.20, help="허용 회귀 비율 (기본 0.20 = 20%%)")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--repeat", type=int, default=7)
+    args = ap.parse_args()
+
+    cases = {k: v for k, v in build_cases(build_fixtures()).items() if args.k in k}
+    base  = {}
+    if args.check:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                base = json.load(f)["results"]
+        except FileNotFoundError:
+            print(f"❌ 기준선 없음: {args.baseline}\n"
+                  f"   기준 커밋에서 먼저 `python bench/bench_micro.py --save` 를 실행하세요 (기준선은 머신별, 저장소에 없음)",
+                  file=sys.stderr)
+            sys.exit(2)
+        except (ValueError, KeyError) as e:
+            print(f"❌ 기준선 형식 오류: {args.baseline} ({e})", file=sys.stderr)
+            sys.exit(2)
+        missing = [k for k in cases if k not in base]
+        if missing:
+            print(f"⚠️ 기준선에 없는 항목 (비교 안 함): {', '.join(missing)}", file=sys.stderr)
+
+    results, failed = {}, []
+    print(f"{'name':20} {'median':>11} {'min':>11}  {'vs base':>8}  fixture")
+    for name, (desc, fn) in cases.items():
+        med, mn = measure(fn, repeat=args.repeat)
+        results[name] = {"median_s": med, "min_s": mn}
+        delta = ""
+        if name in base:
+            ratio = med / base[name]["median_s"] - 1
+            delta = f"{ratio * 100:+.1f}%"
+            if ratio > args.threshold:
+                failed.append(name)
+                delta += " ✗"
+        print(f"{name:20} {med * 1e6:>9.1f}µs {mn * 1e6:>9.1f}µs  {delta:>8}  {desc}", flush=True)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"when": datetime.now().isoformat(timespec="seconds"),
+                       "python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\n기준선 저장: {args.baseline}")
+    if failed:
+        print(f"\n❌ 회귀 (>{args.threshold * 100:.0f}%): {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+헤드리스 1회 실행(--once) 확인 + 측정 (가짜 업스트림 사용)
+  python bench/bench_once.py
+  python bench/bench_once.py --city yongin --runs 5 --latency-ms 30
+
+  모니터를 `--once --city <city>` 로 매번 새로 실행해 stdout NDJSON 을 줄 단위로 읽으며
+  첫 결과 줄까지 시간, 종료까지 시간, done 줄의 wall_s(스캔 시간)/cpu_s/max_rss_bytes 를 출력.
+  대상 줄 수가 summary 와 맞지 않거나, Flask 를 불러왔거나, 종료 코드가 0 이 아니면 exit 1.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu   # noqa: E402
+
+
+def run_once(env, city):
+    cmd  = [sys.executable, os.path.join(_ROOT, "tennis_court_monitor_all.py"), "--once", "--city", city]
+    t0   = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    events, first = [], None
+    for line in proc.stdout:
+        if first is None:
+            first = time.perf_counter() - t0
+        events.append(json.loads(line))
+    code = proc.wait()
+    return code, events, first, time.perf_counter() - t0
+
+
+def check(code, events, city):
+    problems = []
+    if code != 0:
+        problems.append(f"종료 코드 {code}")
+    done = [e for e in events if e["event"] == "done"]
+    if len(done) != 1 or events[-1]["event"] != "done":
+        return problems + ["done 줄 없음"]
+    if done[0]["flask_loaded"]:
+        problems.append("Flask 를 import 함")
+    for c in (["sungnam", "yongin"] if city == "all" else [city]):
+        summary = [e for e in events if e["event"] == "summary" and e["city"] == c]
+        targets = [e for e in events if e["event"] == "target" and e["city"] == c]
+        if len(summary) != 1:
+            problems.append(f"{c} summary 없음")
+            continue
+        if sum(len(t["courts"]) for t in targets) != summary[0]["slots"]:
+            problems.append(f"{c} 대상 줄의 슬롯 합이 summary 와 다름")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="--once 헤드리스 실행 확인")
+    ap.add_argument("--city", choices=["sungnam", "yongin", "all"], default="all")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--facilities", type=int, default=4, help="성남 시설 수")
+    ap.add_argument("--courts", type=int, default=16, help="용인 코트 수")
+    args = ap.parse_args()
+
+    sn_srv, _ = fu.start_server(fu.FakeConfig(city="sungnam", facilities=args.facilities,
+                                              latency_ms=args.latency_ms))
+    yn_srv, _ = fu.start_server(fu.FakeConfig(city="yongin", facilities=args.courts,
+                                              latency_ms=args.latency_ms))
+    env = dict(os.environ, TCM_STATE_DIR=tempfile.mkdtemp(prefix="once-"),
+               TCM_SN_BASE_URL=f"http://127.0.0.1:{sn_srv.server_address[1]}",
+               TCM_YN_BASE_URL=f"http://127.0.0.1:{yn_srv.server_address[1]}/publicsports",
+               idSungnam1="bench", pwdSungnam1="bench", idYongin1="bench", pwdYongin1="bench")
+
+    print(f"{'run':>3} {'lines':>6} {'first line s':>13} {'exit s':>7} {'scan s':>7} {'cpu s':>6} {'max RSS MB':>11}")
+    failed, rows = [], []
+    for i in range(1, args.runs + 1):
+        code, events, first, wall = run_once(env, args.city)
+        failed += [f"run {i}: {p}" for p in check(code, events, args.city)]
+        done = events[-1] if events and events[-1]["event"] == "done" else {}
+        rss  = (done.get("max_rss_bytes") or 0) / 2 ** 20
+        rows.append((first or 0, wall, wall - done.get("wall_s", 0), rss))
+        print(f"{i:>3} {len(events):>6} {first or 0:>13.2f} {wall:>7.2f} {done.get('wall_s', 0):>7.2f} "
+              f"{done.get('cpu_s', 0):>6.2f} {rss:>11.1f}", flush=True)
+
+    print("\n중앙값: " + ", ".join(f"{name} {statistics.median(col):.2f}"
+                                 for name, col in zip(("첫 줄 s", "종료 s", "시작+종료 오버헤드 s", "RSS MB"), zip(*rows))))
+    if failed:
+        print("\n❌ " + " / ".join(failed))
+        sys.exit(1)
+    print("✅ NDJSON 스트림/요약 일치, Flask 미사용")
+
+
+if __name__ == "__main__":
+    main()
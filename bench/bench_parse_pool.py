@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+파싱 실행기(ParseExecutor) 확장성 측정: 워커 프로세스 수별 파싱 처리량 + 스캔 스레드 지연
+  python bench/bench_parse_pool.py
+  python bench/bench_parse_pool.py --procs 0,1,2,4,8 --pages 400 --threads 8
+
+  성남 타임테이블(가짜 서버 HTML) 과 용인 코트 목록(실제 사이트 모양) 페이지를 --threads 개 스캔 스레드가
+  나눠서 _parse_exec.run 으로 파싱하는 상황을 재현. procs=0 은 스레드에서 바로 파싱(기존 동작).
+  ticker 열: 10ms 마다 깨어나는 스레드의 최대 지연 = GIL 을 파싱이 얼마나 붙잡고 있는지 (네트워크 I/O 스레드 대리 지표).
+  결과가 procs=0 과 다르면 exit 1. 프로세스 풀 이득은 CPU 코어 수에 따라 다름 (os.cpu_count() 출력 참고).
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu                 # noqa: E402
+import bench_yn_list                       # noqa: E402
+import tennis_court_monitor_all as tcm     # noqa: E402
+
+
+def build_jobs(n_pages):
+    cfg = fu.FakeConfig(city="sungnam", facilities=10)
+    sn  = [fu.sn_timetable_html(cfg, f"FAC{i % 10 + 1}", f"2026-10-{i % 28 + 1:02d}").encode("utf-8")
+           for i in range(n_pages // 2)]
+    yn  = [bench_yn_list.site_page(8, start=i * 8).encode("utf-8") for i in range(n_pages - len(sn))]
+    return [(tcm._sn_parse_packed, raw, "sungnam") for raw in sn] + \
+           [(tcm._yn_parse_list_packed, raw, "yongin") for raw in yn]
+
+
+class Ticker(threading.Thread):
+    """10ms 마다 깨어나 예정보다 늦은 시간을 기록"""
+
+    def __init__(self, period=0.01):
+        super().__init__(daemon=True)
+        self.period, self.lags, self.stop = period, [], threading.Event()
+
+    def run(self):
+        nxt = time.perf_counter() + self.period
+        while not self.stop.is_set():
+            time.sleep(max(0.0, nxt - time.perf_counter()))
+            now = time.perf_counter()
+            self.lags.append(now - nxt)
+            nxt = max(nxt + self.period, now)
+
+
+def run(jobs, procs, threads):
+    ex = tcm.ParseExecutor(procs)
+    ex.run(*jobs[0])                 # 워커 프로세스 기동 비용은 측정에서 제외
+    if procs:
+        with ThreadPoolExecutor(procs) as warm:
+            list(warm.map(lambda j: ex.run(*j), jobs[:procs * 2]))
+    ticker = Ticker()
+    ticker.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda j: ex.run(*j), jobs))
+    wall = time.perf_counter() - t0
+    ticker.stop.set()
+    ticker.join()
+    ex.shutdown()
+    lags = sorted(ticker.lags) or [0.0]
+    return results, wall, lags[int(0.99 * (len(lags) - 1))], lags[-1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="파싱 프로세스 풀 확장성")
+    ap.add_argument("--procs", default="0,1,2,4", help="쉼표로 구분한 워커 프로세스 수")
+    ap.add_argument("--pages", type=int, default=200, help="파싱할 페이지 수 (성남/용인 반반)")
+    ap.add_argument("--threads", type=int, default=8, help="스캔 스레드 수")
+    args = ap.parse_args()
+
+    jobs = build_jobs(args.pages)
+    kb   = sum(len(j[1]) for j in jobs) / 1024
+    print(f"CPU {os.cpu_count()}개, 페이지 {len(jobs)}개 ({kb:.0f}KB), 스캔 스레드 {args.threads}개")
+    print(f"\n{'procs':>5} {'wall_s':>7} {'pages/s':>8} {'x':>6} {'ticker p99 ms':>14} {'ticker max ms':>14}")
+    base, base_wall = None, None
+    for procs in (int(p) for p in args.procs.split(",")):
+        results, wall, p99, worst = run(jobs, procs, args.threads)
+        if base is None:
+            base, base_wall = results, wall
+        elif results != base:
+            print(f"\n❌ procs={procs} 결과가 procs=0 과 다름")
+            sys.exit(1)
+        print(f"{procs:>5} {wall:>7.2f} {len(jobs) / wall:>8.0f} {base_wall / wall:>5.2f}x "
+              f"{p99 * 1e3:>14.1f} {worst * 1e3:>14.1f}", flush=True)
+    print("\n✅ 모든 설정에서 파싱 결과 동일")
+
+
+if __name__ == "__main__":
+    main()
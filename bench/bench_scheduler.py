@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+회차 스케줄러(CycleScheduler) 확인
+  python bench/bench_scheduler.py
+  python bench/bench_scheduler.py --interval 0.5 --cycles 12 --courts 24 --budget-ratio 0.5
+
+  1) 주기: 작업 시간이 들쭉날쭉하고 한 번은 주기를 넘기는 가상 회차를 돌려
+     이전 방식(작업 후 sleep(interval))과 회차 시작 간격/누적 밀림/놓친 시작 수를 비교.
+  2) 적응형 폴링(_analytics) 켜짐: 루프처럼 due_targets + next_wakeup(hint) 로 돌려
+     정기 회차는 격자 시각에 시작하고(주기를 넘긴 회차는 놓친 시작으로 셈), 짧은 간격 대상은 사이 부분 회차에서,
+     기본 간격 대상은 매 정기 회차에 스캔되는지 확인.
+  3) 예산: 가짜 용인 서버에서 예산을 한 회차 시간의 --budget-ratio 로 잡고 yn_run_once 를 여러 번 돌려
+     가까운 날짜는 매 회차 스캔하는지, 미룬 (코트, 날짜) 가 다음 회차 앞쪽에서 스캔되어 굶지 않는지
+     (연속으로 미뤄진 최대 회차 수 ≤ 2), 루프처럼 코트별 결과를 캐시에 합쳤을 때 미룬 날짜의 슬롯이
+     대시보드에서 빠지지 않는지 (슬롯 수 = 예산 없는 회차) 확인. 실패 시 exit 1.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu   # noqa: E402
+
+
+def _work(rnd, k, interval, overrun_at):
+    return interval * (1.6 if k == overrun_at else rnd.uniform(0.2, 0.7))
+
+
+def timing(tcm, interval, cycles, jitter):
+    rnd, overrun_at = random.Random(7), cycles // 2
+    # 이전 방식: 작업 후 고정 sleep → 주기 = interval + 작업 시간
+    old, t = [], 0.0
+    for k in range(cycles):
+        old.append(t)
+        t += _work(rnd, k, interval, overrun_at) + interval
+    # 스케줄러: 실제로 sleep 하며 시작 시각 기록
+    rnd   = random.Random(7)
+    sched = tcm.CycleScheduler("sungnam", interval, jitter=jitter)
+    new, t0 = [], time.monotonic()
+    for k in range(cycles):
+        sched.begin()
+        new.append(time.monotonic() - t0)
+        time.sleep(_work(rnd, k, interval, overrun_at))
+        sched.end()
+        if k < cycles - 1:
+            sched.wait()
+    print(f"주기 {interval:g}초, {cycles}회차 (회차 {overrun_at + 1} 은 주기의 1.6배), 지터 ±{jitter:g}")
+    print(f"{'':14} {'평균 간격':>9} {'최대 간격':>9} {'끝 시각':>9} {'격자 대비 밀림':>14} {'놓친 시작':>9}")
+    for name, starts, missed in (("sleep 후 대기", old, "-"), ("고정 주기", new, sched.missed)):
+        gaps  = [b - a for a, b in zip(starts, starts[1:])]
+        drift = starts[-1] - round(starts[-1] / interval) * interval
+        print(f"{name:14} {statistics.mean(gaps):>8.2f}s {max(gaps):>8.2f}s {starts[-1]:>8.2f}s "
+              f"{drift:>+13.2f}s {missed!s:>9}")
+    return abs(new[-1] - (cycles - 1 + sched.missed) * interval) <= interval * (jitter + 0.1)
+
+
+def adaptive(tcm, interval, cycles, jitter, tmp):
+    """루프와 같은 방식: begin → due_targets(slack) → 작업 → end → wait(next_wakeup)"""
+    tcm.CancelAnalytics.MIN_WAKEUP_S = interval / 20
+    an = tcm.CancelAnalytics(os.path.join(tmp, "analytics.db"))
+    an.recommended_interval = lambda city, t, default: default / 3 if t == "fast" else default
+    targets, rnd = ["fast", "a", "b", "c"], random.Random(11)
+    overrun_at   = cycles // 2
+    sched, t0    = tcm.CycleScheduler("sungnam", interval, jitter=jitter), time.monotonic()
+    starts, full_n = [], 0
+    while full_n < cycles:
+        sched.begin()
+        start = time.monotonic() - t0
+        due   = an.due_targets("sungnam", targets, interval, slack=sched.slack(), full=sched.full)
+        starts.append((start, sched.full, due))
+        if sched.full:
+            full_n += 1
+        work = 1.6 if sched.full and full_n == overrun_at else rnd.uniform(0.05, 0.25) * len(due) / len(targets)
+        time.sleep(interval * work)
+        sched.end()
+        sched.wait(an.next_wakeup("sungnam", targets, interval))
+    full  = [(st, due) for st, f, due in starts if f]
+    off   = [st / interval - round(st / interval) for st, _ in full]
+    fast  = sum("fast" in due for _, _, due in starts)
+    every = sum(all(t in due for t in "abc") for _, due in full)
+    print(f"\n적응형 폴링 켜짐: 주기 {interval:g}초, 정기 {len(full)}회 (회차 {overrun_at} 은 주기의 1.6배) + 부분 "
+          f"{len(starts) - len(full)}회")
+    print(f"  정기 회차 시작의 격자 대비 최대 벗어남 {max(map(abs, off)):.2f}주기 (지터 ±{jitter:g}), "
+          f"놓친 시작 {sched.missed}, 끝 시각 {full[-1][0]:.2f}s")
+    print(f"  'fast'(간격/3) 스캔 {fast}회, 기본 간격 대상 모두 스캔한 정기 회차 {every}/{len(full)}")
+    failed = []
+    if max(map(abs, off)) > jitter + 0.05:
+        failed.append("적응형 폴링: 정기 회차가 격자에서 벗어남")
+    if not sched.missed:
+        failed.append("적응형 폴링: 주기를 넘긴 회차가 놓친 시작으로 세지지 않음")
+    if every != len(full):
+        failed.append("적응형 폴링: 기본 간격 대상이 빠진 정기 회차 있음")
+    if fast < 2 * len(full):
+        failed.append("적응형 폴링: 짧은 간격 대상이 부분 회차에서 스캔되지 않음")
+    return failed
+
+
+class RecordingScheduler:
+    """CycleScheduler 를 감싸 이번 회차에 허용한 (대상, 날짜, lead) 를 기록"""
+
+    def __init__(self, sched):
+        self.s, self.scanned = sched, set()
+
+    def __getattr__(self, name):
+        return getattr(self.s, name)
+
+    def allows(self, target, day, lead):
+        ok = self.s.allows(target, day, lead)
+        if ok:
+            self.scanned.add((target, day, lead))
+        return ok
+
+
+def budget(tcm, args):
+    courts = tcm.yn_fetch_courts()
+    t0 = time.perf_counter()
+    _, all_slots, _ = tcm.yn_run_once(courts=courts)
+    full = time.perf_counter() - t0
+    cache = {}                                  # 이전 회차(예산 없음) 결과가 있는 상태에서 시작
+    for e in all_slots:
+        cache.setdefault(e["resve_id"], []).append(e)
+    interval = full * args.budget_ratio / tcm.CYCLE_BUDGET
+    sched    = tcm.CycleScheduler("yongin", interval)
+    print(f"\n용인 {len(courts)}코트: 예산 없이 1회차 {full:.2f}초 → 예산 {interval * tcm.CYCLE_BUDGET:.2f}초 "
+          f"(가까운 날짜 {sched.near_days}일은 항상 스캔)")
+    print(f"{'cycle':>5} {'wall_s':>7} {'scanned':>8} {'near':>5} {'deferred':>9} {'prev deferred scanned':>22} "
+          f"{'max streak':>11} {'dashboard slots':>16}")
+    failed, prev, near_all, streak = [], set(), None, {}
+    for n in range(1, args.budget_cycles + 1):
+        rec = RecordingScheduler(sched)
+        sched.begin()
+        t0 = time.perf_counter()
+        def merge(court, a, d, done, total):   # yongin_loop._on_court 와 같은 병합
+            cache[court["resve_id"]] = tcm._keep_deferred(cache.get(court["resve_id"], []), d,
+                                                          sched.deferred_days(court["resve_id"]))
+        tcm.yn_run_once(courts=courts, budget=rec, on_court_done=merge)
+        wall = time.perf_counter() - t0
+        shown = sum(len(v) for v in cache.values())
+        sched.end()
+        near = {(t, d) for t, d, lead in rec.scanned if lead < sched.near_days}
+        got  = {(t, d) for t, d, _ in rec.scanned}
+        near_all = near_all or near
+        caught = len(prev & got)
+        streak = {p: streak.get(p, 0) + 1 for p in sched._deferred}   # 연속으로 미뤄진 회차 수
+        worst  = max(streak.values(), default=0)
+        print(f"{n:>5} {wall:>7.2f} {len(got):>8} {len(near):>5} {len(sched._deferred):>9} "
+              f"{caught:>17}/{len(prev):<4} {worst:>11} {shown:>8}/{len(all_slots):<7}", flush=True)
+        if near != near_all:
+            failed.append(f"{n}회차 가까운 날짜 누락")
+        if worst > 2:
+            failed.append(f"{n}회차: {worst}회차 연속 미뤄진 날짜 있음")
+        if shown != len(all_slots):
+            failed.append(f"{n}회차: 대시보드 슬롯 {shown}개 (전체 {len(all_slots)}개)")
+        prev = set(sched._deferred)
+    if not any(sched._prev) and not prev:
+        print("  (예산 안에 모두 끝남 — --budget-ratio 를 줄이면 미루기를 볼 수 있음)")
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="회차 스케줄러 확인")
+    ap.add_argument("--interval", type=float, default=0.5, help="주기 확인용 가상 주기(초)")
+    ap.add_argument("--cycles", type=int, default=10)
+    ap.add_argument("--jitter", type=float, default=0.1)
+    ap.add_argument("--courts", type=int, default=24)
+    ap.add_argument("--latency-ms", type=float, default=10.0)
+    ap.add_argument("--budget-ratio", type=float, default=0.5, help="예산 = 예산 없는 회차 시간 × 비율")
+    ap.add_argument("--budget-cycles", type=int, default=4)
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s %(message)s")
+    srv, _ = fu.start_server(fu.FakeConfig(city="yongin", facilities=args.courts, latency_ms=args.latency_ms))
+    tmp = tempfile.mkdtemp(prefix="sched-")
+    os.environ.update(TCM_YN_BASE_URL=f"http://127.0.0.1:{srv.server_address[1]}/publicsports",
+                      TCM_STATE_DIR=tmp, idYongin1="bench", pwdYongin1="bench")
+    import tennis_court_monitor_all as tcm
+    tcm.YN_PAGE_GAP  = 0
+    tcm.NOTIFY_TABLE = os.path.join(tmp, "__no_notify_table__")
+    tcm._upstream_cache.ttl = 0
+
+    failed = [] if timing(tcm, args.interval, args.cycles, args.jitter) else ["고정 주기 격자에서 벗어남"]
+    failed += adaptive(tcm, args.interval, args.cycles, args.jitter, tmp)
+    failed += budget(tcm, args)
+    if failed:
+        print("\n❌ " + " / ".join(failed))
+        sys.exit(1)
+    print("\n✅ 고정 주기 유지(적응형 폴링 포함), 가까운 날짜 매 회차 스캔, 미룬 날짜는 다음 회차 앞쪽에서 스캔 + 대시보드에 유지")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+용인 신청 페이지 워밍업 GET 절감 측정 (가짜 업스트림 사용)
+  python bench/bench_warmup.py
+  python bench/bench_warmup.py --courts 60 --cycles 5 --warmup last
+
+  같은 프로세스에서 yn_run_once 를 --cycles 회 돌리며 회차별 업스트림 요청 수, 워밍업 GET 수/바이트,
+  시간 API 거절(워밍업 누락) 수를 출력. 이전 동작(매 회차 코트마다 워밍업 GET 1회)과의 차이를 절감량으로 계산.
+  --warmup: 가짜 서버가 요구하는 워밍업 (any = 방문한 적 있는 코트, last = 마지막 방문 코트만).
+  회차마다 수집한 슬롯 수가 같지 않으면(조회 실패) exit 1.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import fake_upstream as fu   # noqa: E402
+
+APPLY = "/publicsports/sports/selectFcltyRceptResveApplyListU.do"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="용인 워밍업 GET 절감 측정")
+    ap.add_argument("--courts", type=int, default=60)
+    ap.add_argument("--cycles", type=int, default=4)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--warmup", choices=["any", "last"], default="any")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    srv, state = fu.start_server(fu.FakeConfig(city="yongin", facilities=args.courts,
+                                               latency_ms=args.latency_ms, warmup=args.warmup))
+    tmp = tempfile.mkdtemp(prefix="warmup-")
+    os.environ.update(TCM_YN_BASE_URL=f"http://127.0.0.1:{srv.server_address[1]}/publicsports",
+                      TCM_STATE_DIR=tmp, idYongin1="bench", pwdYongin1="bench")
+    import tennis_court_monitor_all as tcm
+    tcm.YN_PAGE_GAP  = 0
+    tcm.NOTIFY_TABLE = os.path.join(tmp, "__no_notify_table__")
+    tcm._upstream_cache.ttl = 0   # 회차마다 실제로 요청하도록
+
+    def snap():
+        st = state.stats
+        return (st["requests"], st["bytes_out"], st["by_path"].get(APPLY, 0),
+                st["bytes_by_path"].get(APPLY, 0), st["warmup_rejects"])
+
+    rows, slots = [], []
+    print(f"{'cycle':>5} {'wall_s':>7} {'reqs':>6} {'KB':>8} {'warm GET':>9} {'warm KB':>8} "
+          f"{'rejects':>8} {'saved GET':>10} {'saved KB':>9}")
+    page_bytes = None
+    for n in range(1, args.cycles + 1):
+        before = snap()
+        t0 = time.perf_counter()
+        _, courts, _ = tcm.yn_run_once()
+        wall  = time.perf_counter() - t0
+        after = snap()
+        reqs, nbytes, warm, warm_bytes, rejects = (a - b for a, b in zip(after, before))
+        if warm and page_bytes is None:
+            page_bytes = warm_bytes / warm
+        n_courts = len({c["resve_id"] for c in courts})
+        saved    = n_courts - warm                     # 이전 동작: 코트마다 1회
+        saved_kb = saved * (page_bytes or 0) / 1024
+        rows.append((saved, saved_kb, reqs))
+        slots.append(len(courts))
+        print(f"{n:>5} {wall:>7.2f} {reqs:>6} {nbytes / 1024:>8.0f} {warm:>9} {warm_bytes / 1024:>8.0f} "
+              f"{rejects:>8} {saved:>10} {saved_kb:>9.0f}", flush=True)
+
+    steady = rows[1:] or rows
+    print(f"\n2회차 이후 회차당 평균 절감: 요청 {sum(r[0] for r in steady) / len(steady):.1f}건, "
+          f"{sum(r[1] for r in steady) / len(steady):.0f}KB "
+          f"(회차당 요청 {sum(r[2] for r in steady) / len(steady):.0f}건 중)")
+    if len(set(slots)) != 1:
+        print(f"\n❌ 회차별 슬롯 수가 다름: {slots}")
+        sys.exit(1)
+    print(f"✅ 모든 회차 슬롯 {slots[0]}개 동일")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+용인 코트 목록 파서: 빠른 이벤트 파서 ↔ BeautifulSoup 동등성 확인 + 페이지당 시간/메모리 비교
+  python bench/bench_yn_list.py                     # 동등성 확인 + 벤치마크
+  python bench/bench_yn_list.py --check-only        # 동등성만 (불일치 시 exit 1)
+  python bench/bench_yn_list.py --replay capture.ndjson.gz   # 기록된 실제 목록 페이지도 비교
+
+  동등성: 가짜 서버 페이지, 실제 사이트 모양(헤더/메뉴/스크립트/팝업 포함) 페이지, 경계 사례 모음을
+  yn_parse_court_list (빠른 파서) 와 yn_parse_court_list_bs4 로 파싱해 (courts, 항목 수) 가 같은지 비교.
+  빠른 파서가 bs4 로 폴백한 사례는 따로 표시 (결과는 같아야 함).
+"""
+
+import os
+import sys
+import gzip
+import json
+import base64
+import timeit
+import argparse
+import statistics
+import tracemalloc
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, _HERE)
+
+import tennis_court_monitor_all as tcm   # noqa: E402
+import fake_upstream as fu               # noqa: E402
+
+
+def _item(rid, name, gu, extra=""):
+    return (f'<li class="reserve_box_item">\n  <a href="/publicsports/sports/selectFcltyRceptResveViewU.do'
+            f'?key=4292&amp;resveId={rid}" title="상세">\n    <div class="reserve_title">\n      {name}\n'
+            f'      <div class="reserve_position">\n        {gu}\n      </div>\n    </div>\n'
+            f'    <span class="reserve_state">접수중</span>{extra}\n  </a>\n</li>')
+
+
+def site_page(n_items, start=1):
+    """실제 사이트와 비슷한 모양/크기: 긴 메뉴, 인라인 스크립트, 공지 팝업 레이어, 푸터"""
+    menu   = "".join(f'<li class="depth2"><a href="/menu/{i}.do">메뉴 {i}</a></li>' for i in range(300))
+    script = "<script>var cfg = {" + ",".join(f'"k{i}": "<li class=\\"reserve_box_item\\">"' for i in range(50)) + "};</script>"
+    popup  = ('<div class="layer_wrap"><div class="layer"><ul><li class="reserve_box_item">'
+              '<a href="?resveId=999999"><div class="reserve_title">팝업 코트</div></a></li></ul></div></div>')
+    items  = "\n".join(_item(100000 + i, f"[유료] 테니스장 {i}번_코트", f"용인시 {fu.YN_GUS[i % 3]}")
+                       for i in range(start, start + n_items))
+    footer = "<footer>" + "<p>용인시 주소 안내 &amp; 저작권</p>" * 200 + "</footer>"
+    return (f"<!DOCTYPE html><html lang='ko'><head><meta charset='utf-8'><title>공공체육시설</title>{script}</head>"
+            f"<body><header><nav><ul>{menu}</ul></nav></header>{popup}"
+            f"<div class='reserve_box'><ul class='reserve_box_list'>\n{items}\n</ul></div>{footer}</body></html>")
+
+
+EDGE_CASES = {
+    "빈 페이지":          "<html><body></body></html>",
+    "항목 없음 + 팝업":    '<div class="popup"><li class="reserve_box_item"><a href="?resveId=1">x</a></li></div>',
+    "엔티티/공백":         _item(1, "  [유료]&nbsp;테니스장 &amp; 풋살  ", "용인시&#32;기흥구"),
+    "주석으로 나뉜 제목":   _item(2, "테니스 <!-- x --> 장", "수지구"),
+    "제목 안 br/img":      _item(3, "테니스<br>장<img src='a.png'>1번", "처인구"),
+    "제목 안 script":      _item(4, "테니스<script>var a = '<b>';</script>장", "기흥구"),
+    "링크 없음":           '<li class="reserve_box_item"><div class="reserve_title">테니스장</div></li>',
+    "resveId 숫자 아님":   '<li class="reserve_box_item"><a href="?resveId=abc"><div class="reserve_title">테니스</div></a></li>',
+    "resveId 없는 링크 먼저": ('<li class="reserve_box_item"><a href="/x.do">안내</a>'
+                           '<a href="?key=1&resveId=77"><div class="reserve_title">테니스 77</div></a></li>'),
+    "제목 없음":           '<li class="reserve_box_item"><a href="?resveId=5"><div class="reserve_position">기흥구</div></a></li>',
+    "위치 없음":           '<li class="reserve_box_item"><a href="?resveId=6"><div class="reserve_title">테니스 6</div></a></li>',
+    "제목 밖 위치":        ('<li class="reserve_box_item"><a href="?resveId=7"><p class="reserve_title">테니스 7</p>'
+                         '<p class="reserve_position">수지구</p></a></li>'),
+    "위치 안 제목":        ('<li class="reserve_box_item"><a href="?resveId=8"><div class="reserve_position">'
+                         '수지구 <b class="reserve_title">테니스 8</b></div></a></li>'),
+    "제목/위치 2개":       ('<li class="reserve_box_item"><a href="?resveId=9"><div class="reserve_title">테니스 9'
+                         '<span class="reserve_position">처인구</span><span class="reserve_position">둘째</span>'
+                         '</div><div class="reserve_title">두번째 제목</div></a></li>'),
+    "항목 안 팝업":        ('<li class="reserve_box_item"><a href="?resveId=10"><div class="reserve_title">테니스 10'
+                         '<div class="popup">팝업 <div>중첩</div> 글</div> 끝</div></a></li>'),
+    "닫힌 시작 태그 팝업":  ('<div class="popup"/><li class="reserve_box_item"><a href="?resveId=11">'
+                         '<div class="reserve_title">테니스 11</div></a></li>'),
+    "여러 클래스":         ('<li class="item reserve_box_item on"><a class="go" href="?resveId=12">'
+                         '<div class="tit reserve_title">테니스 12</div></a></li>'),
+    "대문자/따옴표 없음":   ('<LI CLASS=reserve_box_item><A HREF=?resveId=13><DIV CLASS=reserve_title>테니스 13'
+                         '</DIV></A></LI>'),
+    "항목 안 일반 li":     ('<li class="reserve_box_item"><a href="?resveId=14"><div class="reserve_title">테니스 14'
+                         '</div></a><ul><li>안내</li><li>요금</li></ul></li>'),
+    "항목 안 안 닫힌 li":   ('<li class="reserve_box_item"><a href="?resveId=15"><div class="reserve_title">테니스 15'
+                         '</div></a><ul><li>안내</ul></li><li class="reserve_box_item"><a href="?resveId=16">'
+                         '<div class="reserve_title">테니스 16</div></a></li>'),
+    "항목 li 안 닫힘(폴백)": ('<li class="reserve_box_item"><a href="?resveId=17"><div class="reserve_title">테니스 17'
+                          '</div></a><li class="reserve_box_item"><a href="?resveId=18">'
+                          '<div class="reserve_title">테니스 18</div></a></li>'),
+    "잘못 닫힌 태그":       ('<li class="reserve_box_item"><a href="?resveId=19"><div class="reserve_title">테니스'
+                         '</span> 19</b></div></a></li>'),
+    "DOCTYPE/주석":        "<!DOCTYPE html><!-- 목록 -->" + _item(20, "테니스 20", "기흥구"),
+}
+
+
+def build_corpus(replay=None):
+    cfg    = fu.FakeConfig(city="yongin", facilities=120)
+    corpus = {f"가짜 서버 p{p}": fu.yn_list_html(cfg, p, 8) for p in (1, 2, 15, 16)}
+    corpus.update({f"사이트 모양 {n}항목": site_page(n) for n in (0, 1, 8, 50, 200)})
+    corpus.update(EDGE_CASES)
+    if replay:
+        with gzip.open(replay, "rt", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                e = json.loads(line)
+                if "selectFcltyRceptResveListU.do" not in e["request"]["url"]:
+                    continue
+                c    = e["response"]["content"]
+                text = (base64.b64decode(c["text"]).decode("utf-8", "replace")
+                        if c.get("encoding") == "base64" else c["text"])
+                corpus[f"기록 #{i}"] = text
+    return corpus
+
+
+def check(corpus):
+    failed, fallbacks = [], []
+    for name, html in corpus.items():
+        p = tcm._YnCourtListParser()
+        p.feed(html)
+        p.close()
+        if p.broken:
+            fallbacks.append(name)
+        fast = tcm.yn_parse_court_list(html)
+        ref  = tcm.yn_parse_court_list_bs4(html)
+        if fast != ref:
+            failed.append(name)
+            print(f"  ✗ {name}\n      fast: {fast}\n      bs4:  {ref}")
+    print(f"동등성: {len(corpus) - len(failed)}/{len(corpus)} 일치"
+          + (f" (bs4 폴백 {len(fallbacks)}건: {', '.join(fallbacks)})" if fallbacks else ""))
+    return failed
+
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def _per_call(fn, repeat=5):
+    timer     = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return statistics.median(t / number for t in timer.repeat(repeat=repeat, number=number))
+
+
+def bench():
+    pages = {"가짜 서버 8항목": fu.yn_list_html(fu.FakeConfig(city="yongin", facilities=120), 1, 8)}
+    pages.update({f"사이트 모양 {n}항목": site_page(n) for n in (8, 50)})
+    tcm.yn_parse_court_list_bs4(pages["가짜 서버 8항목"])   # bs4 import 비용은 측정에서 제외
+    print(f"\n{'page':18} {'KB':>6} {'bs4 ms':>9} {'fast ms':>9} {'x':>6} {'bs4 peak KB':>12} {'fast peak KB':>13}")
+    for name, html in pages.items():
+        t_ref  = _per_call(lambda: tcm.yn_parse_court_list_bs4(html))
+        t_fast = _per_call(lambda: tcm.yn_parse_court_list(html))
+        m_ref  = _peak_kb(lambda: tcm.yn_parse_court_list_bs4(html))
+        m_fast = _peak_kb(lambda: tcm.yn_parse_court_list(html))
+        print(f"{name:18} {len(html.encode('utf-8')) / 1024:>6.0f} {t_ref * 1e3:>9.2f} {t_fast * 1e3:>9.2f} "
+              f"{t_ref / t_fast:>5.1f}x {m_ref:>12.0f} {m_fast:>13.0f}", flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="용인 코트 목록 파서 동등성/벤치마크")
+    ap.add_argument("--check-only", action="store_true")
+    ap.add_argument("--replay", help="기록된 archive(--record) 의 목록 페이지도 비교")
+    args = ap.parse_args()
+
+    failed = check(build_corpus(args.replay))
+    if not args.check_only:
+        bench()
+    if failed:
+        print(f"\n❌ 불일치: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
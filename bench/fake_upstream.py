@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+성남/용인 예약 사이트 가짜 업스트림 (오프라인 벤치마크용)
+  python bench/fake_upstream.py --city sungnam --port 18001 --facilities 100
+  python bench/fake_upstream.py --city yongin  --port 18002 --facilities 100 --latency-ms 50
+
+  성남: rest_loginCheck.do / otherTimetable.do
+  용인: groupLogin.do / selectFcltyRceptResveListU.do /
+        selectFcltyRceptResveApplyListU.do / selectRegistTimeByChosenDateFcltyRceptResveApply.do
+  예약 신청: 성남 rest_reservation.do / 용인 sports/insertFcltyRceptResveApply.do
+        (예약가능 슬롯이면 성공 후 예약완료로 바뀜, 이미 찼으면 실패)
+        폼 필드(성남 facId/resdate/court/time, 용인 resveId/dateVal/useTm)는 bench_autohold 가 지정한 값에 맞춘
+        가짜이며 실제 사이트의 신청 프로토콜을 검증하지 않음
+  GET /__stats → 처리한 요청 수/바이트(경로별)/예약 신청 결과 (JSON)
+  --warmup any|last: 용인 시간 API 가 신청 페이지(ApplyListU) 방문 세션만 응답
+        (any = 그 세션이 방문한 적 있는 코트, last = 마지막으로 방문한 코트만)
+
+  모니터 쪽은 TCM_SN_BASE_URL=http://127.0.0.1:18001
+             TCM_YN_BASE_URL=http://127.0.0.1:18002/publicsports 로 연결.
+"""
+
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+
+KST = timezone(timedelta(hours=9))
+
+SN_TIMES = [f"{h:02d}:00 ~ {h + 1:02d}:50" for h in range(6, 22, 2)]
+YN_TIMES = [f"{h:02d}:00 ~ {h + 2:02d}:00" for h in range(6, 22, 2)]
+YN_GUS   = ["기흥구", "수지구", "처인구"]
+DOW_KO   = ["월", "화", "수", "목", "금", "토", "일"]
+
+
+class FakeConfig:
+    def __init__(self, city="sungnam", facilities=10, courts_per_facility=4,
+                 latency_ms=0.0, error_rate=0.0, session_ttl=0.0,
+                 avail_ratio=0.1, open_days=31, apply_page_kb=20, seed=0,
+                 release_at=0.0, release_days=0, warmup=""):
+        self.city                = city
+        self.facilities          = facilities
+        self.courts_per_facility = courts_per_facility
+        self.latency_ms          = latency_ms       # 평균 응답 지연 (±50% 균등 분포)
+        self.error_rate          = error_rate       # 500 응답 비율
+        self.session_ttl         = session_ttl      # 세션 만료(초), 0 = 만료 없음
+        self.avail_ratio         = avail_ratio      # 예약가능 슬롯 비율
+        self.open_days           = open_days        # 오늘부터 예약 가능한 일수 (밖이면 빈 응답)
+        self.release_at          = release_at       # 이 시각(epoch) 이후 release_days 일이 추가로 열림
+        self.release_days        = release_days
+        self.apply_page_kb       = apply_page_kb    # 용인 신청 페이지 크기
+        self.warmup              = warmup           # "" / "any" / "last" — 시간 API 전 신청 페이지 방문 요구
+        self.seed                = seed
+
+
+class _State:
+    def __init__(self, cfg):
+        self.cfg      = cfg
+        self.sessions = {}   # sid → 발급 시각
+        self.lock     = threading.Lock()
+        self.booked   = set()   # 예약 신청으로 찬 슬롯 키
+        self.visited  = {}      # sid → 방문한 신청 페이지 resveId 목록 (마지막이 끝)
+        self.stats    = {"requests": 0, "bytes_out": 0, "errors": 0, "logins": 0, "by_path": {},
+                         "bytes_by_path": {}, "bookings": 0, "booking_rejects": 0, "warmup_rejects": 0}
+
+    def visit(self, sid, rid):
+        with self.lock:
+            seen = self.visited.setdefault(sid, [])
+            if rid in seen:
+                seen.remove(rid)
+            seen.append(rid)
+
+    def warmed(self, sid, rid):
+        """--warmup 모드에서 이 세션이 rid 신청 페이지를 (마지막으로) 방문했는지"""
+        if not self.cfg.warmup:
+            return True
+        with self.lock:
+            seen = self.visited.get(sid, [])
+            ok   = rid in seen if self.cfg.warmup == "any" else seen[-1:] == [rid]
+            if not ok:
+                self.stats["warmup_rejects"] += 1
+        return ok
+
+    def book(self, key):
+        """key 슬롯 예약 시도 → 성공 여부 (같은 슬롯 두 번째 신청은 실패)"""
+        with self.lock:
+            ok = _is_avail(self.cfg, *key) and key not in self.booked
+            if ok:
+                self.booked.add(key)
+            self.stats["bookings" if ok else "booking_rejects"] += 1
+        return ok
+
+    def new_session(self):
+        sid = secrets.token_hex(8)
+        with self.lock:
+            self.sessions[sid] = time.time()
+            self.stats["logins"] += 1
+        return sid
+
+    def valid(self, sid):
+        with self.lock:
+            t = self.sessions.get(sid)
+        if t is None:
+            return False
+        return not self.cfg.session_ttl or time.time() - t < self.cfg.session_ttl
+
+    def count(self, path, nbytes, error=False):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_out"] += nbytes
+            self.stats["errors"] += int(error)
+            self.stats["by_path"][path] = self.stats["by_path"].get(path, 0) + 1
+            self.stats["bytes_by_path"][path] = self.stats["bytes_by_path"].get(path, 0) + nbytes
+
+
+def _is_avail(cfg, *key):
+    """같은 (시설, 날짜, 시간) 은 항상 같은 결과가 되도록 시드 고정"""
+    return random.Random(f"{cfg.seed}|{key}").random() < cfg.avail_ratio
+
+
+def _is_open(cfg, d):
+    """오늘부터 open_days 일 (+ release_at 이후엔 release_days 일 추가) 안이면 예약 가능 기간"""
+    today = datetime.now(KST).replace(hour=0, minute=0, second=0, microsecond=0)
+    days  = cfg.open_days
+    if cfg.release_at and time.time() >= cfg.release_at:
+        days += cfg.release_days
+    return 0 <= (d - today).days < days
+
+
+def sn_timetable_html(cfg, fac_id, resdate, booked=()):
+    y, m, d = (int(x) for x in resdate.split("-"))
+    if not _is_open(cfg, datetime(y, m, d, tzinfo=KST)):
+        return "<html><body></body></html>"
+    parts = []
+    for court in range(1, cfg.courts_per_facility + 1):
+        rows = []
+        for i, t in enumerate(SN_TIMES):
+            avail = _is_avail(cfg, fac_id, resdate, court, t) and (fac_id, resdate, court, t) not in booked
+            btn   = ("<button type='button' class='btn'>예약가능</button>" if avail
+                     else "<span class='txt'>예약완료</span>")
+            rows.append(f"<tr>\n<td class='td-title'>{btn}</td><td class='td-title'>{i + 1}</td>"
+                        f"<td class='td-title'>{t}</td><td class='td-title'>{'' if avail else '홍*동'}</td>\n</tr>")
+        parts.append(f"<label class='tit required lb-timetable'>{court}번 코트</label>\n"
+                     f"<div class='tableBox mgb30'><table><thead><tr><th>예약</th></tr></thead>"
+                     f"<tbody>{''.join(rows)}</tbody></table></div>")
+    return "<html><body>" + "\n".join(parts) + "</body></html>"
+
+
+def yn_list_html(cfg, page_idx, page_unit):
+    start = (page_idx - 1) * page_unit
+    items = []
+    for rid in range(start + 1, min(cfg.facilities, start + page_unit) + 1):
+        gu = YN_GUS[rid % len(YN_GUS)]
+        items.append(
+            f'<li class="reserve_box_item"><a href="/publicsports/sports/selectFcltyRceptResveViewU.do'
+            f'?key=4292&resveId={100000 + rid}"><div class="reserve_title">[유료] 테니스장 {rid}번_코트'
+            f'<div class="reserve_position">용인시 {gu}</div></div></a></li>')
+    popup = '<div class="popup"><li class="reserve_box_item">팝업</li></div>'
+    return f"<html><body>{popup}<ul>{''.join(items)}</ul></body></html>"
+
+
+def yn_time_json(cfg, resve_id, date_val, booked=()):
+    d = datetime.strptime(date_val, "%Y%m%d").replace(tzinfo=KST)
+    if not _is_open(cfg, d):
+        return {"resveTmList": [], "fcltRceptRsvctmTime": []}
+    avail, rows = [], []
+    for t in YN_TIMES:
+        if _is_avail(cfg, resve_id, date_val, t) and (resve_id, date_val, t) not in booked:
+            avail.append({"timeContent": t})
+        else:
+            rows.append({"useTm": t, "rsvctmStts": "예약완료", "frstRegisterNmApply": "김*수"})
+    return {"formatedDate": d.strftime("%Y-%m-%d"), "formatedDay": DOW_KO[d.weekday()],
+            "resveTmList": avail, "fcltRceptRsvctmTime": rows}
+
+
+def make_handler(state):
+    cfg = state.cfg
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _sid(self):
+            for part in self.headers.get("Cookie", "").split(";"):
+                k, _, v = part.strip().partition("=")
+                if k == "JSESSIONID":
+                    return v
+            return ""
+
+        def _form(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return {k: v[0] for k, v in parse_qs(self.rfile.read(n).decode("utf-8")).items()}
+
+        def _send(self, status, body, ctype="text/html; charset=UTF-8", cookie=None):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            if cookie:
+                self.send_header("Set-Cookie", f"JSESSIONID={cookie}; Path=/")
+            self.end_headers()
+            self.wfile.write(data)
+            state.count(urlparse(self.path).path, len(data), error=status >= 500)
+
+        def _delay_or_fail(self):
+            if cfg.latency_ms:
+                time.sleep(cfg.latency_ms / 1000 * random.uniform(0.5, 1.5))
+            if cfg.error_rate and random.random() < cfg.error_rate:
+                self._send(500, "Internal Server Error")
+                return True
+            return False
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                with state.lock:
+                    body = json.dumps(state.stats)
+                return self._send(200, body, "application/json")
+            if self._delay_or_fail():
+                return
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.endswith("/sports/selectFcltyRceptResveListU.do"):
+                return self._send(200, yn_list_html(cfg, int(q.get("pageIndex", 1)),
+                                                    int(q.get("pageUnit", 8))))
+            if url.path.endswith("/sports/selectFcltyRceptResveApplyListU.do"):
+                state.visit(self._sid(), q.get("searchResveId", ""))
+                filler = "<!-- " + "x" * (cfg.apply_page_kb * 1024) + " -->"
+                return self._send(200, f"<html><body>신청 {q.get('searchResveId', '')}{filler}</body></html>")
+            self._send(404, "not found")
+
+        def do_POST(self):
+            url  = urlparse(self.path)
+            form = self._form()
+            if self._delay_or_fail():
+                return
+            if url.path.endswith("/rest_loginCheck.do"):
+                return self._send(200, "success", "text/plain", cookie=state.new_session())
+            if url.path.endswith("/otherTimetable.do"):
+                if not self.valid_session():
+                    return self._send(200, "<html><body>로그인이 필요합니다</body></html>")
+                return self._send(200, sn_timetable_html(cfg, form.get("facId", ""), form.get("resdate", ""),
+                                                         state.booked))
+            if url.path.endswith("/rest_reservation.do"):
+                if not self.valid_session():
+                    return self._send(200, "<html><body>로그인이 필요합니다</body></html>")
+                t   = form.get("time", "").replace(" ", "")
+                t   = next((x for x in SN_TIMES if x.replace(" ", "") == t), t)
+                key = (form.get("facId", ""), form.get("resdate", ""), int(form.get("court") or 0), t)
+                return self._send(200, "success" if state.book(key) else "fail", "text/plain")
+            if url.path.endswith("/groupLogin.do"):
+                msg = quote("로그인에 성공하였습니다.")
+                return self._send(200, f'<script>alert(decodeURIComponent("{msg}"));</script>',
+                                  cookie=state.new_session())
+            if url.path.endswith("/sports/selectRegistTimeByChosenDateFcltyRceptResveApply.do"):
+                if not self.valid_session():
+                    return self._send(200, "<html><body>loginForm</body></html>")
+                if not state.warmed(self._sid(), form.get("resveId", "")):
+                    return self._send(200, "<html><body>잘못된 접근입니다</body></html>")
+                body = yn_time_json(cfg, form.get("resveId", ""), form.get("dateVal", ""), state.booked)
+                return self._send(200, json.dumps(body, ensure_ascii=False), "application/json; charset=UTF-8")
+            if url.path.endswith("/sports/insertFcltyRceptResveApply.do"):
+                if not self.valid_session():
+                    return self._send(200, "<html><body>loginForm</body></html>")
+                ok  = state.book((form.get("resveId", ""), form.get("dateVal", ""), form.get("useTm", "")))
+                msg = quote("예약 신청에 성공하였습니다." if ok else "이미 예약된 시간입니다.")
+                return self._send(200, f'<script>alert(decodeURIComponent("{msg}"));</script>')
+            self._send(404, "not found")
+
+        def valid_session(self):
+            return state.valid(self._sid())
+
+    return Handler
+
+
+def start_server(cfg, host="127.0.0.1", port=0):
+    """백그라운드 스레드로 서버 시작 → (server, state). server.server_address 로 포트 확인"""
+    state  = _State(cfg)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name=f"fake-{cfg.city}").start()
+    return server, state
+
+
+def main():
+    ap = argparse.ArgumentParser(description="성남/용인 가짜 업스트림 서버")
+    ap.add_argument("--city", choices=["sungnam", "yongin"], required=True)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--facilities", type=int, default=10, help="시설(성남)/코트(용인) 수")
+    ap.add_argument("--courts-per-facility", type=int, default=4, help="성남 시설당 코트 수")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--session-ttl", type=float, default=0.0, help="세션 만료(초), 0 = 없음")
+    ap.add_argument("--avail-ratio", type=float, default=0.1)
+    ap.add_argument("--open-days", type=int, default=31)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--release-in", type=float, default=0.0,
+                    help="N초 뒤 예약 오픈 흉내 (--release-days 일 추가 오픈), 0 = 없음")
+    ap.add_argument("--release-days", type=int, default=31)
+    ap.add_argument("--warmup", choices=["", "any", "last"], default="",
+                    help="용인 시간 API 전 신청 페이지 방문 요구 (any/last), 기본 없음")
+    args = ap.parse_args()
+
+    cfg = FakeConfig(city=args.city, facilities=args.facilities,
+                     courts_per_facility=args.courts_per_facility, latency_ms=args.latency_ms,
+                     error_rate=args.error_rate, session_ttl=args.session_ttl,
+                     avail_ratio=args.avail_ratio, open_days=args.open_days, seed=args.seed,
+                     release_at=time.time() + args.release_in if args.release_in else 0.0,
+                     release_days=args.release_days, warmup=args.warmup)
+    server, _ = start_server(cfg, args.host, args.port)
+    # 벤치 하네스가 읽는 첫 줄: 실제 바인딩된 포트
+    print(json.dumps({"port": server.server_address[1]}), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
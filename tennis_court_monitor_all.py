@@ -7,6 +7,8 @@
 
 import sys
 import io
+import copy
+import contextvars
 
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -14,19 +16,47 @@ if sys.platform == "win32":
 
 import os
 import re
+import pickle
+import gzip
+import base64
+import json
+import math
+import bisect
+import hashlib
+import hmac
+import mmap
 import time
+import random
+import signal
+import socket
+import sqlite3
+import struct
+import statistics
 import queue
 import logging
+import shutil
+import tempfile
 import threading
 import argparse
+import atexit
+import multiprocessing
+import http.client
+import tracemalloc
+import urllib.request
+from html.parser import HTMLParser
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import unquote
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse
 
 import requests
 import urllib3
-from bs4 import BeautifulSoup
-from flask import Flask, jsonify
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -38,43 +68,474 @@ SUNGNAM_DIR  = os.path.join(_HERE, "Sungnam")
 YONGIN_DIR   = os.path.join(_HERE, "Yongin")
 LOG_DIR      = os.path.join(_HERE, "log_all")
 KST          = timezone(timedelta(hours=9))
+_T_START     = time.time()   # 첫 스냅샷까지 시간 기준 (--scanner-procs 자식은 부모 값을 물려받음)
 
-SN_BASE_URL  = "https://res.isdc.co.kr"
-YN_BASE_URL  = "https://publicsports.yongin.go.kr/publicsports"
+# TCM_*_BASE_URL: 로컬 가짜 업스트림(bench/fake_upstream.py) 등으로 교체할 때 사용
+SN_BASE_URL  = os.environ.get("TCM_SN_BASE_URL", "https://res.isdc.co.kr")
+YN_BASE_URL  = os.environ.get("TCM_YN_BASE_URL", "https://publicsports.yongin.go.kr/publicsports")
 YN_TIME_API  = f"{YN_BASE_URL}/sports/selectRegistTimeByChosenDateFcltyRceptResveApply.do"
+# 예약 신청 엔드포인트 (--auto-hold). 실제 사이트의 신청 요청 형식은 검증되지 않았으므로 경로·폼 필드 모두 기본값 없음 —
+# 브라우저/기록(--record)으로 확인한 경로(TCM_*_BOOK_PATH)와 폼 필드(TCM_*_BOOK_FIELDS)를 둘 다 지정한 도시만 자동 신청.
+# 필드는 JSON {"필드명": "값 템플릿"}, 템플릿은 str.format 치환 (SN_BOOK_VARS / YN_BOOK_VARS)
+SN_BOOK_PATH   = os.environ.get("TCM_SN_BOOK_PATH", "")
+YN_BOOK_PATH   = os.environ.get("TCM_YN_BOOK_PATH", "")
+SN_BOOK_FIELDS = os.environ.get("TCM_SN_BOOK_FIELDS", "")
+YN_BOOK_FIELDS = os.environ.get("TCM_YN_BOOK_FIELDS", "")
+SN_BOOK_VARS   = ("fac_id", "date", "resdate", "court", "court_no", "time")   # resdate = YYYY-M-D, court_no = 코트 번호 숫자
+YN_BOOK_VARS   = ("resve_id", "date", "date_val", "time")                     # date_val = YYYYMMDD
 YN_PAGE_SIZE = 8
 YN_WORKERS   = 8
+SN_REQUEST_GAP = 0.2   # 성남 타임테이블 요청 사이 대기(초)
+YN_PAGE_GAP    = 0.3   # 용인 코트 목록 페이지 사이 대기(초)
+SN_INTERVAL  = 90    # 성남 기본 폴링 간격(초)
+SN_OPEN_DAYS = 4     # 성남 예약 가능 기간: 오늘부터 며칠
+YN_INTERVAL  = 300   # 용인 기본 폴링 간격(초)
 
 # ─────────────────────────────────────────────────────────
 # Flask 앱 & 공유 상태
 # ─────────────────────────────────────────────────────────
-app   = Flask(__name__)
+app   = None   # create_app() — --once 모드는 Flask 를 import 하지 않음
 _lock = threading.Lock()
 
 _sn_available   = []
 _sn_courts      = []
 _sn_last_update = ""
+_sn_stale       = False   # True = 재시작 후 복원된 (이전 실행의) 스냅샷
+_sn_prev_key    = [""]    # 마지막 알림 키 (dedupe)
 
 _yn_available   = []
 _yn_courts      = []
 _yn_last_update = ""
 _yn_period      = ""
+_yn_stale       = False
+_yn_prev_key    = [""]
+_yn_progress    = {"running": False, "done": 0, "total": 0, "started": ""}   # 현재 회차 진행률
+_rescan_status  = {c: {"pending": 0, "running": False, "finished": ""} for c in ("sungnam", "yongin")}
+_child_accounts = {}   # --scanner-procs: 자식이 보낸 계정별 사용 통계
 
 # ─────────────────────────────────────────────────────────
 # 로깅
 # ─────────────────────────────────────────────────────────
-def setup_logging():
+# 호출한 스레드는 레코드를 큐에 넣기만 하고, 포맷/파일 쓰기는 QueueListener 스레드가 한다
+LOG_FORMAT  = os.environ.get("TCM_LOG_FORMAT", "json")       # 파일 형식: json (한 줄에 레코드 1개) | text
+LOG_LEVELS  = os.environ.get("TCM_LOG_LEVELS", "")           # 구성요소별 레벨, 예: "SN=DEBUG,TG=WARNING,*=INFO"
+LOG_ROTATE  = os.environ.get("TCM_LOG_ROTATE", "20MB")       # "<N>MB" = 크기 기준, "midnight" / "hourly" = 시간 기준
+LOG_BACKUPS = int(os.environ.get("TCM_LOG_BACKUPS", "10"))   # 보관할 이전 파일(.gz) 수
+
+_log_sn       = logging.getLogger("tcm.SN")   # 시설·코트마다 찍는 핫패스 로그용 — 레벨이 꺼져 있으면 메시지를 만들지 않음
+_log_yn       = logging.getLogger("tcm.YN")
+_log_levels   = {}     # 구성요소 → 레벨 ("*" = 나머지)
+# (구성요소, 회차 ID) — 회차 루프 스레드에서 CycleScheduler.begin 이 설정. 재스캔·핫 워치·버스트 스레드는 빈 값
+_log_cycle    = contextvars.ContextVar("tcm_log_cycle", default=("", ""))
+_log_listener = None
+_LOG_COMPONENT_RE = re.compile(r"\[([A-Z]+)\]")
+
+
+def parse_log_levels(spec):
+    """"SN=DEBUG,TG=WARNING" → {"SN": 10, "TG": 30}. 모르는 레벨이면 ValueError"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        comp, _, name = part.partition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f"알 수 없는 로그 레벨: {part!r}")
+        levels[comp.strip().upper() or "*"] = level
+    return levels
+
+
+class _LogContext(logging.Filter):
+    """(호출한 스레드에서) 레코드에 구성요소·회차 ID 를 붙이고 구성요소별 레벨로 거른다.
+    구성요소: tcm.<X> 로거면 X, 아니면 메시지 앞의 [X]"""
+
+    def filter(self, record):
+        if record.name.startswith("tcm."):
+            comp = record.name[4:]
+        else:
+            m    = _LOG_COMPONENT_RE.match(record.msg) if isinstance(record.msg, str) else None
+            comp = m.group(1) if m else ""
+        record.component = comp
+        cycle_comp, cycle = _log_cycle.get()
+        record.cycle     = cycle if cycle_comp == comp else ""
+        return record.levelno >= _log_levels.get(comp, _log_levels.get("*", logging.INFO))
+
+
+class _LogQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # 메시지만 합쳐 두고(인자 객체는 다른 스레드에서 바뀔 수 있음) 포맷은 리스너 스레드에서
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        doc = {"ts": datetime.fromtimestamp(record.created, KST).isoformat(timespec="milliseconds"),
+               "level": record.levelname, "component": getattr(record, "component", ""),
+               "cycle": getattr(record, "cycle", ""), "pid": record.process, "thread": record.threadName,
+               "msg": record.getMessage()}
+        if record.exc_text:
+            doc["exc"] = record.exc_text
+        return json.dumps(doc, ensure_ascii=False)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _log_file_handler(path):
+    """LOG_ROTATE 에 따라 크기/시간 기준 회전, 이전 파일은 gzip 압축 (all.log.1.gz, all.log.2026-10-19.gz)"""
+    rotate = LOG_ROTATE.strip().lower()
+    if rotate in ("midnight", "daily", "hourly"):
+        handler = TimedRotatingFileHandler(path, when="H" if rotate == "hourly" else "midnight",
+                                           backupCount=LOG_BACKUPS, encoding="utf-8")
+    else:
+        mb      = float(rotate.removesuffix("mb") or 0)
+        handler = RotatingFileHandler(path, maxBytes=int(mb * 1024 * 1024), backupCount=LOG_BACKUPS,
+                                      encoding="utf-8")
+    handler.namer   = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def stop_logging():
+    """리스너 스레드가 큐에 남은 레코드를 모두 쓰고 끝날 때까지 대기 (종료 시 atexit)"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(stop_logging)
+
+
+def exit_on_sigterm():
+    """SIGTERM 도 정상 종료(SystemExit)로 처리 → atexit 정리(로그 flush, 트래픽 archive 닫기 등) 실행.
+    메인 스레드에서만 호출 가능 (데몬 스캐너 프로세스는 부모 종료 시 SIGTERM 을 받음)"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+def setup_logging(tag=""):
+    """루트 로거 → 큐 → (리스너 스레드) log_all/all[_tag].log + 콘솔"""
+    global _log_listener
+    stop_logging()
     os.makedirs(LOG_DIR, exist_ok=True)
-    ts       = datetime.now(KST).strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(LOG_DIR, f"all_{ts}.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
+    _log_levels.clear()
+    _log_levels.update(parse_log_levels(LOG_LEVELS))
+    default = _log_levels.get("*", logging.INFO)
+    _log_sn.setLevel(_log_levels.get("SN", default))
+    _log_yn.setLevel(_log_levels.get("YN", default))
+
+    text     = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    file_out = _log_file_handler(os.path.join(LOG_DIR, f"all{'_' + tag if tag else ''}.log"))
+    file_out.setFormatter(_JsonLogFormatter() if LOG_FORMAT == "json" else text)
+    console  = logging.StreamHandler()
+    console.setFormatter(text)
+
+    to_queue = _LogQueueHandler(queue.SimpleQueue())
+    to_queue.addFilter(_LogContext())
+    root = logging.getLogger()
+    root.handlers[:] = [to_queue]
+    root.setLevel(min([logging.INFO, *_log_levels.values()]))
+    _log_listener = QueueListener(to_queue.queue, file_out, console)
+    _log_listener.start()
+
+
+# ─────────────────────────────────────────────────────────
+# 메트릭 (Prometheus 텍스트 포맷, /metrics)
+# ─────────────────────────────────────────────────────────
+_HIST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Metrics:
+    """스레드별 샤드에 기록하는 카운터/히스토그램 레지스트리.
+
+    핫패스(inc/observe)는 자기 스레드의 dict 만 건드리므로 락이 없고,
+    /metrics 렌더링 시에만 샤드를 합산한다. 종료된 스레드의 샤드는 렌더링 때, 그리고
+    새 샤드 등록 시 샤드 수가 _fold_at 을 넘으면 접어 둔다 (스크레이퍼 없이도 샤드가 쌓이지 않도록).
+    """
+
+    FOLD_AT = 64   # 샤드 수가 이보다 많아지면 새 샤드 등록 때 종료된 스레드의 샤드를 접음
+
+    def __init__(self):
+        self._local   = threading.local()
+        self._reg     = threading.Lock()   # 샤드/게이지 등록 전용
+        self._shards  = []                 # [(thread, shard)]
+        self._retired = {}
+        self._fold_at = self.FOLD_AT
+        self._gauges  = {}                 # (name, labels) → 값 또는 callable
+        self._help    = {}                 # name → (type, help)
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def _shard(self):
+        sh = getattr(self._local, "shard", None)
+        if sh is None:
+            sh = self._local.shard = {}
+            with self._reg:
+                self._shards.append((threading.current_thread(), sh))
+                if len(self._shards) > self._fold_at:
+                    self._fold_dead()
+                    # 살아 있는 스레드가 많아도 등록마다 전체를 훑지 않도록 기준을 늘림
+                    self._fold_at = max(self.FOLD_AT, 2 * len(self._shards))
+        return sh
+
+    def _fold_dead(self):
+        """종료된 스레드의 샤드를 _retired 로 합치고 목록에서 제거 (self._reg 보유 상태에서 호출)"""
+        alive = []
+        for th, sh in self._shards:
+            if th.is_alive():
+                alive.append((th, sh))
+            else:
+                for k, v in list(sh.items()):
+                    self._merge(self._retired, k, v)
+        self._shards = alive
+
+    def inc(self, name, value=1, **labels):
+        sh  = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        sh[key] = sh.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        sh  = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        h   = sh.get(key)
+        if h is None:
+            h = sh[key] = [0] * (len(_HIST_BUCKETS) + 2)   # 버킷별 개수 + count + sum
+        for i, b in enumerate(_HIST_BUCKETS):
+            if seconds <= b:
+                h[i] += 1
+                break
+        h[-2] += 1
+        h[-1] += seconds
+
+    def set_gauge(self, name, value, **labels):
+        """value 가 callable 이면 렌더링 시점에 호출"""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    @staticmethod
+    def _merge(dst, key, val):
+        if isinstance(val, list):
+            cur = dst.setdefault(key, [0] * len(val))
+            for i, v in enumerate(val):
+                cur[i] += v
+        else:
+            dst[key] = dst.get(key, 0) + val
+
+    def _collect(self):
+        with self._reg:
+            self._fold_dead()
+            total = {}
+            for k, v in self._retired.items():
+                self._merge(total, k, v)
+            for _, sh in self._shards:
+                for k, v in list(sh.items()):
+                    self._merge(total, k, v)
+        return total
+
+    def snapshot(self):
+        """다른 프로세스로 보낼 수 있는 현재 값 (카운터/히스토그램 합계 + 게이지 평가값)"""
+        gauges = {}
+        for key, val in list(self._gauges.items()):
+            try:
+                gauges[key] = val() if callable(val) else val
+            except Exception:
+                continue
+        return {"series": self._collect(), "gauges": gauges}
+
+    def render(self, extra=()):
+        """extra: 다른 프로세스의 snapshot() 목록 — 같은 시리즈는 합산해 한 번에 출력"""
+        def fmt_labels(labels, more=()):
+            items = list(labels) + list(more)
+            if not items:
+                return ""
+            return "{" + ",".join(
+                f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"'
+                for k, v in items) + "}"
+
+        merged = self._collect()
+        gauges = {}
+        for key, val in list(self._gauges.items()):
+            try:
+                gauges[key] = val() if callable(val) else val
+            except Exception:
+                continue
+        for snap in extra:
+            for k, v in snap["series"].items():
+                self._merge(merged, k, v)
+            gauges.update({k: v for k, v in snap["gauges"].items() if v is not None})
+
+        series = {}
+        for (name, labels), val in merged.items():
+            series.setdefault(name, []).append((labels, val))
+        for (name, labels), val in gauges.items():
+            if val is not None:
+                series.setdefault(name, []).append((labels, float(val)))
+
+        out = []
+        for name in sorted(series):
+            kind, text = self._help.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, val in sorted(series[name]):
+                if isinstance(val, list):
+                    acc = 0
+                    for b, n in zip(_HIST_BUCKETS, val):
+                        acc += n
+                        out.append(f"{name}_bucket{fmt_labels(labels, [('le', b)])} {acc}")
+                    out.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {val[-2]}")
+                    out.append(f"{name}_count{fmt_labels(labels)} {val[-2]}")
+                    out.append(f"{name}_sum{fmt_labels(labels)} {val[-1]:.6f}")
+                else:
+                    out.append(f"{name}{fmt_labels(labels)} {val}")
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("tcm_stage_seconds",           "histogram", "단계별 소요 시간 (login/fetch/parse/filter)")
+metrics.describe("tcm_upstream_requests_total", "counter",   "업스트림 요청 수")
+metrics.describe("tcm_upstream_errors_total",   "counter",   "업스트림 오류 수")
+metrics.describe("tcm_relogins_total",          "counter",   "세션 만료로 인한 재로그인 수")
+metrics.describe("tcm_outside_range_total",     "counter",   "예약 가능 기간 밖 응답 수 (용인)")
+metrics.describe("tcm_cycle_seconds",           "histogram", "모니터링 1회 소요 시간")
+metrics.describe("tcm_last_cycle_seconds",      "gauge",     "마지막 모니터링 회차 소요 시간")
+metrics.describe("tcm_snapshot_age_seconds",    "gauge",     "공개 스냅샷 경과 시간")
+metrics.describe("tcm_first_snapshot_seconds",  "gauge",     "프로세스 시작 → 첫 (새) 스냅샷 공개까지 시간")
+metrics.describe("tcm_http_request_seconds",    "histogram", "대시보드/API 요청 처리 시간")
+metrics.describe("tcm_telegram_send_seconds",   "histogram", "텔레그램 전송 소요 시간")
+
+
+def _host(url):
+    return urlparse(url).netloc
+
+
+_request_gate = threading.local()   # .bucket: 이 스레드의 업스트림 요청마다 토큰을 받을 TokenBucket
+
+
+@contextmanager
+def request_budget(bucket):
+    """이 블록 안에서 현재 스레드가 보내는 업스트림 요청(로그인·워밍업·재시도 포함)마다 bucket 토큰 1개"""
+    prev, _request_gate.bucket = getattr(_request_gate, "bucket", None), bucket
+    try:
+        yield
+    finally:
+        _request_gate.bucket = prev
+
+
+@contextmanager
+def _upstream_call(city, base_url, stage, endpoint):
+    """업스트림 호출 1건: 요청 수 + 단계 시간 기록, 예외 시 오류 수 증가"""
+    bucket = getattr(_request_gate, "bucket", None)
+    if bucket is not None:
+        bucket.acquire()
+    host = _host(base_url)
+    metrics.inc("tcm_upstream_requests_total", city=city, host=host, endpoint=endpoint)
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc("tcm_upstream_errors_total", city=city, host=host, endpoint=endpoint)
+        raise
+    finally:
+        metrics.observe("tcm_stage_seconds", time.perf_counter() - t0,
+                        city=city, host=host, stage=stage)
+
+
+def _upstream_error(city, base_url, endpoint):
+    metrics.inc("tcm_upstream_errors_total", city=city, host=_host(base_url), endpoint=endpoint)
+
+
+# ─────────────────────────────────────────────────────────
+# 업스트림 요청 합치기 (singleflight) + 짧은 TTL 캐시
+# ─────────────────────────────────────────────────────────
+UPSTREAM_CACHE_TTL = float(os.environ.get("TCM_UPSTREAM_CACHE_TTL", "5"))   # 초, 0 = 합치기만
+
+metrics.describe("tcm_upstream_cache_total", "counter", "업스트림 캐시 결과 (hit/coalesced/miss)")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class CoalescingCache:
+    """같은 키의 동시 요청은 진행 중인 호출 1건을 공유하고, 성공 결과는 ttl 초 동안 재사용.
+
+    None(세션 만료/오류)은 캐시하지 않는다 — 호출자가 재로그인 후 다시 요청해야 하므로.
+    """
+
+    def __init__(self, ttl=UPSTREAM_CACHE_TTL, max_entries=4096):
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self._lock       = threading.Lock()
+        self._cache      = {}   # key → (저장 시각, 결과)
+        self._inflight   = {}   # key → _Flight
+
+    def get(self, key, fetch, city="", max_age=None):
+        """max_age: 이보다 오래된 캐시는 쓰지 않음 (0 = 항상 새로 요청하되 진행 중인 요청은 공유)"""
+        limit = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and time.monotonic() - hit[0] < limit:
+                metrics.inc("tcm_upstream_cache_total", city=city, result="hit")
+                return hit[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            metrics.inc("tcm_upstream_cache_total", city=city, result="coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        metrics.inc("tcm_upstream_cache_total", city=city, result="miss")
+        try:
+            flight.result = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and flight.result is not None and self.ttl > 0:
+                    if len(self._cache) >= self.max_entries:
+                        self._evict()
+                    self._cache[key] = (time.monotonic(), flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _evict(self):
+        now = time.monotonic()
+        for k in [k for k, (at, _) in self._cache.items() if now - at >= self.ttl]:
+            del self._cache[k]
+        if len(self._cache) >= self.max_entries:
+            self._cache.clear()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_upstream_cache = CoalescingCache()
 
 
 # ─────────────────────────────────────────────────────────
@@ -108,17 +569,285 @@ def _load_auth_section(section):
 
 
 def _load_accounts_from_env(prefix):
-    """연디 id{prefix}1~3 / pwd{prefix}1~3 환경변수에서 계정 목록 반환.
+    """id{prefix}N / pwd{prefix}N 환경변수(N = 1, 2, ... 개수 제한 없음, 번호순)에서 계정 목록 반환.
     하나라도 존재하면 해당 목록만 반환 (비어있으면 None 반환)."""
+    # 번호는 원래 문자열 그대로 써야 id{prefix}01 ↔ pwd{prefix}01 이 짝이 맞음 (정렬만 정수값, 같은 값이면 문자열순)
+    nums = sorted((m.group(1) for k in os.environ
+                   for m in [re.fullmatch(rf"id{prefix}(\d+)", k)] if m), key=lambda n: (int(n), n))
     accounts = []
-    for i in range(1, 4):
-        uid = os.environ.get(f"id{prefix}{i}", "").strip()
-        pwd = os.environ.get(f"pwd{prefix}{i}", "").strip()
+    for n in nums:
+        uid = os.environ.get(f"id{prefix}{n}", "").strip()
+        pwd = os.environ.get(f"pwd{prefix}{n}", "").strip()
         if uid and pwd:
             accounts.append({"username": uid, "password": pwd})
     return accounts if accounts else None
 
 
+# ─────────────────────────────────────────────────────────
+# 업스트림 트래픽 기록/재생 (HAR 유사 gzip NDJSON)
+# ─────────────────────────────────────────────────────────
+_SCRUB_FIELDS  = {"web_id", "web_pw", "id", "password"}
+_SCRUB_HEADERS = {"cookie", "set-cookie", "authorization"}
+
+_transport_adapter = None   # 설정 시 sn/yn 세션에 마운트 (TrafficRecorder / ReplayAdapter)
+
+
+def _scrub_body(body):
+    """폼 바디의 계정 필드를 *** 로 치환"""
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    pairs = parse_qsl(body, keep_blank_values=True)
+    if not pairs:
+        return body
+    return urlencode([(k, "***" if k in _SCRUB_FIELDS else v) for k, v in pairs])
+
+
+def _scrub_headers(headers):
+    return {k: ("***" if k.lower() in _SCRUB_HEADERS else v) for k, v in headers.items()}
+
+
+class TrafficRecorder(HTTPAdapter):
+    """실제 요청을 보내면서 요청/응답을 archive(gzip NDJSON)에 기록하는 어댑터"""
+
+    def __init__(self, path):
+        super().__init__(pool_maxsize=YN_WORKERS * 2)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._out   = gzip.open(path, "at", encoding="utf-8")
+        self._wlock = threading.RLock()   # SIGTERM 으로 기록 도중 종료돼도 같은 스레드의 close() 가 막히지 않도록
+        self.count  = 0
+        # gzip 끝 표시를 써야 다시 읽을 수 있음 → 종료 시 반드시 닫음 (SIGTERM 은 exit_on_sigterm)
+        atexit.register(self.close)
+
+    def send(self, request, **kwargs):
+        started = time.time()
+        t0      = time.perf_counter()
+        resp    = super().send(request, **kwargs)
+        content = resp.content
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"text": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+        entry = {
+            "startedDateTime": datetime.fromtimestamp(started, KST).isoformat(),
+            "time": round((time.perf_counter() - t0) * 1000, 2),
+            "request": {"method": request.method, "url": request.url,
+                        "headers": _scrub_headers(request.headers),
+                        "postData": _scrub_body(request.body)},
+            "response": {"status": resp.status_code, "url": resp.url,
+                         "headers": _scrub_headers(resp.headers), "content": body},
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._wlock:
+            if not self._out.closed:   # 종료 중에 끝난 요청은 기록하지 않음
+                self._out.write(line + "\n")
+                self._out.flush()
+                self.count += 1
+        return resp
+
+    def close(self):
+        super().close()
+        with self._wlock:
+            self._out.close()
+
+
+def load_traffic_archive(path):
+    """archive → 항목 목록. 비정상 종료로 끝이 잘린 archive 는 읽은 데까지만 사용
+    (줄마다 flush 하므로 잘린 지점 앞의 줄은 온전함)"""
+    entries = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+        except EOFError:
+            logging.warning(f"[REC] archive 끝이 잘림 ({path}) – 앞의 {len(entries)}건만 사용")
+    return entries
+
+
+class ReplayAdapter(BaseAdapter):
+    """기록된 archive 로 응답하는 어댑터 (네트워크 미사용).
+
+    매칭: (method, url, 스크럽된 바디) 정확 일치 → 실패 시 같은 (method, path) 항목 순환
+    (날짜가 바뀐 재생에서도 실제 페이로드를 돌려주기 위함). timing="recorded" 면 기록된 지연 재현.
+    """
+
+    def __init__(self, path, timing="fast"):
+        super().__init__()
+        self.timing  = timing
+        self.entries = load_traffic_archive(path)
+        self._exact  = {}
+        self._loose  = {}
+        self._lock   = threading.Lock()
+        self.served  = 0
+        self.misses  = 0
+        for e in self.entries:
+            req = e["request"]
+            self._exact.setdefault((req["method"], req["url"], req["postData"]), []).append(e)
+            self._loose.setdefault((req["method"], urlparse(req["url"]).path), []).append(e)
+        self._pos = {}
+
+    def _pick(self, key, table):
+        items = table.get(key)
+        if not items:
+            return None
+        with self._lock:
+            i = self._pos.get(key, 0)
+            self._pos[key] = i + 1
+        return items[i % len(items)]
+
+    def send(self, request, **kwargs):
+        body  = _scrub_body(request.body)
+        entry = (self._pick((request.method, request.url, body), self._exact)
+                 or self._pick((request.method, urlparse(request.url).path), self._loose))
+        resp  = requests.Response()
+        resp.request    = request
+        resp.connection = self
+        if entry is None:
+            self.misses += 1
+            resp.status_code = 404
+            resp.url         = request.url
+            resp._content    = b""
+            return resp
+        if self.timing == "recorded":
+            time.sleep(entry["time"] / 1000)
+        rec     = entry["response"]
+        content = rec["content"]
+        resp.status_code = rec["status"]
+        resp.url         = rec.get("url") or request.url
+        resp.headers     = CaseInsensitiveDict(rec["headers"])
+        resp.encoding    = get_encoding_from_headers(resp.headers)
+        resp._content    = (base64.b64decode(content["text"]) if content.get("encoding") == "base64"
+                            else content["text"].encode("utf-8"))
+        with self._lock:
+            self.served += 1
+        return resp
+
+    def close(self):
+        pass
+
+
+def _mount_transport(session):
+    if _transport_adapter is not None:
+        session.mount("http://", _transport_adapter)
+        session.mount("https://", _transport_adapter)
+    return session
+
+
+# ─────────────────────────────────────────────────────────
+# 파싱 실행기 (CPU 를 쓰는 파싱을 프로세스 풀로)
+# ─────────────────────────────────────────────────────────
+# 0 = 항상 호출한 스레드에서 파싱. N = 워커 프로세스 N개 (대상이 수백 개일 때 GIL 경합 완화)
+PARSE_PROCS        = int(os.environ.get("TCM_PARSE_PROCS", "0"))
+PARSE_INLINE_BYTES = 16 * 1024   # 이보다 작은 응답(묶음)은 전송 비용이 더 커서 그 자리에서 파싱
+
+metrics.describe("tcm_parse_jobs_total", "counter", "파싱 작업 수 (where=inline|pool)")
+
+
+def _sn_parse_packed(raw):
+    """(워커 프로세스) 성남 타임테이블 UTF-8 bytes → 압축 슬롯 [(court, time, is_available, name)]"""
+    _, slots = sn_parse_timetable(raw.decode("utf-8"))
+    return [(s["court"], s["time"], s["is_available"], s["reservation_name"]) for s in slots]
+
+
+def _sn_unpack(rows):
+    """_sn_parse_packed 결과 → sn_parse_timetable 과 같은 (available, all)"""
+    slots = [{"court": c, "time": t, "is_available": a, "reservation_name": n} for c, t, a, n in rows]
+    return [s for s in slots if s["is_available"]], slots
+
+
+def _yn_parse_list_packed(raw):
+    """(워커 프로세스) 용인 코트 목록 UTF-8 bytes → ([(resve_id, name, location)], 항목 수)"""
+    courts, n_items = yn_parse_court_list(raw.decode("utf-8"))
+    return [(c["resve_id"], c["name"], c["location"]) for c in courts], n_items
+
+
+class _ParseJob:
+    def __init__(self, executor, fn, raw, future):
+        self._ex, self._fn, self._raw, self.future = executor, fn, raw, future
+
+    def result(self):
+        try:
+            return self.future.result()
+        except BrokenProcessPool as e:   # 워커가 죽음 → 풀을 끄고 이 작업은 그 자리에서
+            self._ex._disable(e)
+            return self._ex._inline(self._fn, self._raw, None).result()
+
+
+class ParseExecutor:
+    """파싱 함수 fn(bytes) 를 프로세스 풀에서 실행. 풀이 없거나(procs=0), 입력이 작거나,
+    풀이 고장나면 호출한 스레드에서 바로 실행한다. fn 은 모듈 최상위 함수여야 한다 (spawn 으로 전달)."""
+
+    def __init__(self, procs=0, inline_bytes=PARSE_INLINE_BYTES):
+        self.procs        = procs
+        self.inline_bytes = inline_bytes
+        self._pool        = None
+        self._lock        = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None and self.procs > 0:
+                self._pool = ProcessPoolExecutor(max_workers=self.procs,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+                logging.info(f"[PARSE] 파싱 워커 프로세스 {self.procs}개")
+            return self._pool
+
+    def _disable(self, err=None):
+        with self._lock:
+            if self.procs and err is not None:
+                logging.warning(f"[PARSE] 파싱 프로세스 풀 고장 → 현재 프로세스에서 파싱: {err}")
+            self.procs, pool, self._pool = 0, self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _inline(self, fn, raw, labels):
+        fut = Future()
+        t0  = time.perf_counter()
+        try:
+            fut.set_result(fn(raw))
+        except Exception as e:
+            fut.set_exception(e)
+        if labels:
+            metrics.inc("tcm_parse_jobs_total", where="inline", **labels)
+            metrics.observe("tcm_stage_seconds", time.perf_counter() - t0, stage="parse", **labels)
+        return fut
+
+    def submit(self, fn, raw, city, inline=None):
+        """fn(raw) 작업 → _ParseJob (.result()). inline=None 이면 raw 크기로 결정"""
+        labels = {"city": city, "host": _host(SN_BASE_URL if city == "sungnam" else YN_BASE_URL)}
+        if inline is None:
+            inline = len(raw) < self.inline_bytes
+        pool = None if inline else self._get_pool()
+        if pool is not None:
+            t0 = time.perf_counter()
+            try:
+                fut = pool.submit(fn, raw)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._disable(e)
+            else:
+                metrics.inc("tcm_parse_jobs_total", where="pool", **labels)
+                fut.add_done_callback(lambda _: metrics.observe(
+                    "tcm_stage_seconds", time.perf_counter() - t0, stage="parse", **labels))
+                return _ParseJob(self, fn, raw, fut)
+        return _ParseJob(self, fn, raw, self._inline(fn, raw, labels))
+
+    def map(self, fn, raws, city):
+        """여러 입력을 한 번에. 묶음 전체가 작으면 전부 그 자리에서 파싱"""
+        inline = True if sum(len(r) for r in raws) < self.inline_bytes else None
+        jobs   = [self.submit(fn, r, city, inline) for r in raws]
+        return [j.result() for j in jobs]
+
+    def run(self, fn, raw, city):
+        return self.submit(fn, raw, city).result()
+
+    def shutdown(self):
+        self._disable()
+
+
+_parse_exec = ParseExecutor(PARSE_PROCS)
+
+
 # ═══════════════════════════════════════════════════════════
 # SUNGNAM 모니터링
 # ═══════════════════════════════════════════════════════════
@@ -170,44 +899,113 @@ def sn_make_session():
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
     )
-    return s
+    return _mount_transport(s)
 
 
 def sn_login(session, username, password):
+    """→ True 성공 / False 계정 거부 / None 일시 오류 (타임아웃·연결 오류·5xx 등, 쿨다운 대상 아님)"""
     try:
-        resp = session.post(
-            f"{SN_BASE_URL}/rest_loginCheck.do",
-            data={"web_id": username, "web_pw": password},
-            headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                     "X-Requested-With": "XMLHttpRequest",
-                     "Referer": f"{SN_BASE_URL}/login.do"},
-            verify=False, timeout=15,
-        )
-        return resp.status_code == 200 and resp.text.strip() == "success"
+        with _upstream_call("sungnam", SN_BASE_URL, "login", "rest_loginCheck.do"):
+            resp = session.post(
+                f"{SN_BASE_URL}/rest_loginCheck.do",
+                data={"web_id": username, "web_pw": password},
+                headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                         "X-Requested-With": "XMLHttpRequest",
+                         "Referer": f"{SN_BASE_URL}/login.do"},
+                verify=False, timeout=15,
+            )
+        if resp.status_code != 200:
+            logging.error(f"[SN] 로그인 응답 HTTP {resp.status_code}")
+            return None
+        return resp.text.strip() == "success"
     except Exception as e:
         logging.error(f"[SN] 로그인 오류: {e}")
-        return False
+        return None
+
 
+def sn_get_timetable(session, facility_id, date_str, max_age=None):
+    """같은 (시설, 날짜) 동시 요청은 1건으로 합치고 UPSTREAM_CACHE_TTL 동안 재사용"""
+    return _upstream_cache.get(("sungnam", facility_id, date_str),
+                               lambda: _sn_fetch_timetable(session, facility_id, date_str),
+                               city="sungnam", max_age=max_age)
 
-def sn_get_timetable(session, facility_id, date_str):
+
+def _sn_fetch_timetable(session, facility_id, date_str):
     try:
         parts          = date_str.split("-")
         formatted_date = f"{parts[0]}-{int(parts[1])}-{int(parts[2])}"
-        resp = session.post(
-            f"{SN_BASE_URL}/otherTimetable.do",
-            data={"facId": facility_id, "resdate": formatted_date},
-            headers={"Content-Type": "application/x-www-form-urlencoded",
-                     "Referer": f"{SN_BASE_URL}/reservationInfo.do"},
-            verify=False, timeout=15,
-        )
+        with _upstream_call("sungnam", SN_BASE_URL, "fetch", "otherTimetable.do"):
+            resp = session.post(
+                f"{SN_BASE_URL}/otherTimetable.do",
+                data={"facId": facility_id, "resdate": formatted_date},
+                headers={"Content-Type": "application/x-www-form-urlencoded",
+                         "Referer": f"{SN_BASE_URL}/reservationInfo.do"},
+                verify=False, timeout=15,
+            )
+        _count_request("sungnam", session)
         if resp.status_code == 200 and "login.do" not in resp.url and "로그인" not in resp.text:
             return resp.text
+        if resp.status_code != 200:
+            _upstream_error("sungnam", SN_BASE_URL, "otherTimetable.do")
         return None
     except Exception as e:
         logging.error(f"[SN] 타임테이블 오류 {facility_id} {date_str}: {e}")
         return None
 
 
+_book_fields_cache = {}   # TCM_*_BOOK_FIELDS 원문 → 파싱 결과
+
+
+def book_fields(spec, names):
+    """TCM_*_BOOK_FIELDS(JSON) → {필드명: 값 템플릿}. 비었거나 형식 오류 / names 에 없는 치환이면 ValueError"""
+    if spec in _book_fields_cache:
+        return _book_fields_cache[spec]
+    if not spec:
+        raise ValueError("미설정")
+    fields = json.loads(spec)   # JSONDecodeError 는 ValueError
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError("JSON 객체 {\"필드명\": \"값 템플릿\"} 이어야 합니다")
+    fields = {str(k): str(v) for k, v in fields.items()}
+    for k, v in fields.items():
+        try:
+            v.format(**dict.fromkeys(names, ""))
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"{k}: 치환 오류 {e} (사용 가능: {', '.join(names)})")
+    _book_fields_cache[spec] = fields
+    return fields
+
+
+def sn_submit_reservation(session, entry):
+    """슬롯 1건 예약 신청 → (성공 여부, 응답 메시지). 로그인 만료면 (None, ...)"""
+    if not SN_BOOK_PATH:
+        return False, "TCM_SN_BOOK_PATH 미설정"
+    try:
+        fields = book_fields(SN_BOOK_FIELDS, SN_BOOK_VARS)
+    except ValueError as e:
+        return False, f"TCM_SN_BOOK_FIELDS {e}"
+    parts = entry["date"].split("-")
+    values = {"fac_id": entry["fac_id"], "date": entry["date"],
+              "resdate": f"{parts[0]}-{int(parts[1])}-{int(parts[2])}",
+              "court": entry["court"], "court_no": re.sub(r"\D", "", entry["court"]), "time": entry["time"]}
+    try:
+        with _upstream_call("sungnam", SN_BASE_URL, "book", SN_BOOK_PATH):
+            resp = session.post(
+                f"{SN_BASE_URL}/{SN_BOOK_PATH}",
+                data={k: v.format(**values) for k, v in fields.items()},
+                headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                         "X-Requested-With": "XMLHttpRequest",
+                         "Referer": f"{SN_BASE_URL}/reservationInfo.do"},
+                verify=False, timeout=10,
+            )
+        _count_request("sungnam", session)
+    except Exception as e:
+        return False, f"요청 오류: {e}"
+    text = resp.text.strip()
+    if "login.do" in resp.url or "로그인" in text:
+        return None, "로그인 필요"
+    return resp.status_code == 200 and text == "success", text[:200]
+
+
 def sn_parse_timetable(html):
     if not html:
         return [], []
@@ -272,75 +1070,121 @@ def sn_time_match(slot_time, target_time):
 _DOW_KO = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
 
 
-def sn_run_once(accounts, facilities):
-    """성남 모니터링 1회. → (available_list, all_courts_list)"""
-    # 로그인
-    session   = sn_make_session()
-    logged_in = False
-    for acc in accounts:
-        if sn_login(session, acc["username"], acc["password"]):
-            logging.info(f"[SN] ✅ 로그인: {acc['username']}")
-            logged_in = True
-            break
-    if not logged_in:
-        logging.error("[SN] ❌ 모든 계정 로그인 실패")
-        return [], []
+def sn_build_entries(fac, date, html, parsed=None):
+    """타임테이블 HTML 1건 → (시간대 조건에 맞는 예약가능 목록, 전체 슬롯 목록)
+    parsed: 이미 파싱한 sn_parse_timetable 결과 (파싱 실행기 사용 시, html 은 무시)"""
+    date_str   = date.strftime("%Y-%m-%d")
+    dow        = _DOW_KO[date.weekday()]
+    time_slots = fac["weekend_times"] if date.weekday() >= 5 else fac["weekday_times"]
+    if parsed is None:
+        with metrics.timer("tcm_stage_seconds", city="sungnam", host=_host(SN_BASE_URL), stage="parse"):
+            parsed = sn_parse_timetable(html)
+    avail_slots, all_slot_list = parsed
+
+    courts = []
+    for slot in all_slot_list:
+        courts.append({
+            "date":             date_str,
+            "day_of_week":      dow,
+            "facility_name":    fac["name"],
+            "fac_id":           fac["id"],
+            "court":            slot["court"],
+            "time":             slot["time"],
+            "is_available":     slot["is_available"],
+            "reservation_name": slot["reservation_name"],
+        })
+
+    t_filter  = time.perf_counter()
+    available = []
+    for slot in avail_slots:
+        if "ALL" in time_slots or any(sn_time_match(slot["time"], t) for t in time_slots):
+            available.append({
+                "date":          date_str,
+                "day_of_week":   dow,
+                "facility_name": fac["name"],
+                "fac_id":        fac["id"],
+                "court":         slot["court"],
+                "time":          slot["time"],
+            })
+    metrics.observe("tcm_stage_seconds", time.perf_counter() - t_filter,
+                    city="sungnam", host=_host(SN_BASE_URL), stage="filter")
+    return available, courts
+
+
+def sn_run_once(accounts, facilities, include_target=None, on_date_done=None, budget=None, on_target_done=None):
+    """성남 모니터링 1회. → (available_list, all_courts_list) / 로그인 가능한 계정이 없으면 None
+    accounts:       계정 풀에 더할 계정 (auth.txt/환경변수 계정은 풀이 직접 읽음)
+    include_target: (fac_id, YYYY-MM-DD) → 스캔 여부 (샤딩/부분 재스캔, None 이면 전부)
+    on_date_done:   날짜 1개 완료마다 (지금까지의 available, all_courts) 호출
+    budget:         CycleScheduler — 우선순위 순서로 스캔하고 예산을 넘기면 먼 날짜는 다음 회차로
+    on_target_done: (시설, 날짜) 1건 완료마다 (fac_id, YYYY-MM-DD, available, courts) 호출"""
+    pool = _session_pools["sungnam"]
+    pool.creds.add([(a["username"], a["password"]) for a in accounts])
+    with pool.lease() as holder:
+        if holder[0] is None:
+            logging.error("[SN] ❌ 로그인 가능한 계정 없음 (모두 실패/쿨다운)")
+            return None
+        logging.info(f"[SN] ✅ 세션: {holder[0].tcm_account}")
+        return _sn_scan(holder, facilities, include_target, on_date_done, budget, on_target_done)
 
+
+def _sn_scan(holder, facilities, include_target, on_date_done=None, budget=None, on_target_done=None):
     all_available = []
     all_courts    = []
     today         = datetime.now(KST)
 
-    for i in range(4):
+    def _take(fac, date, job, t_fetched):
+        fac_avail, fac_courts = sn_build_entries(fac, date, None, _sn_unpack(job.result()))
+        if _autohold:
+            _autohold.offer("sungnam", [c for c in fac_courts if c["is_available"]], t_fetched)
+        all_available.extend(fac_avail)
+        all_courts.extend(fac_courts)
+        _log_sn.debug("[SN] %s %s: 예약가능 %d개", fac["name"], date.strftime("%Y-%m-%d"), len(fac_avail))
+        if on_target_done:
+            on_target_done(fac["id"], date.strftime("%Y-%m-%d"), fac_avail, fac_courts)
+
+    leads = range(SN_OPEN_DAYS)
+    if budget:   # 가까운 날짜 → 지난 회차에 미룬 날짜 → 나머지 먼 날짜
+        leads = sorted(leads, key=lambda i: min(
+            (budget.priority(f["id"], (today + timedelta(days=i)).strftime("%Y-%m-%d"), i) for f in facilities),
+            default=(0, 0, i)))
+
+    for i in leads:
         date       = today + timedelta(days=i)
         date_str   = date.strftime("%Y-%m-%d")
         is_weekend = date.weekday() >= 5
-        dow        = _DOW_KO[date.weekday()]
+        pending    = []   # 파싱 워커에 보낸 (fac, job, t_fetched) — 다음 응답을 받는 동안 파싱
 
         for fac in facilities:
             time_slots = fac["weekend_times"] if is_weekend else fac["weekday_times"]
             if not time_slots:
                 continue
+            if include_target and not include_target(fac["id"], date_str):
+                continue
+            if budget and not budget.allows(fac["id"], date_str, i):
+                continue
 
-            html = sn_get_timetable(session, fac["id"], date_str)
-            if html is None:
-                # 세션 만료 → 재로그인
-                session = sn_make_session()
-                for acc in accounts:
-                    if sn_login(session, acc["username"], acc["password"]):
-                        break
-                html = sn_get_timetable(session, fac["id"], date_str)
+            html = sn_get_timetable(holder[0], fac["id"], date_str)
+            if html is None and _session_pools["sungnam"].relogin(holder) is not None:
+                # 세션 만료 → 다른 계정일 수 있는 새 세션으로 재시도
+                html = sn_get_timetable(holder[0], fac["id"], date_str)
+            t_fetched = time.perf_counter()
 
             if not html:
                 logging.warning(f"[SN] 타임테이블 없음: {fac['name']} {date_str}")
                 continue
 
-            avail_slots, all_slot_list = sn_parse_timetable(html)
-
-            for slot in all_slot_list:
-                all_courts.append({
-                    "date":             date_str,
-                    "day_of_week":      dow,
-                    "facility_name":    fac["name"],
-                    "fac_id":           fac["id"],
-                    "court":            slot["court"],
-                    "time":             slot["time"],
-                    "is_available":     slot["is_available"],
-                    "reservation_name": slot["reservation_name"],
-                })
-
-            for slot in avail_slots:
-                if "ALL" in time_slots or any(sn_time_match(slot["time"], t) for t in time_slots):
-                    all_available.append({
-                        "date":          date_str,
-                        "day_of_week":   dow,
-                        "facility_name": fac["name"],
-                        "court":         slot["court"],
-                        "time":          slot["time"],
-                    })
-
-            logging.info(f"[SN] {fac['name']} {date_str}: 예약가능 "
-                         f"{sum(1 for s in avail_slots if 'ALL' in time_slots or any(sn_time_match(s['time'], t) for t in time_slots))}개")
-            time.sleep(0.2)
+            job = _parse_exec.submit(_sn_parse_packed, html.encode("utf-8"), "sungnam")
+            if _autohold:   # 자동 예약은 지연이 중요 → 파싱 끝나는 대로 바로 처리
+                _take(fac, date, job, t_fetched)
+            else:
+                pending.append((fac, job, t_fetched))
+            time.sleep(SN_REQUEST_GAP)
+
+        for fac, job, t_fetched in pending:
+            _take(fac, date, job, t_fetched)
+        if on_date_done:
+            on_date_done(all_available, all_courts)
 
     return all_available, all_courts
 
@@ -407,12 +1251,13 @@ def send_telegram(message_text):
         return
     try:
         url = f"https://api.telegram.org/bot{_tg_bot_token}/sendMessage"
-        resp = requests.post(url, json={
-            "chat_id": _tg_chat_id,
-            "text": message_text,
-            "parse_mode": "MarkdownV2",
-            "disable_web_page_preview": True,
-        }, timeout=10, verify=False)
+        with metrics.timer("tcm_telegram_send_seconds"):
+            resp = requests.post(url, json={
+                "chat_id": _tg_chat_id,
+                "text": message_text,
+                "parse_mode": "MarkdownV2",
+                "disable_web_page_preview": True,
+            }, timeout=10, verify=False)
         if resp.status_code == 200 and resp.json().get("ok"):
             logging.info("[TG] 알림 전송 성공")
         else:
@@ -511,16 +1356,33 @@ def yn_load_notify_table():
     return rules
 
 
+def _court_key(c):
+    """슬롯 1건의 비교용 문자열 (_courts_key 의 한 항목)"""
+    return f"{c.get('date','')}/{c.get('facility_name', c.get('court_name',''))}/{c.get('court', c.get('time',''))}/{c.get('time','')}"
+
+
 def _courts_key(courts):
     """예약 가능 코트 목록을 비교용 문자열로 변환"""
     return "|".join(
-        f"{c.get('date','')}/{c.get('facility_name', c.get('court_name',''))}/{c.get('court', c.get('time',''))}/{c.get('time','')}"
+        _court_key(c)
         for c in sorted(courts, key=lambda x: (
             x.get('date',''), x.get('facility_name', x.get('court_name','')),
             x.get('court', ''), x.get('time','')))
     )
 
 
+_seen_memo = {}   # id(prev_key_holder) → (마지막 알림 키, 그 키의 슬롯 집합)
+
+
+def _seen_keys(holder):
+    """알림 dedupe 키 holder = [last_key] 의 슬롯 집합 (키가 바뀔 때만 다시 나눔)"""
+    key  = holder[0]
+    memo = _seen_memo.get(id(holder))
+    if memo is None or memo[0] is not key:
+        memo = _seen_memo[id(holder)] = (key, set(key.split("|")) if key else set())
+    return memo[1]
+
+
 # ═══════════════════════════════════════════════════════════
 # YONGIN 모니터링
 # ═══════════════════════════════════════════════════════════
@@ -535,18 +1397,23 @@ def yn_make_session():
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
     )
-    return s
+    return _mount_transport(s)
 
 
 def yn_group_login(session, user_id, password):
+    """→ True 성공 / False 계정 거부 / None 일시 오류 (타임아웃·연결 오류·5xx 등, 쿨다운 대상 아님)"""
     try:
-        resp = session.post(
-            f"{YN_BASE_URL}/groupLogin.do",
-            data={"id": user_id, "password": password},
-            headers={"Referer": f"{YN_BASE_URL}/loginForm.do?groupYn=Y",
-                     "Content-Type": "application/x-www-form-urlencoded"},
-            allow_redirects=True, timeout=15,
-        )
+        with _upstream_call("yongin", YN_BASE_URL, "login", "groupLogin.do"):
+            resp = session.post(
+                f"{YN_BASE_URL}/groupLogin.do",
+                data={"id": user_id, "password": password},
+                headers={"Referer": f"{YN_BASE_URL}/loginForm.do?groupYn=Y",
+                         "Content-Type": "application/x-www-form-urlencoded"},
+                allow_redirects=True, timeout=15,
+            )
+        if resp.status_code != 200:
+            logging.error(f"[YN] 로그인 응답 HTTP {resp.status_code}")
+            return None
         msgs = re.findall(r'decodeURIComponent\("([^"]+)"\)', resp.text)
         if msgs:
             msg = unquote(msgs[0])
@@ -559,7 +1426,7 @@ def yn_group_login(session, user_id, password):
         return False
     except Exception as e:
         logging.error(f"[YN] 로그인 오류: {e}")
-        return False
+        return None
 
 
 def yn_load_credentials():
@@ -570,6 +1437,176 @@ def yn_load_credentials():
     return [(a["username"], a["password"]) for a in _load_auth_section("yongin")]
 
 
+# 코트 목록 파서: fast = 필요한 필드만 뽑는 이벤트 파서 (이상 구조면 bs4 로 폴백), bs4 = 항상 BeautifulSoup
+YN_LIST_PARSER = os.environ.get("TCM_YN_LIST_PARSER", "fast")
+
+metrics.describe("tcm_yn_list_parse_total", "counter", "용인 코트 목록 페이지 파싱 (parser=fast|bs4|fallback)")
+
+
+class _YnCourtListParser(HTMLParser):
+    """li.reserve_box_item 에서 resveId 링크 / .reserve_title / .reserve_position 텍스트만 추출.
+    DOM 을 만들지 않고, 팝업(div.popup/.layer/.layer_wrap) 안은 통째로 건너뛴다.
+    bs4 와 결과가 달라질 수 있는 구조(항목 li 중첩)를 만나면 broken = True."""
+
+    _SKIP  = {"popup", "layer", "layer_wrap"}
+    _VOID  = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+              "param", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items  = []     # [(href | None, 제목 조각들, 위치 조각들, 제목 있음, 위치 있음)]
+        self.broken = False
+        self._skip  = 0      # 팝업 div 안 깊이
+        self._item  = None
+        self._li    = 0      # 항목 li 안 li 깊이
+        self._open  = []     # 항목 안 열린 태그 [(tag, role)] role: "title" / "pos" / None
+        self._text  = []     # 아직 처리 안 한 텍스트 조각 (태그 경계에서 한 문자열로 합침)
+
+    def _flush(self):
+        if not self._text:
+            return
+        text, self._text = "".join(self._text).strip(), []
+        if not text or self._item is None:
+            return
+        roles = {r for _, r in self._open}
+        if "pos" in roles:
+            self._item[2].append(text)
+        elif "title" in roles:
+            self._item[1].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if self._skip:
+            if tag == "div":
+                self._skip += 1
+            return
+        cls = set((dict(attrs).get("class") or "").split())
+        if tag == "div" and cls & self._SKIP:
+            self._skip = 1
+            return
+        if tag == "li":
+            if "reserve_box_item" in cls:
+                if self._item is not None:
+                    self.broken = True
+                    return
+                self._item, self._li, self._open = [None, [], [], False, False], 1, []
+                return
+            if self._item is not None:
+                self._li += 1
+        if self._item is None or tag in self._VOID:
+            return
+        if tag == "a" and self._item[0] is None:
+            href = dict(attrs).get("href") or ""
+            if "resveId" in href:
+                self._item[0] = href
+        role = None
+        if "reserve_position" in cls and not self._item[4]:
+            role, self._item[4] = "pos", True
+        elif "reserve_title" in cls and not self._item[3]:
+            role, self._item[3] = "title", True
+        self._open.append((tag, role))
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> 처럼 닫힌 시작 태그는 bs4 와 같이 빈 요소로 취급
+        self.handle_starttag(tag, attrs)
+        if tag not in self._VOID:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if self._skip:
+            if tag == "div":
+                self._skip -= 1
+            return
+        if self._item is None:
+            return
+        if tag == "li":
+            self._li -= 1
+            if self._li == 0:
+                self._finish()
+                return
+        for i in range(len(self._open) - 1, -1, -1):   # 짝이 맞는 가장 가까운 태그까지 닫음
+            if self._open[i][0] == tag:
+                del self._open[i:]
+                break
+
+    def handle_data(self, data):
+        # script/style 내용은 bs4 get_text() 에도 포함되지 않음
+        if not self._skip and not self.cdata_elem:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush()   # 주석 양옆 텍스트는 bs4 에서 별도 문자열 (각각 strip)
+
+    handle_decl = handle_pi = handle_comment
+
+    def _finish(self):
+        self.items.append(tuple(self._item))
+        self._item, self._open = None, []
+
+    def close(self):
+        super().close()
+        self._flush()
+        if self._item is not None:
+            self._finish()
+
+
+def _yn_court_entries(raw_items):
+    courts = []
+    for href, title, position, has_title, _ in raw_items:
+        m = re.search(r"resveId=(\d+)", href or "")
+        if not m:
+            continue
+        courts.append({"resve_id": m.group(1), "name": "".join(title) if has_title else "알 수 없음",
+                       "location": "".join(position)})
+    return courts
+
+
+def yn_parse_court_list_bs4(html):
+    """BeautifulSoup 기준 구현 → (courts, 항목 수)"""
+    from bs4 import BeautifulSoup   # 폴백/비교용으로만 쓰므로 필요할 때 import
+    soup = BeautifulSoup(html, "html.parser")
+    for el in soup.select("div.popup, div.layer, div.layer_wrap"):
+        el.decompose()
+    items  = soup.select("li.reserve_box_item")
+    courts = []
+    for item in items:
+        link = item.select_one('a[href*="resveId"]')
+        if not link:
+            continue
+        m = re.search(r"resveId=(\d+)", link.get("href", ""))
+        if not m:
+            continue
+        resve_id     = m.group(1)
+        title_div    = item.select_one(".reserve_title")
+        position_div = item.select_one(".reserve_position")
+        location     = position_div.get_text(strip=True) if position_div else ""
+        if position_div:
+            position_div.decompose()
+        court_name = title_div.get_text(strip=True) if title_div else "알 수 없음"
+        courts.append({"resve_id": resve_id, "name": court_name, "location": location})
+    return courts, len(items)
+
+
+def yn_parse_court_list(html):
+    """용인 코트 목록 페이지 1장 → (courts, 항목 수). 이벤트 파서로 필요한 필드만 뽑고,
+    구조가 예상과 다르면 BeautifulSoup 구현으로 폴백"""
+    if YN_LIST_PARSER != "bs4":
+        try:
+            p = _YnCourtListParser()
+            p.feed(html)
+            p.close()
+            if not p.broken:
+                metrics.inc("tcm_yn_list_parse_total", city="yongin", parser="fast")
+                return _yn_court_entries(p.items), len(p.items)
+        except Exception as e:
+            _log_yn.debug("[YN] 코트 목록 빠른 파서 실패 → bs4: %s", e)
+        metrics.inc("tcm_yn_list_parse_total", city="yongin", parser="fallback")
+    else:
+        metrics.inc("tcm_yn_list_parse_total", city="yongin", parser="bs4")
+    return yn_parse_court_list_bs4(html)
+
+
 def yn_fetch_courts():
     sess    = yn_make_session()
     courts  = []
@@ -579,57 +1616,56 @@ def yn_fetch_courts():
                f"?key=4292&searchResveType=GNRLRESVE"
                f"&pageUnit={YN_PAGE_SIZE}&pageIndex={page_idx}")
         try:
-            resp = sess.get(url, timeout=20)
-            resp.raise_for_status()
+            with _upstream_call("yongin", YN_BASE_URL, "fetch", "selectFcltyRceptResveListU.do"):
+                resp = sess.get(url, timeout=20)
+                resp.raise_for_status()
         except Exception as e:
             logging.warning(f"[YN] 코트 목록 요청 실패: {e}")
             break
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for el in soup.select("div.popup, div.layer, div.layer_wrap"):
-            el.decompose()
-        items = soup.select("li.reserve_box_item")
-        if not items:
+        rows, n_items = _parse_exec.run(_yn_parse_list_packed, resp.text.encode("utf-8"), "yongin")
+        if not n_items:
             break
-        for item in items:
-            link = item.select_one('a[href*="resveId"]')
-            if not link:
-                continue
-            m = re.search(r"resveId=(\d+)", link.get("href", ""))
-            if not m:
-                continue
-            resve_id     = m.group(1)
-            title_div    = item.select_one(".reserve_title")
-            position_div = item.select_one(".reserve_position")
-            location     = position_div.get_text(strip=True) if position_div else ""
-            if position_div:
-                position_div.decompose()
-            court_name = title_div.get_text(strip=True) if title_div else "알 수 없음"
-            courts.append({"resve_id": resve_id, "name": court_name, "location": location})
-        if len(items) < YN_PAGE_SIZE:
+        courts.extend({"resve_id": r, "name": n, "location": loc} for r, n, loc in rows)
+        if n_items < YN_PAGE_SIZE:
             break
         page_idx += 1
-        time.sleep(0.3)
+        time.sleep(YN_PAGE_GAP)
     return [c for c in courts if "테니스" in c["name"]]
 
 
-def yn_get_time_slots(session, resve_id, apply_url, date_yyyymmdd):
+def yn_get_time_slots(session, resve_id, apply_url, date_yyyymmdd, max_age=None):
+    """같은 (코트, 날짜) 동시 요청은 1건으로 합치고 UPSTREAM_CACHE_TTL 동안 재사용"""
+    return _upstream_cache.get(("yongin", resve_id, date_yyyymmdd),
+                               lambda: _yn_fetch_time_slots(session, resve_id, apply_url, date_yyyymmdd),
+                               city="yongin", max_age=max_age)
+
+
+def _yn_fetch_time_slots(session, resve_id, apply_url, date_yyyymmdd):
     try:
-        r = session.post(
-            YN_TIME_API,
-            data={"dateVal": date_yyyymmdd, "resveId": resve_id},
-            headers={"Referer": apply_url,
-                     "X-Requested-With": "XMLHttpRequest",
-                     "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
-            timeout=15,
-        )
+        with _upstream_call("yongin", YN_BASE_URL, "fetch",
+                            "selectRegistTimeByChosenDateFcltyRceptResveApply.do"):
+            r = session.post(
+                YN_TIME_API,
+                data={"dateVal": date_yyyymmdd, "resveId": resve_id},
+                headers={"Referer": apply_url,
+                         "X-Requested-With": "XMLHttpRequest",
+                         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+                timeout=15,
+            )
+        _count_request("yongin", session)
         if r.status_code != 200:
+            _upstream_error("yongin", YN_BASE_URL, "selectRegistTimeByChosenDateFcltyRceptResveApply.do")
             return None
+        t_parse   = time.perf_counter()
         data      = r.json()
         available = [{"time": s.get("timeContent", "")} for s in data.get("resveTmList", [])]
         all_slots = [{"time": s.get("useTm", ""), "status": s.get("rsvctmStts", ""),
                       "name": s.get("frstRegisterNmApply", "")}
                      for s in data.get("fcltRceptRsvctmTime", [])]
+        metrics.observe("tcm_stage_seconds", time.perf_counter() - t_parse,
+                        city="yongin", host=_host(YN_BASE_URL), stage="parse")
         if not all_slots and not available:
+            metrics.inc("tcm_outside_range_total", city="yongin")
             return {"available": [], "all": [], "date_str": "", "day_of_week": "",
                     "outside_range": True}
         return {"date_str": data.get("formatedDate", ""),
@@ -640,63 +1676,189 @@ def yn_get_time_slots(session, resve_id, apply_url, date_yyyymmdd):
         return None
 
 
-def yn_scan_one_court(court, target_dates, sess_holder, creds, cred_idx):
+metrics.describe("tcm_yn_warmups_total",      "counter", "용인 신청 페이지 워밍업 (result=fetched|skipped|rewarm)")
+metrics.describe("tcm_yn_warmup_bytes_total", "counter", "용인 워밍업 GET 으로 받은 바이트")
+
+# 재워밍업으로 살아난 조회가 YN_WARM_FIX_WINDOW 초 안에 연달아 이만큼 쌓이면 사이트가 마지막 방문 코트만
+# 기억한다고 보고 "마지막으로 방문한 코트" 일 때만 워밍업을 생략 (조회 실패 → 재워밍업 왕복 방지).
+# 재워밍업해도 실패한 조회(일시 장애)는 연속 횟수를 끊고, YN_WARM_LAST_RESET 초 동안 복구가 없으면 해제
+YN_WARM_LAST_AFTER = 3
+YN_WARM_FIX_WINDOW = 300.0
+YN_WARM_LAST_RESET = 1800.0
+_yn_warm_lock      = threading.Lock()
+_yn_warm_fixes     = deque()   # 연속된 재워밍업 복구 시각
+_yn_warm_fix_at    = 0.0       # 마지막 재워밍업 복구 시각
+_yn_warm_last_only = False
+
+
+def _yn_warm(session, resve_id, apply_url, force=False):
+    """시간 API 의 Referer 컨텍스트용 신청 페이지 GET. 이 세션이 이미 방문한 코트면 생략.
+    → 세션을 계속 쓸 수 있는지 (로그인 페이지로 튕기면 False)"""
+    if session is None:
+        return False
+    warmed = session.__dict__.setdefault("tcm_warmed", set())   # 이 세션이 방문한 resveId
+    fresh  = (getattr(session, "tcm_warm_last", None) == resve_id) if _yn_warm_last_mode() \
+        else resve_id in warmed
+    if fresh and not force:
+        metrics.inc("tcm_yn_warmups_total", city="yongin", result="skipped")
+        return True
+    metrics.inc("tcm_yn_warmups_total", city="yongin", result="rewarm" if force else "fetched")
+    try:
+        with _upstream_call("yongin", YN_BASE_URL, "fetch", "selectFcltyRceptResveApplyListU.do"):
+            resp = session.get(apply_url, timeout=15)
+        _count_request("yongin", session)
+    except Exception:
+        return True   # 워밍업 실패는 무시 (기존 동작) — 시간 API 실패 시 다시 시도
+    metrics.inc("tcm_yn_warmup_bytes_total", len(resp.content), city="yongin")
+    if "loginForm" in resp.url:
+        return False
+    warmed.add(resve_id)
+    session.tcm_warm_last = resve_id
+    return True
+
+
+def _yn_warm_retried(fixed):
+    """재워밍업 후 재시도 결과. fixed=True: 조회가 살아남 = 생략했던 워밍업이 필요했음,
+    False: 그래도 실패 = 워밍업과 무관한 장애 → 연속 횟수 초기화"""
+    global _yn_warm_fix_at, _yn_warm_last_only
+    now = time.time()
+    with _yn_warm_lock:
+        if not fixed:
+            _yn_warm_fixes.clear()
+            return
+        _yn_warm_fix_at = now
+        while _yn_warm_fixes and now - _yn_warm_fixes[0] > YN_WARM_FIX_WINDOW:
+            _yn_warm_fixes.popleft()
+        _yn_warm_fixes.append(now)
+        if len(_yn_warm_fixes) < YN_WARM_LAST_AFTER or _yn_warm_last_only:
+            return
+        _yn_warm_last_only = True
+    logging.warning("[YN] 신청 페이지 컨텍스트가 마지막 방문 코트만 유지됨 → 코트가 바뀔 때마다 워밍업")
+
+
+def _yn_warm_last_mode():
+    """'마지막 방문 코트만' 모드인지. YN_WARM_LAST_RESET 초 동안 재워밍업 복구가 없으면 해제"""
+    global _yn_warm_last_only
+    if not _yn_warm_last_only or time.time() - _yn_warm_fix_at <= YN_WARM_LAST_RESET:
+        return _yn_warm_last_only
+    with _yn_warm_lock:
+        if not _yn_warm_last_only:
+            return False
+        _yn_warm_last_only = False
+        _yn_warm_fixes.clear()
+    logging.info(f"[YN] {YN_WARM_LAST_RESET / 60:.0f}분간 재워밍업 복구 없음 → 방문한 코트 워밍업 생략 모드로 복귀")
+    return False
+
+
+def yn_fetch_court_date(holder, resve_id, apply_url, date_yyyymmdd, max_age=None):
+    """holder[0] 세션으로 (코트, 날짜) 시간대 조회. 실패하면 워밍업을 다시 한 뒤 재시도하고,
+    그래도 실패(세션 만료)면 재로그인한 세션으로 워밍업 후 재시도. 워밍업 자체는 호출 측 몫."""
+    result = yn_get_time_slots(holder[0], resve_id, apply_url, date_yyyymmdd, max_age=max_age)
+    if result is None and _yn_warm(holder[0], resve_id, apply_url, force=True):
+        result = yn_get_time_slots(holder[0], resve_id, apply_url, date_yyyymmdd, max_age=max_age)
+        _yn_warm_retried(result is not None)
+    if result is None and _session_pools["yongin"].relogin(holder) is not None:
+        _yn_warm(holder[0], resve_id, apply_url)
+        result = yn_get_time_slots(holder[0], resve_id, apply_url, date_yyyymmdd, max_age=max_age)
+    return result
+
+
+def yn_scan_one_court(court, target_dates, sess_holder, budget=None):
     resve_id  = court["resve_id"]
     apply_url = (f"{YN_BASE_URL}/sports/selectFcltyRceptResveApplyListU.do"
                  f"?key=4292&searchResveId={resve_id}")
-    try:
-        sess_holder[0].get(apply_url, timeout=15)
-    except Exception:
-        pass
+    _yn_warm(sess_holder[0], resve_id, apply_url)
 
     available  = []
     court_data = []
+    today      = datetime.now(KST).date()
 
     for target_date in target_dates:
         date_yyyymmdd = target_date.strftime("%Y%m%d")
-        result = yn_get_time_slots(sess_holder[0], resve_id, apply_url, date_yyyymmdd)
-        if result is None:
-            for i in range(len(creds)):
-                uid, pw  = creds[(cred_idx + i) % len(creds)]
-                new_sess = yn_make_session()
-                if yn_group_login(new_sess, uid, pw):
-                    sess_holder[0] = new_sess
-                    result = yn_get_time_slots(sess_holder[0], resve_id, apply_url, date_yyyymmdd)
-                    break
+        if budget and not budget.allows(resve_id, date_yyyymmdd, (target_date.date() - today).days):
+            continue
+        result    = yn_fetch_court_date(sess_holder, resve_id, apply_url, date_yyyymmdd)
+        t_fetched = time.perf_counter()
         if result is None or result.get("outside_range"):
             continue
 
-        date_str    = result["date_str"]
-        day_of_week = result["day_of_week"]
-        merged      = {}
-
-        for slot in result["available"]:
-            t          = slot["time"]
-            merged[t]  = {"resve_id": resve_id, "court_name": court["name"],
-                          "location": court["location"], "date": date_str,
-                          "day_of_week": day_of_week, "time": t,
-                          "status": "", "is_available": True}
-        for slot in result["all"]:
-            t = slot["time"]
-            if t not in merged:
-                merged[t] = {"resve_id": resve_id, "court_name": court["name"],
-                             "location": court["location"], "date": date_str,
-                             "day_of_week": day_of_week, "time": t,
-                             "status": slot["status"], "is_available": False}
-
-        for entry in merged.values():
+        n_avail = len(available)
+        for entry in yn_merge_slots(court, result):
             court_data.append(entry)
             if entry["is_available"]:
                 available.append(entry)
+        if _autohold and len(available) > n_avail:
+            _autohold.offer("yongin", available[n_avail:], t_fetched)
 
     return available, court_data
 
 
+def yn_submit_reservation(session, entry):
+    """슬롯 1건 예약 신청 → (성공 여부, 응답 메시지). 로그인 만료면 (None, ...)"""
+    if not YN_BOOK_PATH:
+        return False, "TCM_YN_BOOK_PATH 미설정"
+    try:
+        fields = book_fields(YN_BOOK_FIELDS, YN_BOOK_VARS)
+    except ValueError as e:
+        return False, f"TCM_YN_BOOK_FIELDS {e}"
+    values = {"resve_id": entry["resve_id"], "date": entry["date"],
+              "date_val": entry["date"].replace("-", ""), "time": entry["time"]}
+    apply_url = (f"{YN_BASE_URL}/sports/selectFcltyRceptResveApplyListU.do"
+                 f"?key=4292&searchResveId={entry['resve_id']}")
+    try:
+        with _upstream_call("yongin", YN_BASE_URL, "book", YN_BOOK_PATH):
+            resp = session.post(
+                f"{YN_BASE_URL}/{YN_BOOK_PATH}",
+                data={k: v.format(**values) for k, v in fields.items()},
+                headers={"Referer": apply_url,
+                         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+                timeout=10,
+            )
+        _count_request("yongin", session)
+    except Exception as e:
+        return False, f"요청 오류: {e}"
+    if "loginForm" in resp.url or "loginForm" in resp.text:
+        return None, "로그인 필요"
+    msgs = re.findall(r'decodeURIComponent\("([^"]+)"\)', resp.text)
+    msg  = unquote(msgs[0]) if msgs else resp.text.strip()[:200]
+    return resp.status_code == 200 and "성공" in msg, msg
+
+
+def yn_merge_slots(court, result):
+    """yn_get_time_slots 결과 1건 → 시간대별 슬롯 목록 (예약가능 목록이 우선)"""
+    resve_id    = court["resve_id"]
+    date_str    = result["date_str"]
+    day_of_week = result["day_of_week"]
+    merged      = {}
+
+    for slot in result["available"]:
+        t          = slot["time"]
+        merged[t]  = {"resve_id": resve_id, "court_name": court["name"],
+                      "location": court["location"], "date": date_str,
+                      "day_of_week": day_of_week, "time": t,
+                      "status": "", "is_available": True}
+    for slot in result["all"]:
+        t = slot["time"]
+        if t not in merged:
+            merged[t] = {"resve_id": resve_id, "court_name": court["name"],
+                         "location": court["location"], "date": date_str,
+                         "day_of_week": day_of_week, "time": t,
+                         "status": slot["status"], "is_available": False}
+    return list(merged.values())
+
+
+_yn_open_until = None   # 다음 달 예약이 열린 뒤(예약 오픈 버스트) 스캔 마지막 날짜 (date)
+
+
 def yn_dates_until_end_of_month():
+    """오늘 ~ 이번 달 말일. 다음 달 예약이 이미 열렸으면 _yn_open_until 까지"""
     import calendar
     today    = datetime.now(KST)
     last_day = calendar.monthrange(today.year, today.month)[1]
-    days     = (today.replace(day=last_day) - today).days + 1
+    end      = today.replace(day=last_day).date()
+    if _yn_open_until and _yn_open_until > end:
+        end = _yn_open_until
+    days     = (end - today.date()).days + 1
     return [today + timedelta(days=i) for i in range(days)]
 
 
@@ -758,80 +1920,1536 @@ def yn_passes_filter(entry, table):
     return False
 
 
-def yn_run_once():
-    """용인 모니터링 1회. → (available, all_courts, period_str)"""
-    creds = yn_load_credentials()
-    if not creds:
-        logging.error("[YN] auth.txt 에 [yongin] 계정 없음")
-        return [], [], ""
+def yn_run_once(select_courts=None, on_court_done=None, include_target=None, courts=None, budget=None):
+    """용인 모니터링 1회. → (available, all_courts, period_str)
+    select_courts: 코트 목록 → 이번 회차에 스캔할 코트 목록 (None 이면 전체)
+    on_court_done: 코트 1개 완료마다 (court, available, court_data, done, total) 호출
+    include_target: (resve_id, YYYYMMDD) → 스캔 여부 (샤딩/부분 재스캔, None 이면 전부)
+    courts:        코트 목록을 이미 알면 전달 (목록 페이지 요청 생략)
+    budget:        CycleScheduler — 우선순위 순서로 스캔하고 예산을 넘기면 먼 날짜는 다음 회차로"""
+    pool = _session_pools["yongin"]
+    if not len(pool.creds):
+        logging.error("[YN] auth.txt 에 [yongin] 계정 없음")
+        return [], [], ""
+
+    courts = courts or yn_fetch_courts()
+    if not courts:
+        logging.error("[YN] 코트 목록 없음")
+        return [], [], ""
+
+    mon_table = yn_load_monitoring_table()
+    if mon_table:
+        before = len(courts)
+        courts = [c for c in courts if any(g in c["location"] for g in mon_table)]
+        logging.info(f"[YN] 코트 필터: {before}→{len(courts)}")
+
+    target_dates = yn_dates_until_end_of_month()
+    period_str   = (f"{target_dates[0].strftime('%Y-%m-%d')} ~ "
+                    f"{target_dates[-1].strftime('%Y-%m-%d')} ({len(target_dates)}일)")
+
+    court_dates = {c["resve_id"]: target_dates for c in courts}
+    if include_target:
+        court_dates = {rid: [d for d in dates if include_target(rid, d.strftime("%Y%m%d"))]
+                       for rid, dates in court_dates.items()}
+        courts = [c for c in courts if court_dates[c["resve_id"]]]
+
+    if select_courts:
+        courts = select_courts(courts)
+    if not courts:
+        return [], [], period_str
+    if budget:   # 오래 미룬 날짜가 있는 코트 먼저, 코트 안에서는 가까운 날짜 → 미룬 날짜 → 나머지
+        today    = datetime.now(KST).date()
+        deferred = budget.deferred_targets()
+        courts   = sorted(courts, key=lambda c: -deferred.get(c["resve_id"], 0))
+        court_dates = {rid: sorted(dates, key=lambda d: budget.priority(rid, d.strftime("%Y%m%d"),
+                                                                        (d.date() - today).days))
+                       for rid, dates in court_dates.items()}
+
+    # 워커마다 계정 풀에서 고른 로그인 세션 1개 (부족분은 병렬로 미리 로그인)
+    n_workers = min(YN_WORKERS, len(courts))
+    pool.prewarm(n_workers)
+    holders = [[pool.acquire()] for _ in range(n_workers)]
+
+    all_available  = []
+    all_court_data = []
+
+    def _scan(court, holder):
+        return yn_scan_one_court(court, court_dates[court["resve_id"]], holder, budget)
+
+    try:
+        _yn_collect(courts, holders, _scan, mon_table, on_court_done, all_available, all_court_data)
+    finally:
+        for holder in holders:
+            pool.release(holder[0])
+
+    if mon_table:
+        logging.info(f"[YN] 시간 필터 적용: 예약가능 {len(all_available)}개")
+
+    return all_available, all_court_data, period_str
+
+
+def _yn_assign(courts, holders):
+    """코트를 세션별 작업 큐로 나눔: 그 코트 신청 페이지를 이미 방문한 세션 중 큐가 가장 짧은 곳,
+    없으면 전체 중 가장 짧은 곳 (워밍업 GET 을 다시 하지 않도록)"""
+    queues = [deque() for _ in holders]
+    for c in courts:
+        warmed = [i for i, h in enumerate(holders)
+                  if c["resve_id"] in getattr(h[0], "tcm_warmed", ())]
+        i = min(warmed or range(len(holders)), key=lambda i: len(queues[i]))
+        queues[i].append(c)
+    return queues
+
+
+def _yn_collect(courts, holders, scan, mon_table, on_court_done, all_available, all_court_data):
+    """세션마다 워커 1개로 코트별 스캔을 병렬 실행하고 완료 순서대로 결과 수집.
+    자기 큐가 비면 가장 긴 큐의 뒤에서 가져와 일을 나눈다."""
+    queues = _yn_assign(courts, holders)
+    qlock  = threading.Lock()
+    done   = queue.Queue()
+
+    def _next(i):
+        with qlock:
+            if queues[i]:
+                return queues[i].popleft()
+            longest = max(queues, key=len)
+            return longest.pop() if longest else None
+
+    def _run(i):
+        court = _next(i)
+        while court is not None:
+            try:
+                done.put((court, scan(court, holders[i]), None))
+            except Exception as exc:
+                done.put((court, None, exc))
+            court = _next(i)
+
+    with ThreadPoolExecutor(max_workers=len(holders)) as executor:
+        for i in range(len(holders)):
+            # 스캔 워커 로그에도 호출한 스레드(회차 루프)의 회차 ID 가 붙도록 컨텍스트를 복사해 실행
+            executor.submit(contextvars.copy_context().run, _run, i)
+        for completed in range(1, len(courts) + 1):
+            court, res, exc = done.get()
+            a, d = [], []
+            try:
+                if exc is not None:
+                    raise exc
+                a, d = res
+                if mon_table:
+                    with metrics.timer("tcm_stage_seconds", city="yongin",
+                                       host=_host(YN_BASE_URL), stage="filter"):
+                        a = [e for e in a if yn_passes_filter(e, mon_table)]
+                        d = [e for e in d if yn_passes_filter(e, mon_table)]
+                all_available.extend(a)
+                all_court_data.extend(d)
+            except Exception as exc:
+                logging.error(f"[YN] 워커 오류 [{court['name']}]: {exc}")
+            _log_yn.debug("[YN] ✅ %d/%d: %s", completed, len(courts), court["name"])
+            if on_court_done:
+                on_court_done(court, a, d, completed, len(courts))
+
+
+# ─────────────────────────────────────────────────────────
+# 계정 풀 + 세션 풀 (계정 부하 분산, 로그인된 세션을 미리 만들어 두고 빌려 씀)
+# ─────────────────────────────────────────────────────────
+CRED_COOLDOWN_BASE = 60.0     # 로그인 거부 후 쉬는 시간(초), 연속 거부마다 2배
+CRED_COOLDOWN_MAX  = 1800.0
+CRED_FAIL_HOLD     = 5.0      # 방금 실패(일시 오류 포함)한 계정을 다른 동시 로그인에 주지 않는 시간(초)
+CRED_HEALTH_ALPHA  = 0.3      # 건강도(로그인 성공률 EWMA) 가중치
+CRED_RELOAD        = 300.0    # auth.txt/환경변수 다시 읽는 간격(초)
+CRED_LEASE_STALE   = 600.0    # 이보다 오래 반납되지 않은 임대는 멈춘 스캔으로 보고 분산 계산에서 뺌(초, stats 에 표시)
+
+metrics.describe("tcm_session_pool_idle",     "gauge",   "세션 풀에 대기 중인 로그인 세션 수")
+metrics.describe("tcm_session_logins_total",  "counter", "세션 풀 로그인 시도 수 (result=ok/fail/error, fail=계정 거부, error=일시 오류)")
+metrics.describe("tcm_account_requests_total", "counter", "계정별 업스트림 요청 수")
+metrics.describe("tcm_account_leases",        "gauge",   "계정별 현재 빌려준 세션 수")
+metrics.describe("tcm_account_health",        "gauge",   "계정별 건강도 (로그인 성공률 EWMA, 0~1)")
+metrics.describe("tcm_account_cooldown_seconds", "gauge", "계정별 남은 쿨다운 시간")
+
+
+def _account_key(uid):
+    """메트릭 라벨용 계정 식별자 — 로그인 ID 대신 짧은 해시 (/debug/accounts 의 key 와 같음)"""
+    return hashlib.sha256(uid.encode("utf-8")).hexdigest()[:10]
+
+
+class CredentialPool:
+    """도시별 계정 풀. 로그인할 계정을 고를 때 쿨다운 중인 계정은 빼고,
+    살아 있는 세션이 적고 (요청 수 / 건강도) 가 작은 계정부터 쓴다.
+    계정이 거부되면 CRED_COOLDOWN_BASE 부터 두 배씩 늘어나는 쿨다운에 들어간다.
+    타임아웃·5xx 같은 일시 오류는 쿨다운 없이 CRED_FAIL_HOLD 동안만 다른 동시 로그인에서 뺀다.
+    같은 때 자리를 잡은 병렬 로그인(prewarm 한 번)이 여러 번 실패해도 연속 실패는 1번만 센다.
+    CRED_LEASE_STALE 넘게 반납되지 않은 임대(멈춘 스캔 스레드)는 임대 수에 넣지 않고 stats() 에 따로 보인다."""
+
+    def __init__(self, city, loader):
+        self.city     = city
+        self._loader  = loader   # () → [(id, password)]
+        self._lock    = threading.Lock()
+        self._accts   = {}       # id → 계정 상태 dict
+        self._loaded  = 0.0
+        self._reload  = threading.Lock()   # 동시 호출이 빈 목록을 보지 않도록 다시 읽기는 한 스레드만
+
+    def _ensure(self):
+        if time.time() - self._loaded < CRED_RELOAD:
+            return
+        with self._reload:
+            if time.time() - self._loaded < CRED_RELOAD:
+                return
+            self.add(self._loader())
+            self._loaded = time.time()
+
+    def add(self, accounts):
+        """[(id, password)] 를 풀에 추가 (이미 있으면 비밀번호만 갱신)"""
+        with self._lock:
+            for uid, pw in accounts:
+                a = self._accts.get(uid)
+                if a is None:
+                    a = self._accts[uid] = {"id": uid, "requests": 0, "sessions": 0, "leases": {}, "logins_ok": 0,
+                                            "logins_fail": 0, "logins_error": 0, "fails_in_row": 0,
+                                            "fail_seq": 0, "failed_at": 0.0, "health": 1.0,
+                                            "cooldown_until": 0.0, "last_login": ""}
+                    labels = {"city": self.city, "account": _account_key(uid)}
+                    metrics.set_gauge("tcm_account_leases", lambda a=a: self._live_leases(a), **labels)
+                    metrics.set_gauge("tcm_account_health", lambda a=a: round(a["health"], 3), **labels)
+                    metrics.set_gauge("tcm_account_cooldown_seconds",
+                                      lambda a=a: round(max(0.0, a["cooldown_until"] - time.time()), 1), **labels)
+                a["password"] = pw
+
+    def __len__(self):
+        self._ensure()
+        return len(self._accts)
+
+    @staticmethod
+    def _cost(a):
+        return a["requests"] / max(a["health"], 0.05)
+
+    @staticmethod
+    def _live_leases(a, now=None):
+        """CRED_LEASE_STALE 안에 시작한 임대 수 (오래된 임대는 멈춘 것으로 보고 제외)"""
+        now = time.monotonic() if now is None else now
+        return sum(1 for t0 in list(a["leases"].values()) if now - t0 < CRED_LEASE_STALE)
+
+    def reserve(self, exclude=()):
+        """새 세션을 로그인할 계정 (id, password, seq) 를 골라 세션 수를 미리 +1. 없으면 None
+        병렬 로그인이 모두 같은 계정을 고르지 않도록 고르는 즉시 자리를 잡는다.
+        seq 는 report_login 에 그대로 넘긴다 (같은 seq 로 자리 잡은 로그인의 실패는 1번만 셈)."""
+        self._ensure()
+        now = time.time()
+        with self._lock:
+            ready = [a for a in self._accts.values()
+                     if a["cooldown_until"] <= now and now - a["failed_at"] >= CRED_FAIL_HOLD
+                     and a["id"] not in exclude]
+            if not ready:
+                return None
+            a = min(ready, key=lambda a: (a["sessions"], self._cost(a)))
+            a["sessions"] += 1
+            return a["id"], a["password"], a["fail_seq"]
+
+    def opened(self, uid, delta):
+        """uid 로 로그인된 세션 수 증감 (로그인 실패/세션 폐기 시 -1)"""
+        with self._lock:
+            if uid in self._accts:
+                self._accts[uid]["sessions"] += delta
+
+    def best(self, uids):
+        """uids 중 지금 쓰기 가장 좋은 계정 (모두 쿨다운 중이면 None)"""
+        now, mono = time.time(), time.monotonic()
+        with self._lock:
+            ready = [self._accts[u] for u in uids if u in self._accts and self._accts[u]["cooldown_until"] <= now]
+            return min(ready, key=lambda a: (self._live_leases(a, mono), self._cost(a)))["id"] if ready else None
+
+    def report_login(self, uid, ok, seq=None):
+        """ok: True 성공 / False 계정 거부 (쿨다운) / None 일시 오류 (쿨다운 없음)
+        seq: reserve() 가 준 값. 그 사이 이미 실패가 보고됐으면 이번 실패는 연속 실패로 세지 않는다."""
+        metrics.inc("tcm_session_logins_total", city=self.city,
+                    result="ok" if ok else "error" if ok is None else "fail")
+        with self._lock:
+            a = self._accts.get(uid)
+            if a is None:
+                return
+            if ok:
+                a["health"]       = (1 - CRED_HEALTH_ALPHA) * a["health"] + CRED_HEALTH_ALPHA
+                a["logins_ok"]   += 1
+                a["fails_in_row"] = 0
+                a["last_login"]   = datetime.now(KST).isoformat()
+                return
+            a["failed_at"] = time.time()
+            if ok is None:
+                a["logins_error"] += 1
+                return
+            a["logins_fail"] += 1
+            if seq is not None and seq != a["fail_seq"]:
+                return                        # 같은 물결의 다른 로그인이 이미 실패를 보고함
+            a["fail_seq"]     += 1
+            a["health"]        = (1 - CRED_HEALTH_ALPHA) * a["health"]
+            a["fails_in_row"] += 1
+            cooldown = min(CRED_COOLDOWN_MAX, CRED_COOLDOWN_BASE * 2 ** (a["fails_in_row"] - 1))
+            a["cooldown_until"] = time.time() + cooldown
+        logging.warning(f"[CRED] {self.city} 계정 {uid} 로그인 거부 {a['fails_in_row']}회 연속 → {cooldown:.0f}초 쉼")
+
+    def lease(self, uid, token, delta):
+        """uid 세션 임대 시작(+1)/반납(-1). token = 임대 식별자 (세션 id) — 임대 시작 시각을 기억해 오래된 임대를 가려냄"""
+        with self._lock:
+            if uid in self._accts:
+                leases = self._accts[uid]["leases"]
+                if delta > 0:
+                    leases[token] = time.monotonic()
+                else:
+                    leases.pop(token, None)
+
+    def count(self, uid):
+        """uid 세션으로 업스트림 요청 1건"""
+        if uid is None:
+            return
+        with self._lock:
+            if uid in self._accts:
+                self._accts[uid]["requests"] += 1
+        metrics.inc("tcm_account_requests_total", city=self.city, account=_account_key(uid))
+
+    def stats(self):
+        """계정별 사용 통계 (비밀번호 제외, key 는 메트릭 account 라벨).
+        stale_leases / oldest_lease_s: CRED_LEASE_STALE 넘게 반납되지 않은 임대 수 / 가장 오래된 임대 경과 초"""
+        now, mono = time.time(), time.monotonic()
+        with self._lock:
+            return [{"account": a["id"], "key": _account_key(a["id"]), "requests": a["requests"], "sessions": a["sessions"],
+                     "leases": live, "stale_leases": len(a["leases"]) - live,
+                     "oldest_lease_s": round(mono - min(a["leases"].values()), 1) if a["leases"] else 0.0,
+                     "logins_ok": a["logins_ok"], "logins_fail": a["logins_fail"],
+                     "logins_error": a["logins_error"],
+                     "health": round(a["health"], 3), "last_login": a["last_login"],
+                     "cooldown_s": round(max(0.0, a["cooldown_until"] - now), 1)}
+                    for a in self._accts.values() for live in [self._live_leases(a, mono)]]
+
+
+class SessionPool:
+    """도시별 로그인 세션 풀. prewarm() 으로 미리 로그인해 두고 lease() 로 빌려 쓴다.
+    빌린 세션이 만료되면 relogin() 으로 새 세션을 끼워 넣고, 반납 시 다시 풀로 돌아온다.
+    세션마다 로그인한 계정(tcm_account)을 기억해 계정 풀의 임대/요청 수에 반영한다."""
+
+    def __init__(self, city, max_idle=YN_WORKERS):
+        self.city     = city
+        self.max_idle = max_idle
+        self.creds    = CredentialPool(city, self._accounts)
+        self._idle    = []     # 로그인된 대기 세션
+        self._lock    = threading.Lock()
+        self._warming = threading.Lock()   # 동시 prewarm 이 같은 부족분을 중복 로그인하지 않도록
+        self._gauged  = False   # 게이지는 실제로 로그인하는 프로세스에서만 등록 (HTTP 워커/다른 도시 스캐너 제외)
+
+    def _accounts(self):
+        if self.city == "sungnam":
+            return [(a["username"], a["password"]) for a in sn_load_accounts()]
+        return yn_load_credentials()
+
+    def login(self):
+        """부하가 가장 적은 계정부터 새 세션 로그인. 모두 실패/쿨다운이면 None"""
+        if self.city == "sungnam":
+            make, login = sn_make_session, sn_login
+        else:
+            make, login = yn_make_session, yn_group_login
+        if not self._gauged:
+            self._gauged = True
+            metrics.set_gauge("tcm_session_pool_idle", lambda: len(self._idle), city=self.city)
+        tried = set()
+        while True:
+            picked = self.creds.reserve(tried)
+            if picked is None:
+                if not tried:
+                    logging.warning(f"[CRED] {self.city} 로그인 가능한 계정 없음 (모두 쿨다운/방금 실패했거나 미설정)")
+                return None
+            uid, pw, seq = picked
+            tried.add(uid)
+            sess = make()
+            ok   = login(sess, uid, pw)
+            self.creds.report_login(uid, ok, seq)
+            if ok:
+                sess.tcm_account = uid
+                return sess
+            self.creds.opened(uid, -1)
+
+    def drop(self, sess):
+        """더 쓰지 않을 (만료/초과) 세션을 계정 세션 수에서 뺌"""
+        if sess is not None:
+            self.creds.opened(sess.tcm_account, -1)
+
+    def prewarm(self, n):
+        """대기 세션이 n 개(최대 max_idle)가 되도록 병렬 로그인 → 대기 세션 수
+        다른 스레드가 prewarm 중이면 끝날 때까지 기다렸다가 남은 부족분만 로그인한다."""
+        with self._warming:
+            with self._lock:
+                need = min(n, self.max_idle) - len(self._idle)
+            if need > 0:
+                with ThreadPoolExecutor(max_workers=need) as ex:
+                    for sess in ex.map(lambda _: self.login(), range(need)):
+                        self._put_idle(sess)
+        return len(self._idle)
+
+    def prewarm_async(self, n):
+        """백그라운드 prewarm — 시작 시 로그인을 설정/코트 목록 로드와 겹쳐 실행"""
+        threading.Thread(target=self.prewarm, args=(n,), daemon=True, name=f"prewarm-{self.city}").start()
+
+    def _put_idle(self, sess):
+        if sess is None:
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(sess)
+                return
+        self.drop(sess)
+
+    def acquire(self):
+        """대기 세션 중 부하가 가장 적은 계정의 것, 없으면 새로 로그인 (실패 시 None)"""
+        sess = None
+        with self._lock:
+            uid = self.creds.best({x.tcm_account for x in self._idle})
+            if uid is not None:
+                sess = next(x for x in self._idle if x.tcm_account == uid)
+                self._idle.remove(sess)
+            else:
+                for x in self._idle:   # 남은 세션은 모두 쿨다운 중인 계정
+                    self.drop(x)
+                self._idle.clear()
+        if sess is None:
+            sess = self.login()
+        if sess is not None:
+            self.creds.lease(sess.tcm_account, id(sess), +1)
+        return sess
+
+    def release(self, sess):
+        """acquire() 로 빌린 세션 반납"""
+        if sess is None:
+            return
+        self.creds.lease(sess.tcm_account, id(sess), -1)
+        self._put_idle(sess)
+
+    def relogin(self, holder):
+        """holder[0] 세션이 만료됨 → 새로 로그인한 세션으로 교체"""
+        metrics.inc("tcm_relogins_total", city=self.city)
+        if holder[0] is not None:
+            self.creds.lease(holder[0].tcm_account, id(holder[0]), -1)   # 만료된 세션은 풀로 돌려보내지 않음
+            self.drop(holder[0])
+        holder[0] = self.login()
+        if holder[0] is not None:
+            self.creds.lease(holder[0].tcm_account, id(holder[0]), +1)
+        return holder[0]
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as holder: holder[0] 이 세션 (relogin 으로 바뀔 수 있음)"""
+        holder = [self.acquire()]
+        try:
+            yield holder
+        finally:
+            self.release(holder[0])
+
+
+def _count_request(city, session):
+    """계정별 요청 수 집계 (로그인 안 한 세션은 무시)"""
+    _session_pools[city].creds.count(getattr(session, "tcm_account", None))
+
+
+_session_pools = {"sungnam": SessionPool("sungnam"), "yongin": SessionPool("yongin")}
+
+
+# ─────────────────────────────────────────────────────────
+# 취소 패턴 분석 (가용성 전이 기록 → 폴링 간격 추천)
+# ─────────────────────────────────────────────────────────
+STATE_DIR      = os.environ.get("TCM_STATE_DIR", os.path.join(_HERE, "state"))
+ANALYTICS_DB   = os.path.join(STATE_DIR, "analytics.db")
+
+# (리드타임 상한 시간, 라벨) — 슬롯 시작까지 남은 시간 구간
+_LEAD_BUCKETS = [(3, "0-3h"), (12, "3-12h"), (24, "12-24h"), (48, "1-2d"),
+                 (96, "2-4d"), (168, "4-7d"), (None, "7d+")]
+
+
+def _slot_start(date_str, time_str):
+    """'2025-03-01' / '2025.03.01' + '19:00 ~ 20:50' → KST datetime (실패 시 None)"""
+    try:
+        y, mo, d = (int(x) for x in re.findall(r"\d+", date_str)[:3])
+        h, mi    = (int(x) for x in time_str.replace("～", "~").split("~")[0].strip().split(":")[:2])
+        return datetime(y, mo, d, h, mi, tzinfo=KST)
+    except Exception:
+        return None
+
+
+def _date_key(date_str):
+    """'2025-03-01' / '2025.03.01' / '20250301' → '20250301' (실패 시 None)"""
+    nums = re.findall(r"\d+", date_str or "")
+    if len(nums) == 1 and len(nums[0]) == 8:
+        return nums[0]
+    try:
+        y, mo, d = (int(x) for x in nums[:3])
+        return f"{y:04d}{mo:02d}{d:02d}"
+    except ValueError:
+        return None
+
+
+def _lead_bucket(lead_h):
+    for limit, label in _LEAD_BUCKETS:
+        if limit is None or lead_h < limit:
+            return label
+    return _LEAD_BUCKETS[-1][1]
+
+
+class CancelAnalytics:
+    """예약됨→예약가능 전이를 SQLite 에 기록하고 대상(시설/코트)별 통계 산출.
+
+    - exposure : 예약된 슬롯이 관측된 시간(slot·초) — 취소가 일어날 수 있었던 구간
+    - openings : 예약됨 → 예약가능 전이 횟수
+    - open_s   : 열린 슬롯이 다시 닫히기까지 걸린 시간
+    """
+
+    MIN_OBSERVED_S = 6 * 3600   # 이보다 관측이 적으면 기본 간격 사용
+    LOW_RATE_PER_H = 0.02       # 시간당 오픈 기대치가 이보다 낮으면 최대 간격
+    MIN_WAKEUP_S   = 5.0        # next_wakeup 최소값
+    INTERVAL_TTL   = 60.0       # 추천 간격 재계산 주기 — due_targets/next_wakeup 이 같은 값을 나눠 씀
+    RETENTION_S    = 60 * 86400 # 이보다 오래된 전이 기록은 삭제
+    PRUNE_EVERY_S  = 3600.0     # 오래된 전이 기록 삭제 주기
+
+    def __init__(self, path=ANALYTICS_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db    = sqlite3.connect(path, check_same_thread=False)
+        self._lock  = threading.Lock()
+        self._prev  = {}   # (city, target) → (ts, {slot_key: is_available})
+        self._since = {}   # (city, target) → {slot_key: 오픈 시각}
+        self._last_scan = {}   # (city, target) → 마지막 스캔 시각
+        self._iv_cache  = {}   # (city, target, default) → (계산 시각, 추천 간격)
+        self._pruned    = 0.0
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS transitions (
+                    city TEXT, target TEXT, slot_date TEXT, slot_time TEXT, court TEXT,
+                    kind TEXT, ts REAL, lead_h REAL, open_s REAL);
+                CREATE TABLE IF NOT EXISTS exposure (
+                    city TEXT, target TEXT, bucket TEXT,
+                    slot_s REAL DEFAULT 0, openings INTEGER DEFAULT 0,
+                    PRIMARY KEY (city, target, bucket));
+                CREATE TABLE IF NOT EXISTS observed (
+                    city TEXT, target TEXT, wall_s REAL DEFAULT 0,
+                    PRIMARY KEY (city, target));
+                CREATE INDEX IF NOT EXISTS transitions_by_target ON transitions (city, target, kind);
+                CREATE INDEX IF NOT EXISTS transitions_by_ts ON transitions (ts);
+            """)
+
+    def observe(self, city, target, slots, now=None):
+        """대상 1곳의 스캔 결과(slots: date/time/is_available[/court]) 반영"""
+        now    = now or time.time()
+        now_dt = datetime.fromtimestamp(now, KST)
+        cur    = {(s.get("date", ""), s.get("time", ""), s.get("court", "")): bool(s.get("is_available"))
+                  for s in slots}
+        with self._lock:
+            prev_ts, prev = self._prev.get((city, target), (None, {}))
+            self._prev[(city, target)] = (now, cur)
+            # 결과에서 빠진 슬롯(지난 날짜, 미룬 날짜 등)의 오픈 시각은 버림 — 닫힘을 볼 수 없어 계속 쌓이므로
+            since = {k: v for k, v in self._since.get((city, target), {}).items() if k in cur}
+            self._since[(city, target)] = since
+            if prev_ts is None:
+                for key, avail in cur.items():
+                    if avail:
+                        since.setdefault(key, now)
+                return
+            elapsed = now - prev_ts
+            expo, opens, rows = {}, {}, []
+            for key, avail in cur.items():
+                start = _slot_start(key[0], key[1])
+                lead_h = (start - now_dt).total_seconds() / 3600 if start else -1
+                bucket = _lead_bucket(max(lead_h, 0))
+                was    = prev.get(key)
+                if was is False:
+                    expo[bucket] = expo.get(bucket, 0) + elapsed
+                    if avail:
+                        opens[bucket] = opens.get(bucket, 0) + 1
+                        since[key] = now
+                        rows.append((city, target, key[0], key[1], key[2], "open", now, lead_h, None))
+                elif was is True and not avail:
+                    opened = since.pop(key, None)
+                    rows.append((city, target, key[0], key[1], key[2], "close", now, lead_h,
+                                 now - opened if opened else None))
+            with self._db:
+                for bucket in set(expo) | set(opens):
+                    self._db.execute(
+                        "INSERT INTO exposure (city, target, bucket, slot_s, openings) VALUES (?,?,?,?,?) "
+                        "ON CONFLICT(city, target, bucket) DO UPDATE SET "
+                        "slot_s = slot_s + excluded.slot_s, openings = openings + excluded.openings",
+                        (city, target, bucket, expo.get(bucket, 0), opens.get(bucket, 0)))
+                self._db.execute(
+                    "INSERT INTO observed (city, target, wall_s) VALUES (?,?,?) "
+                    "ON CONFLICT(city, target) DO UPDATE SET wall_s = wall_s + excluded.wall_s",
+                    (city, target, elapsed))
+                self._db.executemany("INSERT INTO transitions VALUES (?,?,?,?,?,?,?,?,?)", rows)
+                if now - self._pruned >= self.PRUNE_EVERY_S:
+                    self._pruned = now
+                    self._db.execute("DELETE FROM transitions WHERE ts < ?", (now - self.RETENTION_S,))
+
+    def stats(self, city=None):
+        """대상·리드타임 구간별 통계 목록"""
+        where, args = ("WHERE e.city = ?", (city,)) if city else ("", ())
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT e.city, e.target, e.bucket, e.slot_s, e.openings FROM exposure e "
+                f"{where} ORDER BY e.city, e.target, e.bucket", args).fetchall()
+            durs = self._open_durations(city)
+        out = []
+        for c, tgt, bucket, slot_s, openings in rows:
+            rate = openings / (slot_s / 3600) if slot_s else 0.0
+            out.append({"city": c, "target": tgt, "lead": bucket,
+                        "openings": openings, "exposure_h": round(slot_s / 3600, 2),
+                        "open_rate_per_h": round(rate, 4),
+                        "p_open_1h": round(1 - math.exp(-rate), 4),
+                        "median_open_s": durs.get((c, tgt, bucket))})
+        return out
+
+    def _open_durations(self, city=None):
+        """(city, target, 리드타임 구간) → 오픈 지속시간 중앙값"""
+        where, args = ("AND city = ?", (city,)) if city else ("", ())
+        by_bucket = {}
+        for c, tgt, lead_h, s in self._db.execute(
+                f"SELECT city, target, lead_h, open_s FROM transitions WHERE kind = 'close' "
+                f"AND open_s IS NOT NULL {where}", args):
+            by_bucket.setdefault((c, tgt, _lead_bucket(max(lead_h, 0))), []).append(s)
+        return {k: round(statistics.median(v), 1) for k, v in by_bucket.items()}
+
+    def recommended_interval(self, city, target, default):
+        """대상별 추천 폴링 간격(초). 범위: default/3 ~ default*2
+        리드타임 구간마다 따로 봄: 오픈이 충분히 잦은 구간의 (중앙 지속시간/2) 중 가장 짧은 값.
+        임박한 날짜의 짧은 취소가 먼 날짜의 오래 열려 있는 취소에 묻혀 늦게 잡히지 않도록.
+        계산 결과는 INTERVAL_TTL 동안 재사용 (루프가 깰 때마다 대상별로 DB 를 읽지 않도록)"""
+        key, now = (city, target, default), time.monotonic()
+        hit = self._iv_cache.get(key)
+        if hit and now - hit[0] < self.INTERVAL_TTL:
+            return hit[1]
+        iv = self._interval(city, target, default)
+        self._iv_cache[key] = (now, iv)
+        return iv
+
+    def _interval(self, city, target, default):
+        min_iv, max_iv = default / 3, default * 2
+        with self._lock:
+            row = self._db.execute(
+                "SELECT wall_s FROM observed WHERE city = ? AND target = ?", (city, target)).fetchone()
+            opens = dict(self._db.execute(
+                "SELECT bucket, openings FROM exposure WHERE city = ? AND target = ?", (city, target)))
+            durs = {}
+            for lead_h, s in self._db.execute(
+                    "SELECT lead_h, open_s FROM transitions WHERE kind = 'close' AND open_s IS NOT NULL "
+                    "AND city = ? AND target = ?", (city, target)):
+                durs.setdefault(_lead_bucket(max(lead_h, 0)), []).append(s)
+        if not row or row[0] < self.MIN_OBSERVED_S:
+            return default
+        wall_h = row[0] / 3600
+        if sum(opens.values()) / wall_h < self.LOW_RATE_PER_H:
+            return max_iv
+        # 열린 슬롯이 닫히기 전에 잡으려면 간격 ≤ 중앙 지속시간/2
+        iv = min([default] + [statistics.median(durs[b]) / 2 for b, n in opens.items()
+                              if n / wall_h >= self.LOW_RATE_PER_H and durs.get(b)])
+        return max(min_iv, min(max_iv, iv))
+
+    def due_targets(self, city, targets, default, now=None, slack=1.0, full=True):
+        """추천 간격이 지난(스캔해야 할) 대상만 반환
+        slack: 이만큼(최대 간격의 1/4) 일찍 와도 due 로 봄 — 지터로 앞당겨진 정기 회차에서 빠지지 않도록
+        full=False: 정기 회차 사이의 부분 회차 — 기본 간격보다 짧게 폴링할 대상만 (나머지는 정기 회차 몫)"""
+        now = now or time.time()
+        due = []
+        for t in targets:
+            iv = self.recommended_interval(city, t, default)
+            if (full or iv < default) and now - self._last_scan.get((city, t), 0) >= iv - min(slack, iv / 4):
+                due.append(t)
+        for t in due:
+            self._last_scan[(city, t)] = now
+        return due
+
+    def next_wakeup(self, city, targets, default, now=None):
+        """기본 간격보다 짧게 폴링할 대상 중 다음 대상이 due 가 될 때까지 남은 초 (최소 MIN_WAKEUP_S).
+        그런 대상이 없으면 None (정기 회차만)"""
+        now   = now or time.time()
+        waits = []
+        for t in targets:
+            iv = self.recommended_interval(city, t, default)
+            if iv < default:
+                waits.append(self._last_scan.get((city, t), 0) + iv - now)
+        return max(self.MIN_WAKEUP_S, min(waits)) if waits else None
+
+
+_analytics = None
+
+
+# ─────────────────────────────────────────────────────────
+# 스냅샷 저장/복원 (재시작 시 즉시 응답 + 알림 중복 방지)
+# ─────────────────────────────────────────────────────────
+SNAPSHOT_FILE = os.path.join(STATE_DIR, "snapshot.json.gz")
+
+
+def _atomic_write(path, data):
+    """임시 파일에 쓰고 fsync 후 os.replace — 중간에 죽어도 이전 파일 유지.
+    임시 파일은 호출마다 고유(mkstemp)라 여러 스레드/프로세스가 같은 파일을 동시에 저장해도 섞이지 않음"""
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def save_snapshot(path=SNAPSHOT_FILE):
+    """현재 공개 스냅샷 + 알림 dedupe 키를 gzip JSON 으로 저장"""
+    with _lock:
+        _flush_published()
+        state = {
+            "saved_at": datetime.now(KST).isoformat(),
+            "sungnam":  {"available": _sn_available, "all_courts": _sn_courts,
+                         "last_update": _sn_last_update},
+            "yongin":   {"available": _yn_available, "all_courts": _yn_courts,
+                         "last_update": _yn_last_update, "period": _yn_period},
+            "notify":   {"sungnam": _sn_prev_key[0], "yongin": _yn_prev_key[0]},
+        }
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    try:
+        _atomic_write(path, gzip.compress(raw, compresslevel=6))
+    except OSError as e:
+        logging.warning(f"[STATE] 스냅샷 저장 실패: {e}")
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """저장된 스냅샷을 stale 표시와 함께 복원. 성공 시 True"""
+    global _sn_available, _sn_courts, _sn_last_update, _sn_stale
+    global _yn_available, _yn_courts, _yn_last_update, _yn_period, _yn_stale
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, "rb") as f:
+            state = json.loads(gzip.decompress(f.read()).decode("utf-8"))
+    except Exception as e:
+        logging.warning(f"[STATE] 스냅샷 로드 실패: {e}")
+        return False
+    sn, yn, notify = state.get("sungnam", {}), state.get("yongin", {}), state.get("notify", {})
+    with _lock:
+        _sn_available   = sn.get("available", [])
+        _sn_courts      = sn.get("all_courts", [])
+        _sn_last_update = sn.get("last_update", "")
+        _sn_stale       = True
+        _yn_available   = yn.get("available", [])
+        _yn_courts      = yn.get("all_courts", [])
+        _yn_last_update = yn.get("last_update", "")
+        _yn_period      = yn.get("period", "")
+        _yn_stale       = True
+        _sn_prev_key[0] = notify.get("sungnam", "")
+        _yn_prev_key[0] = notify.get("yongin", "")
+    logging.info(f"[STATE] 스냅샷 복원 ({state.get('saved_at', '?')}): "
+                 f"성남 {len(_sn_courts)}개 / 용인 {len(_yn_courts)}개")
+    return True
+
+
+# ─────────────────────────────────────────────────────────
+# 공유 스냅샷 (--serve-mode prefork: 스캐너 1 + HTTP 워커 N)
+# ─────────────────────────────────────────────────────────
+SHARED_SNAPSHOT_FILE = os.path.join(STATE_DIR, "snapshot.shm")
+
+_SHM_MAGIC  = b"TCMS"
+_SHM_HEADER = struct.Struct("<4sIQBB2xQII")   # magic, ver, seq, active, retired, capacity, len0, len1
+_SHM_HDR_SZ = 64
+
+
+class SharedSnapshot:
+    """mmap 파일 기반 이중 버퍼 스냅샷. 쓰기는 스캐너 프로세스 1곳, 읽기는 여러 워커.
+
+    - 데이터는 비활성 슬롯에 쓴 뒤 헤더(active/len)를 seqlock(홀수 = 쓰는 중)으로 교체
+    - 읽기: seq 확인 → 활성 슬롯 복사 → seq 재확인 (2 이상 증가 시 재시도)
+    - 용량 초과 시 더 큰 파일을 만들어 교체하고 이전 파일에 retired 표시 → 리더가 다시 염
+    - 페이로드: 이름별 bytes 섹션 (API JSON 은 미리 직렬화해 워커가 그대로 반환)
+    """
+
+    def __init__(self, path=SHARED_SNAPSHOT_FILE, create=False, capacity=16 * 1024 * 1024):
+        self.path    = path
+        self._cache  = (None, {})
+        if create:
+            self._create(path, capacity)
+        self._open()
+
+    @staticmethod
+    def _create(path, capacity):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(_SHM_HEADER.pack(_SHM_MAGIC, 1, 0, 0, 0, capacity, 0, 0).ljust(_SHM_HDR_SZ, b"\0"))
+            f.truncate(_SHM_HDR_SZ + 2 * capacity)
+        os.replace(tmp, path)
+
+    def _open(self):
+        with open(self.path, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+        magic, _, _, _, _, self.capacity, _, _ = _SHM_HEADER.unpack_from(self._mm, 0)
+        if magic != _SHM_MAGIC:
+            raise ValueError(f"공유 스냅샷 형식 아님: {self.path}")
+
+    def _set_seq(self, seq):
+        struct.pack_into("<Q", self._mm, 8, seq)
+
+    def write(self, sections):
+        """sections: {name: bytes} 를 원자적으로 교체 (단일 writer 전제)"""
+        blob = b"".join(struct.pack("<H", len(k.encode())) + k.encode() + struct.pack("<I", len(v)) + v
+                        for k, v in sections.items())
+        _, _, seq, active, _, cap, len0, len1 = _SHM_HEADER.unpack_from(self._mm, 0)
+        if len(blob) > cap:
+            self._create(self.path, max(cap * 2, len(blob) * 2))
+            self._mm[17] = 1   # 이전 파일 retired
+            self._mm.close()
+            self._open()
+            return self.write(sections)
+        slot = 1 - active
+        off  = _SHM_HDR_SZ + slot * cap
+        self._mm[off:off + len(blob)] = blob
+        lens = [len0, len1]
+        lens[slot] = len(blob)
+        self._set_seq(seq + 1)
+        _SHM_HEADER.pack_into(self._mm, 0, _SHM_MAGIC, 1, seq + 1, slot, 0, cap, *lens)
+        self._set_seq(seq + 2)
+
+    def read(self):
+        """{name: bytes} — seq 가 같으면 캐시 반환"""
+        while True:
+            _, _, seq, active, retired, cap, len0, len1 = _SHM_HEADER.unpack_from(self._mm, 0)
+            if retired:
+                self._mm.close()
+                self._open()
+                continue
+            if seq & 1:
+                time.sleep(0)
+                continue
+            if seq == self._cache[0]:
+                return self._cache[1]
+            off  = _SHM_HDR_SZ + active * cap
+            blob = self._mm[off:off + (len1 if active else len0)]
+            if struct.unpack_from("<Q", self._mm, 8)[0] - seq >= 2:
+                continue
+            sections, pos = {}, 0
+            while pos < len(blob):
+                (nlen,) = struct.unpack_from("<H", blob, pos)
+                name    = blob[pos + 2:pos + 2 + nlen].decode()
+                pos    += 2 + nlen
+                (dlen,) = struct.unpack_from("<I", blob, pos)
+                sections[name] = blob[pos + 4:pos + 4 + dlen]
+                pos    += 4 + dlen
+            self._cache = (seq, sections)
+            return sections
+
+
+_shared_writer = None   # 스캐너 프로세스: SharedSnapshot(create=True)
+_shared_reader = None   # HTTP 워커: SharedSnapshot()
+_shared_dirty  = threading.Event()
+
+
+def _accounts_payload(city):
+    """계정별 사용 통계 (스캐너 자식이 있으면 자식이 보낸 값) — 로그인 ID 포함, /debug/accounts 에서만 제공"""
+    if city in _child_accounts:
+        return _child_accounts[city]
+    return _session_pools[city].creds.stats()
+
+
+def _sn_payload():
+    with _lock:
+        _flush_published()
+        return {"available": _sn_available, "all_courts": _sn_courts,
+                "last_update": _sn_last_update, "stale": _sn_stale,
+                "rescan": dict(_rescan_status["sungnam"])}
+
+
+def _yn_payload():
+    with _lock:
+        _flush_published()
+        return {"available": _yn_available, "all_courts": _yn_courts,
+                "last_update": _yn_last_update, "period": _yn_period,
+                "stale": _yn_stale, "progress": dict(_yn_progress),
+                "rescan": dict(_rescan_status["yongin"])}
+
+
+def _json_bytes(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _mark_published(city):
+    """공개 스냅샷이 바뀌었음을 공유 스냅샷 writer / 부모 프로세스에 알림"""
+    if _shared_writer is not None:
+        _shared_dirty.set()
+    if _child_conn is not None:
+        _child_dirty.set()
+
+
+def _cycle_done(city, full=True):
+    """회차 종료: 정기(full) 회차만 스냅샷 저장 (스캐너 자식이면 부모가 저장하도록 전달).
+    빠른 대상만 도는 부분 회차는 최대 MIN_WAKEUP_S 마다 오므로 gzip 스냅샷을 다시 쓰지 않는다"""
+    if _child_conn is not None:
+        if full:
+            _child_cycle.set()
+        _child_dirty.set()
+    elif full:
+        save_snapshot()
+
+
+_worker_metrics = {}   # prefork 메인: HTTP 워커 번호 → {"pid", "series"} (워커가 주기적으로 보냄)
+_worker_retired = {}   # 재시작 전 워커들의 시리즈 합계 — 워커가 바뀌어도 카운터가 줄지 않도록
+
+
+def _on_worker_metrics(cmd):
+    """HTTP 워커가 보낸 카운터/히스토그램 (게이지는 메인/스캐너 것만 씀)"""
+    prev = _worker_metrics.get(cmd["worker"])
+    if prev is not None and prev["pid"] != cmd["pid"]:
+        for k, v in prev["series"].items():
+            Metrics._merge(_worker_retired, k, v)
+    _worker_metrics[cmd["worker"]] = {"pid": cmd["pid"], "series": cmd["series"]}
+    return {}
+
+
+def render_metrics():
+    """이 프로세스 + 스캐너 자식 프로세스 + prefork HTTP 워커 메트릭"""
+    extra = list(_child_metrics.values())
+    if _worker_metrics:
+        extra.append({"series": dict(_worker_retired), "gauges": {}})
+        extra += [{"series": w["series"], "gauges": {}} for w in list(_worker_metrics.values())]
+    return metrics.render(extra=extra)
+
+
+def _analytics_payload(city=None):
+    """/api/analytics 응답: 취소 패턴 통계 + 대상별 추천 폴링 간격"""
+    stats   = _analytics.stats(city)
+    default = {"sungnam": SN_INTERVAL, "yongin": YN_INTERVAL}
+    intervals = {f"{s['city']}/{s['target']}":
+                 _analytics.recommended_interval(s["city"], s["target"], default.get(s["city"], SN_INTERVAL))
+                 for s in stats}
+    return {"stats": stats, "recommended_interval_s": intervals}
+
+
+def _shared_writer_loop(metrics_every=5.0, analytics_every=60.0):
+    """메인 프로세스의 유일한 writer: 변경 시(최대 1초 간격) + metrics_every 마다 갱신.
+    취소 통계는 전이 기록 전체를 읽으므로 analytics_every 마다만 다시 만듦"""
+    last, last_an, analytics = 0.0, 0.0, b""
+    while True:
+        changed = _shared_dirty.wait(timeout=1.0)
+        if not changed and time.time() - last < metrics_every:
+            continue
+        _shared_dirty.clear()
+        try:
+            if _analytics is not None and time.time() - last_an >= analytics_every:
+                analytics, last_an = _json_bytes(_analytics_payload()), time.time()
+            _shared_writer.write({"sungnam":   _json_bytes(_sn_payload()),
+                                  "yongin":    _json_bytes(_yn_payload()),
+                                  "accounts":  _json_bytes({c: _accounts_payload(c) for c in ("sungnam", "yongin")}),
+                                  "analytics": analytics,
+                                  "metrics":   render_metrics().encode("utf-8")})
+        except Exception as e:
+            logging.error(f"[SHM] 공유 스냅샷 쓰기 실패: {e}")
+        last = time.time()
+        time.sleep(1.0)
+
+
+def _worker_metrics_loop(idx, every=5.0):
+    """HTTP 워커: 자기 카운터/히스토그램(요청 시간 등)을 메인 프로세스로 보내 한 번에 합산되게 함"""
+    while True:
+        time.sleep(every)
+        try:
+            _cmd_out.put({"op": "worker_metrics", "worker": idx, "pid": os.getpid(),
+                          "series": metrics.snapshot()["series"]})
+        except Exception as e:
+            logging.warning(f"[SRV] 워커 메트릭 전송 실패: {e}")
+
+
+def _serve_worker(port, idx, cmd_queue=None):
+    """HTTP 워커 프로세스 (spawn): SO_REUSEPORT 소켓으로 같은 포트를 공유"""
+    global _shared_reader, _cmd_out
+    from werkzeug.serving import make_server
+    logging.basicConfig(level=logging.WARNING, format=f"%(asctime)s [w{idx}] %(levelname)s %(message)s")
+    _shared_reader = SharedSnapshot()
+    _cmd_out       = cmd_queue
+    if cmd_queue is not None:
+        threading.Thread(target=_worker_metrics_loop, args=(idx,), daemon=True, name="worker-metrics").start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(128)
+    make_server("0.0.0.0", port, create_app(), threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def serve_prefork(port, workers):
+    """워커 N 개를 띄우고 죽으면 재시작 (스캐너 스레드는 호출 전에 이 프로세스에서 시작)"""
+    ctx   = multiprocessing.get_context("spawn")
+    procs = {}
+    cmds  = ctx.Queue()   # 워커 → 이 프로세스 명령 (재스캔, 워커 메트릭 등)
+    _cmd_handlers[("worker_metrics", None)] = _on_worker_metrics
+    threading.Thread(target=_command_reader, args=(cmds.get,), daemon=True, name="cmd-workers").start()
+    while True:
+        for i in range(workers):
+            p = procs.get(i)
+            if p is None or not p.is_alive():
+                if p is not None:
+                    logging.warning(f"[SRV] 워커 {i} 종료(code={p.exitcode}) → 재시작")
+                p = ctx.Process(target=_serve_worker, args=(port, i, cmds), daemon=True, name=f"http-{i}")
+                p.start()
+                procs[i] = p
+        time.sleep(1.0)
+
+
+# ─────────────────────────────────────────────────────────
+# 명령 전달 (HTTP 워커 / 부모 프로세스 → 실제로 스캔하는 프로세스)
+# ─────────────────────────────────────────────────────────
+_cmd_out      = None              # HTTP 워커: 메인 프로세스로 가는 multiprocessing.Queue
+_cmd_conns    = {}                # 부모(--scanner-procs): city → 자식으로 가는 Pipe
+_cmd_lock     = threading.Lock()
+_cmd_handlers = {}                # (op, city) → fn(cmd) → 결과 dict. city=None 은 도시 무관 명령
+
+
+def dispatch_command(cmd):
+    """명령 처리 → 결과 dict. 다른 프로세스로 넘겼으면 {"forwarded": True}.
+    처리할 프로세스가 없으면 LookupError, 잘못된 요청이면 ValueError"""
+    if _cmd_out is not None:
+        _cmd_out.put(cmd)
+        return {"forwarded": True}
+    handler = _cmd_handlers.get((cmd["op"], cmd.get("city"))) or _cmd_handlers.get((cmd["op"], None))
+    if handler is not None:
+        return handler(cmd)
+    conn = _cmd_conns.get(cmd.get("city"))
+    if conn is not None:
+        with _cmd_lock:
+            conn.send_bytes(pickle.dumps(cmd, protocol=5))
+        return {"forwarded": True}
+    raise LookupError(f"{cmd.get('city')} 모니터링이 실행 중이 아닙니다")
+
+
+def _command_reader(recv):
+    """다른 프로세스에서 온 명령 처리. recv: 명령 1건을 반환하는 함수 (EOF/OSError 면 종료)"""
+    while True:
+        try:
+            cmd = recv()
+        except (EOFError, OSError):
+            return
+        try:
+            dispatch_command(cmd)
+        except (LookupError, ValueError) as e:
+            logging.warning(f"[CMD] {cmd.get('op')} 처리 불가: {e}")
+        except Exception as e:
+            logging.error(f"[CMD] {cmd.get('op')} 오류: {e}")
+
+
+# ─────────────────────────────────────────────────────────
+# 도시별 스캐너 프로세스 (--scanner-procs)
+# ─────────────────────────────────────────────────────────
+_child_conn    = None                  # 스캐너 자식 프로세스: 부모로 가는 Pipe
+_child_dirty   = threading.Event()
+_child_cycle   = threading.Event()     # 회차 종료 (부모가 스냅샷 저장)
+_scanner_stats = {}                    # city → {"pid", "restarts", "cpu_user", ...} (부모)
+_child_metrics = {}                    # city → 자식 Metrics.snapshot() (부모)
+
+metrics.describe("tcm_scanner_cpu_seconds",    "counter", "스캐너 프로세스 누적 CPU 시간")
+metrics.describe("tcm_scanner_restarts_total", "counter", "스캐너 프로세스 재시작 수")
+metrics.describe("tcm_scanner_rss_bytes",      "gauge",   "스캐너 프로세스 최대 RSS")
+
+
+def _city_payload(city):
+    payload = _sn_payload() if city == "sungnam" else _yn_payload()
+    key     = _sn_prev_key if city == "sungnam" else _yn_prev_key
+    return {**payload, "accounts": _accounts_payload(city)}, key[0]
+
+
+def _apply_city_payload(city, payload, notify_key):
+    """자식이 보낸 공개 스냅샷을 이 프로세스의 공유 상태에 반영"""
+    global _sn_available, _sn_courts, _sn_last_update, _sn_stale
+    global _yn_available, _yn_courts, _yn_last_update, _yn_period, _yn_stale
+    with _lock:
+        if city == "sungnam":
+            _sn_available, _sn_courts = payload["available"], payload["all_courts"]
+            _sn_last_update, _sn_stale = payload["last_update"], payload["stale"]
+            _sn_prev_key[0] = notify_key
+            _rescan_status[city].update(payload["rescan"])
+        else:
+            _yn_available, _yn_courts = payload["available"], payload["all_courts"]
+            _yn_last_update, _yn_stale = payload["last_update"], payload["stale"]
+            _yn_period = payload["period"]
+            _yn_progress.update(payload["progress"])
+            _yn_prev_key[0] = notify_key
+            _rescan_status[city].update(payload["rescan"])
+        _child_accounts[city] = payload.get("accounts", [])
+
+
+def _rusage():
+    t   = os.times()
+    rss = None
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    return {"cpu_user": t.user, "cpu_sys": t.system, "rss": rss}
+
 
-    courts = yn_fetch_courts()
-    if not courts:
-        logging.error("[YN] 코트 목록 없음")
-        return [], [], ""
+def _child_sender(city):
+    """자식: 변경된 스냅샷을 최대 0.5초 간격으로 pickle(protocol 5) 로 부모에 전송"""
+    while True:
+        _child_dirty.wait()
+        _child_dirty.clear()
+        cycle = _child_cycle.is_set()
+        _child_cycle.clear()
+        payload, key = _city_payload(city)
+        msg = {"city": city, "payload": payload, "notify_key": key, "cycle_done": cycle,
+               "usage": _rusage(), "metrics": metrics.snapshot()}
+        _child_conn.send_bytes(pickle.dumps(msg, protocol=5))
+        time.sleep(0.5)
+
+
+def _city_scanner_main(city, conn, opts, cmd_conn=None):
+    """스캐너 자식 프로세스 진입점 (spawn)"""
+    global _child_conn, _analytics, _transport_adapter
+    _child_conn = conn
+    exit_on_sigterm()
+    globals().update(opts.get("settings", {}))
+    if opts.get("cache_ttl") is not None:
+        _upstream_cache.ttl = opts["cache_ttl"]
+    if opts.get("parse_procs") is not None:
+        _parse_exec.procs = opts["parse_procs"]
+    setup_logging(tag=city)
+    load_telegram_config()
+    if opts.get("record"):
+        # capture.ndjson.gz → capture.sungnam.ndjson.gz (두 프로세스가 같은 파일에 쓰지 않도록)
+        head, base = os.path.split(opts["record"])
+        stem, dot, ext = base.partition(".")
+        _transport_adapter = TrafficRecorder(os.path.join(head, f"{stem}.{city}{dot}{ext}"))
+    elif opts.get("replay"):
+        _transport_adapter = ReplayAdapter(opts["replay"], opts.get("replay_timing", "fast"))
+    _analytics = CancelAnalytics()
+    load_snapshot()
+    _start_autohold(city)
+    threading.Thread(target=_child_sender, args=(city,), daemon=True, name="to-parent").start()
+    if cmd_conn is not None:
+        threading.Thread(target=_command_reader, args=(lambda: pickle.loads(cmd_conn.recv_bytes()),),
+                         daemon=True, name="from-parent").start()
+    (sungnam_loop if city == "sungnam" else yongin_loop)()
+
+
+def _scanner_receiver(city, proc, conn):
+    """부모: 자식 메시지 수신 → 공유 상태 반영. 파이프가 끊기면 종료"""
+    while True:
+        try:
+            msg = pickle.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            return
+        _apply_city_payload(city, msg["payload"], msg["notify_key"])
+        # 게이지는 이 도시 것만 (다른 도시 게이지는 부모/다른 자식 값이 정확)
+        snap = msg["metrics"]
+        snap["gauges"] = {k: v for k, v in snap["gauges"].items() if ("city", city) in k[1]}
+        _child_metrics[city] = snap
+        _scanner_stats[city].update(msg["usage"], last_msg=datetime.now(KST).isoformat())
+        _mark_published(city)
+        if msg["cycle_done"]:
+            save_snapshot()
+
+
+def supervise_scanners(cities, opts):
+    """도시별 스캐너 프로세스를 띄우고, 죽으면 지수 백오프로 재시작"""
+    ctx = multiprocessing.get_context("spawn")
+    procs, backoff = {}, {}
+    for city in cities:
+        _scanner_stats[city] = {"pid": None, "restarts": 0, "cpu_user": 0.0, "cpu_sys": 0.0,
+                                "cpu_prev": 0.0, "rss": None}
+        metrics.set_gauge("tcm_scanner_cpu_seconds", lambda c=city: _scanner_cpu(c, "user"),
+                          city=city, mode="user")
+        metrics.set_gauge("tcm_scanner_cpu_seconds", lambda c=city: _scanner_cpu(c, "sys"),
+                          city=city, mode="system")
+        metrics.set_gauge("tcm_scanner_restarts_total", lambda c=city: _scanner_stats[c]["restarts"],
+                          city=city)
+        metrics.set_gauge("tcm_scanner_rss_bytes", lambda c=city: _scanner_stats[c]["rss"], city=city)
+
+    started, not_before = {}, {}
+    while True:
+        for city in cities:
+            p = procs.get(city)
+            if p is not None and p.is_alive():
+                continue
+            st = _scanner_stats[city]
+            if p is not None and city not in not_before:
+                # 재시작 전 누적 CPU 보존. 60초 이상 정상 동작했으면 백오프 초기화
+                st["cpu_prev"] += st["cpu_user"] + st["cpu_sys"]
+                st["cpu_user"] = st["cpu_sys"] = 0.0
+                st["restarts"] += 1
+                if time.time() - started[city] > 60:
+                    backoff[city] = 1
+                wait = backoff.get(city, 1)
+                backoff[city] = min(wait * 2, 60)
+                not_before[city] = time.time() + wait
+                logging.error(f"[SUP] {city} 스캐너 종료(code={p.exitcode}) → {wait}초 후 재시작")
+            if time.time() < not_before.get(city, 0):
+                continue
+            not_before.pop(city, None)
+            started[city] = time.time()
+            child_opts = opts
+            if p is not None:   # 재시작한 자식의 첫 스냅샷 시간은 재시작 시점 기준
+                child_opts = dict(opts, settings=dict(opts.get("settings", {}), _T_START=started[city]))
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            cmd_recv, cmd_send      = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=_city_scanner_main, args=(city, child_conn, child_opts, cmd_recv),
+                            daemon=True, name=f"scan-{city}")
+            p.start()
+            child_conn.close()
+            cmd_recv.close()
+            with _cmd_lock:
+                _cmd_conns[city] = cmd_send
+            procs[city] = p
+            st["pid"] = p.pid
+            threading.Thread(target=_scanner_receiver, args=(city, p, parent_conn),
+                             daemon=True, name=f"recv-{city}").start()
+            logging.info(f"[SUP] {city} 스캐너 프로세스 시작 (pid={p.pid})")
+        time.sleep(1.0)
+
+
+def _scanner_cpu(city, mode):
+    st = _scanner_stats[city]
+    # 재시작 이전 누적분은 user 에 합산
+    return st["cpu_user"] + st["cpu_prev"] if mode == "user" else st["cpu_sys"]
 
-    mon_table = yn_load_monitoring_table()
-    if mon_table:
-        before = len(courts)
-        courts = [c for c in courts if any(g in c["location"] for g in mon_table)]
-        logging.info(f"[YN] 코트 필터: {before}→{len(courts)}")
 
-    target_dates = yn_dates_until_end_of_month()
-    period_str   = (f"{target_dates[0].strftime('%Y-%m-%d')} ~ "
-                    f"{target_dates[-1].strftime('%Y-%m-%d')} ({len(target_dates)}일)")
+# ─────────────────────────────────────────────────────────
+# 샤딩 (--shard-node: 여러 모니터 노드가 스캔 대상을 나눠 맡음)
+# ─────────────────────────────────────────────────────────
+CLUSTER_DB     = os.environ.get("TCM_CLUSTER_DB", os.path.join(_HERE, "state", "cluster.db"))
+_SHARD_VNODES  = 64     # 노드당 가상 노드 수 (해시 링 균등도)
+_SHARD_TTL     = 15.0   # 하트비트가 이보다 오래되면 이탈로 간주(초)
 
-    n_workers = min(YN_WORKERS, len(courts))
-    sess_pool = queue.Queue()
-    for i in range(n_workers):
-        s = yn_make_session()
-        uid, pw = creds[i % len(creds)]
-        if not yn_group_login(s, uid, pw):
-            for uid2, pw2 in creds:
-                if yn_group_login(s, uid2, pw2):
-                    break
-        sess_pool.put([s])
 
-    all_available  = []
-    all_court_data = []
-    completed      = 0
+class HashRing:
+    """일관 해싱 링. 노드가 추가/이탈해도 약 1/N 대상만 옮겨 간다"""
+
+    def __init__(self, nodes, vnodes=_SHARD_VNODES):
+        self.nodes  = sorted(nodes)
+        self._ring  = sorted((self._hash(f"{n}#{i}"), n) for n in self.nodes for i in range(vnodes))
+        self._keys  = [h for h, _ in self._ring]
 
-    def _worker(court, cred_idx):
-        holder = sess_pool.get()
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def owner(self, key):
+        if not self._ring:
+            return None
+        i = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[i][1]
+
+
+class ShardCluster:
+    """SQLite 멤버십/결과 테이블로 노드 간 조율 (외부 서비스 없음).
+
+    - members : 노드별 하트비트. 살아 있는 노드 중 node_id 가 가장 작은 노드가 리더
+    - results : 노드별·도시별 자기 샤드 스캔 결과 (JSON)
+    - notify  : 도시별 마지막 알림 키 — 리더가 바뀌어도 같은 알림을 다시 보내지 않음
+    """
+
+    def __init__(self, node_id, path=CLUSTER_DB, ttl=_SHARD_TTL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.node_id = node_id
+        self.ttl     = ttl
+        self._db     = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._lock   = threading.Lock()
+        self._ring   = HashRing([node_id])
+        self.members = [node_id]
+        self.owned   = {}   # city → 이번 회차 담당 (대상, 날짜) 수
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS members (
+                    node_id TEXT PRIMARY KEY, pid INTEGER, host TEXT, started REAL, heartbeat REAL);
+                CREATE TABLE IF NOT EXISTS results (
+                    node_id TEXT, city TEXT, payload TEXT, updated REAL,
+                    PRIMARY KEY (node_id, city));
+                CREATE TABLE IF NOT EXISTS notify (city TEXT PRIMARY KEY, key TEXT);
+            """)
+        self.heartbeat()
+
+    def heartbeat(self):
+        """하트비트 갱신 + 멤버 목록/링 재계산. 멤버가 바뀌었으면 True"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO members VALUES (?,?,?,?,?) ON CONFLICT(node_id) DO UPDATE SET "
+                "pid = excluded.pid, host = excluded.host, heartbeat = excluded.heartbeat",
+                (self.node_id, os.getpid(), socket.gethostname(), now, now))
+            live = [n for (n,) in self._db.execute(
+                "SELECT node_id FROM members WHERE heartbeat >= ? ORDER BY node_id", (now - self.ttl,))]
+        if live == self.members:
+            return False
+        logging.info(f"[CLU] 멤버 변경: {self.members} → {live} (리더: {live[0]})")
+        self.members = live
+        self._ring   = HashRing(live)
+        return True
+
+    def leave(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM members WHERE node_id = ?", (self.node_id,))
+
+    @property
+    def is_leader(self):
+        return self.members[0] == self.node_id
+
+    def owner_fn(self, city, count=True):
+        """(대상, 날짜) → 이 노드 담당 여부. 회차 시작 시점의 링으로 고정.
+        count=True 면 담당 판정 수를 owned[city] 에 집계 (스캔 루프용)"""
+        ring, me = self._ring, self.node_id
+        if count:
+            self.owned[city] = 0
+
+        def owns(target, date):
+            mine = ring.owner(f"{city}|{target}|{date}") == me
+            if mine and count:
+                self.owned[city] += 1
+            return mine
+        return owns
+
+    def publish(self, city, payload):
+        """이 노드가 맡은 샤드의 결과 저장"""
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?,?,?,?)",
+                             (self.node_id, city, data, time.time()))
+
+    def version(self):
+        """결과가 바뀌었는지 빠르게 확인하기 위한 값"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*), MAX(updated) FROM results").fetchone()
+
+    def collect(self, city, grace):
+        """살아 있는 노드 + 이탈 후 grace 초가 안 지난 노드의 결과 목록.
+        이탈 노드의 대상은 남은 노드의 다음 회차에서 다시 채워지므로 그동안 유지"""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT r.node_id, r.payload FROM results r LEFT JOIN members m ON m.node_id = r.node_id "
+                "WHERE r.city = ? AND (m.heartbeat >= ? OR r.updated >= ?) ORDER BY r.node_id",
+                (city, now - self.ttl, now - grace)).fetchall()
+        return [json.loads(p) for _, p in rows]
+
+    def notify_key(self, city):
+        with self._lock:
+            row = self._db.execute("SELECT key FROM notify WHERE city = ?", (city,)).fetchone()
+        return row[0] if row else ""
+
+    def set_notify_key(self, city, key):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO notify VALUES (?,?)", (city, key))
+
+
+_cluster = None
+
+
+def _merge_shards(payloads):
+    """노드별 결과 합치기. 재배치 중 두 노드가 같은 슬롯을 가질 수 있어 중복 제거"""
+    def dedupe(rows):
+        seen, out = set(), []
+        for r in rows:
+            k = tuple(sorted(r.items()))
+            if k not in seen:
+                seen.add(k)
+                out.append(r)
+        return out
+    avail  = dedupe(a for p in payloads for a in p["available"])
+    courts = dedupe(c for p in payloads for c in p["all_courts"])
+    last   = max((p["last_update"] for p in payloads), default="")
+    return avail, courts, last
+
+
+def _cluster_apply(city, notify_table):
+    """샤드 결과를 합쳐 대시보드 갱신. 리더면 알림까지 (dedupe 키는 클러스터 DB 에 보관)"""
+    global _sn_available, _sn_courts, _sn_last_update, _sn_stale
+    global _yn_available, _yn_courts, _yn_last_update, _yn_period, _yn_stale
+    payloads = _cluster.collect(city, SN_INTERVAL * 2 if city == "sungnam" else YN_INTERVAL * 2)
+    if not payloads:
+        return
+    avail, courts, last = _merge_shards(payloads)
+    with _lock:
+        if city == "sungnam":
+            _sn_available, _sn_courts, _sn_last_update, _sn_stale = avail, courts, last, False
+        else:
+            _yn_available, _yn_courts, _yn_last_update, _yn_stale = avail, courts, last, False
+            _yn_period = next((p["period"] for p in payloads if p.get("period")), _yn_period)
+    _mark_published(city)
+    if not _cluster.is_leader or not notify_table:
+        return
+    holder = _sn_prev_key if city == "sungnam" else _yn_prev_key
+    holder[0] = _cluster.notify_key(city)
+    if city == "sungnam":
+        slots = [c for c in courts if c.get("is_available") and sn_passes_notify(c, notify_table)]
+        _notify_if_changed("[SN]", slots, holder, _sn_build_msg)
+    else:
+        # 아직 회차 중인 노드가 있으면 새로 열린 슬롯만 알림 (용인 점진 공개와 동일)
+        partial = any(p.get("partial") for p in payloads)
+        slots   = [e for e in avail if yn_passes_filter(e, notify_table)]
+        _notify_if_changed("[YN]", slots, holder, _yn_build_msg, only_new=partial)
+    _cluster.set_notify_key(city, holder[0])
+
+
+def _cluster_loop(interval=2.0):
+    """하트비트 + 결과 변경 감지 → 병합"""
+    tables  = {"sungnam": sn_load_notify_table(), "yongin": yn_load_notify_table()}
+    last_hb = 0.0
+    seen    = None
+    while True:
         try:
-            return yn_scan_one_court(court, target_dates, holder, creds, cred_idx)
-        finally:
-            sess_pool.put(holder)
+            changed = False
+            if time.time() - last_hb >= _cluster.ttl / 3:
+                changed = _cluster.heartbeat()
+                last_hb = time.time()
+            ver = _cluster.version()
+            if changed or ver != seen:
+                seen = ver
+                for city in ("sungnam", "yongin"):
+                    _cluster_apply(city, tables[city])
+        except sqlite3.Error as e:
+            logging.warning(f"[CLU] 클러스터 DB 오류: {e}")
+        _cluster_dirty.wait(timeout=interval)
+        _cluster_dirty.clear()
 
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        futures = {executor.submit(_worker, c, i % len(creds)): c
-                   for i, c in enumerate(courts)}
-        for fut in as_completed(futures):
-            court = futures[fut]
-            try:
-                a, d = fut.result()
-                all_available.extend(a)
-                all_court_data.extend(d)
-            except Exception as exc:
-                logging.error(f"[YN] 워커 오류 [{court['name']}]: {exc}")
-            completed += 1
-            logging.info(f"[YN] ✅ {completed}/{len(courts)}: {court['name']}")
 
-    if mon_table:
-        all_available  = [e for e in all_available  if yn_passes_filter(e, mon_table)]
-        all_court_data = [e for e in all_court_data if yn_passes_filter(e, mon_table)]
-        logging.info(f"[YN] 시간 필터 적용: 예약가능 {len(all_available)}개")
+_cluster_dirty = threading.Event()
+metrics.describe("tcm_cluster_members",        "gauge", "살아 있는 샤드 노드 수")
+metrics.describe("tcm_cluster_leader",         "gauge", "이 노드가 리더면 1")
+metrics.describe("tcm_cluster_owned_targets",  "gauge", "이번 회차에 이 노드가 맡은 (대상, 날짜) 수")
 
-    return all_available, all_court_data, period_str
+
+def _cluster_publish(city, payload):
+    """스캔 루프 → 클러스터: 자기 샤드 결과 저장 후 병합 스레드 깨우기"""
+    _cluster.publish(city, payload)
+    _cluster_dirty.set()
+
+
+# ─────────────────────────────────────────────────────────
+# 회차 스케줄러 (고정 주기 + 회차 예산)
+# ─────────────────────────────────────────────────────────
+CYCLE_BUDGET    = float(os.environ.get("TCM_CYCLE_BUDGET", "0.8"))   # 회차 예산 = 주기 × 이 비율
+CYCLE_JITTER    = float(os.environ.get("TCM_CYCLE_JITTER", "0.1"))   # 회차 시작 시각을 ±주기 × 이 비율만큼 흔듦
+CYCLE_NEAR_DAYS = int(os.environ.get("TCM_CYCLE_NEAR_DAYS", "3"))    # 오늘부터 이 일수 안의 날짜는 예산을 넘어도 스캔
+
+metrics.describe("tcm_cycle_missed_total",   "counter", "회차가 길어져 놓친 시작 시각 수")
+metrics.describe("tcm_cycle_deferred_total", "counter", "회차 예산 초과로 다음 회차로 미룬 (대상, 날짜) 수")
+metrics.describe("tcm_cycle_budget_used",    "gauge",   "직전 회차가 쓴 예산 비율 (1 이상 = 초과)")
+
+
+class CycleScheduler:
+    """도시 스캔 루프의 고정 주기 스케줄러.
+    회차 시작 시각을 첫 회차 기준 interval 간격 격자에 맞춰 작업 시간만큼 주기가 밀리지 않게 하고,
+    매 회차 ±jitter 로 흔들어 다른 프로세스/도시와 같은 순간에 몰리지 않게 한다.
+    회차가 예산(interval × budget)을 넘기면 near_days 이후 날짜는 건너뛰고 다음 회차 앞쪽에서 스캔한다.
+    다음 시작 시각까지 넘기면 놓친 시각 수를 세고 다음 격자 시각을 기다린다 (몰아서 따라잡지 않음).
+    격자 시각에 시작한 회차가 정기 회차(full), 적응형 폴링 hint 로 그 사이에 깨어난 회차가 부분 회차다."""
+
+    def __init__(self, city, interval, budget=None, jitter=None, near_days=None):
+        self.city      = city
+        self.interval  = interval
+        self.budget    = CYCLE_BUDGET if budget is None else budget
+        self.jitter    = CYCLE_JITTER if jitter is None else jitter
+        self.near_days = CYCLE_NEAR_DAYS if near_days is None else near_days
+        self.tag       = "[SN]" if city == "sungnam" else "[YN]"
+        self.cycle     = 0      # 회차 번호 (로그 cycle 필드: sn-12)
+        self.missed    = 0
+        self._lock     = threading.Lock()
+        self._anchor   = None   # 격자 기준 시각 (monotonic)
+        self._k        = 0      # 마지막으로 쓴 격자 번호
+        self.full      = True   # 이번 회차가 격자 시각에 시작한 정기 회차인지
+        self._t0       = 0.0
+        self._deadline = math.inf
+        self._prev     = set()  # 지난 회차에 미룬 (대상, 날짜)
+        self._deferred = set()  # 이번 회차에 미루는 (대상, 날짜)
+        self._waits    = {}     # 지난 회차에 미룬 (대상, 날짜) → 연속으로 미뤄진 회차 수
+
+    def begin(self):
+        self.cycle += 1
+        _log_cycle.set((self.tag[1:-1], f"{self.tag[1:-1].lower()}-{self.cycle}"))
+        now = time.monotonic()
+        if self._anchor is None:
+            self._anchor = now
+        self._t0, self._deadline = now, now + self.interval * self.budget
+        with self._lock:
+            self._waits = {p: self._waits.get(p, 0) + 1 for p in self._deferred}
+            self._prev, self._deferred = self._deferred, set()
+
+    def allows(self, target, day, lead):
+        """(대상, 날짜) 를 이번 회차에 스캔할지. 예산을 넘겼고 먼 날짜면 미루고 False"""
+        if lead < self.near_days or time.monotonic() < self._deadline:
+            return True
+        with self._lock:
+            self._deferred.add((target, day))
+        metrics.inc("tcm_cycle_deferred_total", city=self.city)
+        return False
+
+    def priority(self, target, day, lead):
+        """스캔 순서 키: 가까운 날짜 → 지난 회차에 미룬 날짜 (오래 미뤄진 것부터) → 나머지 (각각 날짜순)
+        미룬 날짜가 한 회차 여유분보다 많아도 먼 날짜만 계속 밀리지 않고 돌아가며 스캔된다."""
+        if lead < self.near_days:
+            return (0, 0, lead)
+        waits = self._waits.get((target, day), 0)
+        return (1, -waits, lead) if waits else (2, 0, lead)
+
+    def deferred_targets(self):
+        """지난 회차에 미룬 날짜가 있는 대상 → 그중 가장 오래 미뤄진 회차 수"""
+        out = {}
+        for (t, _), waits in self._waits.items():
+            out[t] = max(out.get(t, 0), waits)
+        return out
+
+    def deferred_days(self, target):
+        """이번 회차에 미룬 target 의 날짜 (YYYYMMDD)"""
+        with self._lock:
+            return {_date_key(d) for t, d in self._deferred if t == target}
+
+    def end(self):
+        elapsed = time.monotonic() - self._t0
+        metrics.set_gauge("tcm_cycle_budget_used", round(elapsed / (self.interval * self.budget), 3),
+                          city=self.city)
+        if self._deferred:
+            logging.warning(f"{self.tag} 회차 예산 {self.interval * self.budget:.0f}초 초과 "
+                            f"({elapsed:.1f}초) → 먼 날짜 {len(self._deferred)}건 다음 회차로")
+
+    def slack(self):
+        """due 판정 여유(초): 정기 회차는 지터만큼 일찍 시작할 수 있음"""
+        return (2 * self.jitter * self.interval if self.full else 0.0) + 1.0
+
+    def wait(self, hint=None):
+        """다음 회차 시작 시각까지 대기.
+        hint: 적응형 폴링(_analytics)이 준 짧은 간격 대상까지 남은 초 — 다음 격자 시각보다 이르면 그때 깨어나
+        부분 회차를 돌리고, 격자는 그대로 둔다 (hint 는 상한일 뿐 주기를 밀지 않음)."""
+        now = time.monotonic()
+        k   = self._k + 1
+        nxt = self._anchor + k * self.interval
+        if now > nxt:
+            # 정기 회차가 넘긴 시각은 놓친 것으로 세고 다음 격자로. 부분 회차가 걸친 시각은 지금 바로 시작
+            missed = int((now - nxt) // self.interval) + (1 if self.full else 0)
+            if missed:
+                k          += missed
+                self._k     = k - 1      # 놓친 시각은 부분 회차 뒤에도 다시 쓰지 않음
+                self.missed += missed
+                metrics.inc("tcm_cycle_missed_total", missed, city=self.city)
+                logging.warning(f"{self.tag} 회차가 {now - self._t0:.1f}초 걸려 시작 시각 {missed}번 놓침 "
+                                f"(주기 {self.interval:g}초) → 다음 주기 시각에 시작")
+            nxt = self._anchor + k * self.interval
+        at = max(now, nxt + random.uniform(-self.jitter, self.jitter) * self.interval)
+        if hint is not None and now + hint < at:
+            self.full = False
+            time.sleep(hint)
+            return
+        self._k, self.full = k, True
+        time.sleep(max(0.0, at - now))
 
 
 # ─────────────────────────────────────────────────────────
 # 백그라운드 모니터링 루프
 # ─────────────────────────────────────────────────────────
-def _notify_if_changed(label, new_courts, prev_key_holder, build_msg_fn):
-    """new_courts 가 이전과 달라지면 텔레그램 전송. prev_key_holder = [last_key]"""
+def _notify_if_changed(label, new_courts, prev_key_holder, build_msg_fn, only_new=False):
+    """new_courts 가 이전과 달라지면 텔레그램 전송. prev_key_holder = [last_key]
+    only_new=True 이면 이전 키에 없던 슬롯이 생긴 경우에만 전송 (회차 도중 부분 결과용)"""
     if not new_courts:
         return
     key = _courts_key(new_courts)
+    if only_new and set(key.split("|")) <= _seen_keys(prev_key_holder):
+        return
     if key != prev_key_holder[0]:
         prev_key_holder[0] = key
         msg = build_msg_fn(new_courts)
@@ -839,6 +3457,34 @@ def _notify_if_changed(label, new_courts, prev_key_holder, build_msg_fn):
         send_telegram(msg)
 
 
+def _record_cycle(city, seconds):
+    metrics.observe("tcm_cycle_seconds", seconds, city=city)
+    metrics.set_gauge("tcm_last_cycle_seconds", round(seconds, 3), city=city)
+
+
+_first_snapshot = {}   # city → 시작 후 첫 스냅샷까지 초
+
+
+def _note_first_snapshot(city):
+    """이번 실행에서 도시의 첫 스냅샷 공개 시점 기록 (콜드 스타트 지표)"""
+    if city in _first_snapshot:
+        return
+    secs = _first_snapshot.setdefault(city, time.time() - _T_START)
+    metrics.set_gauge("tcm_first_snapshot_seconds", round(secs, 3), city=city)
+    logging.info(f"[{'SN' if city == 'sungnam' else 'YN'}] ⏱ 시작 → 첫 스냅샷 {secs:.2f}초")
+
+
+def _snapshot_age(city):
+    ts = _sn_last_update if city == "sungnam" else _yn_last_update
+    if not ts:
+        return None
+    return (datetime.now(KST) - datetime.fromisoformat(ts)).total_seconds()
+
+
+metrics.set_gauge("tcm_snapshot_age_seconds", lambda: _snapshot_age("sungnam"), city="sungnam")
+metrics.set_gauge("tcm_snapshot_age_seconds", lambda: _snapshot_age("yongin"),  city="yongin")
+
+
 def _sn_build_msg(courts):
     lines = [_tg_escape("🎾 [성남] 예약 가능한 관심 코트 발견!"), ""]
     by_date = {}
@@ -876,8 +3522,133 @@ def _yn_build_msg(courts):
     return "\n".join(lines)
 
 
+# 스캔 루프와 부분 재스캔(/api/<city>/rescan)이 함께 쓰는 대상별 마지막 결과
+_sn_cache      = {}   # fac_id → (available, courts)
+_sn_targets    = []   # 모니터링 시설 fac_id (표시 순서)
+_sn_facilities = []   # 모니터링 시설 설정 (sn_run_once 입력)
+_sn_accounts   = []
+_sn_notify     = []   # NotifyTable 성남 시설
+_yn_cache      = {}   # resve_id → (available, courts)
+_yn_targets    = []   # 최근 코트 목록의 resve_id
+_yn_known      = {}   # resve_id → 코트 정보 (yn_fetch_courts 결과)
+_yn_notify     = {}   # NotifyTable 용인 구/시간대
+_publish_lock  = threading.Lock()   # 캐시 갱신 + 공개 순서 보장 (루프 ↔ 재스캔)
+
+
+_sn_notify_slots = {}   # fac_id → 알림 조건에 맞는 예약 가능 슬롯 (공개 때 바뀐 시설만 다시 고름)
+_yn_notify_slots = {}   # resve_id → 〃
+_publish_pending = {"sungnam": False, "yongin": False}   # 부분 공개로 캐시만 바뀌고 공개 목록은 아직 안 합친 도시 (_lock)
+
+
+def _merge_cache(targets, cache):
+    """대상별 캐시를 표시 순서대로 이어 붙여 → (avail, courts)"""
+    avail  = [a for t in targets for a in cache.get(t, ([], []))[0]]
+    courts = [c for t in targets for c in cache.get(t, ([], []))[1]]
+    return avail, courts
+
+
+def _flush_published():
+    """(_lock 보유 상태에서 호출) 부분 공개로 밀린 공개 목록을 캐시에서 다시 합침.
+    회차 도중에는 코트마다 합치지 않고, 스냅샷을 읽을 때(대시보드·공유 스냅샷·저장) 한 번만 합친다"""
+    global _sn_available, _sn_courts, _yn_available, _yn_courts
+    if _publish_pending["sungnam"]:
+        _sn_available, _sn_courts   = _merge_cache(_sn_targets, _sn_cache)
+        _publish_pending["sungnam"] = False
+    if _publish_pending["yongin"]:
+        _yn_available, _yn_courts   = _merge_cache(_yn_targets, _yn_cache)
+        _publish_pending["yongin"]  = False
+
+
+def _notify_update(label, per_target, targets, changed, pick, holder, build_msg_fn, partial):
+    """changed 대상의 알림 슬롯만 다시 골라(pick) per_target 갱신 후 알림 평가.
+    부분 공개는 바뀐 대상에 이전 알림에 없던 슬롯이 있을 때만 전체 알림 목록을 모은다"""
+    if not partial:
+        per_target.clear()
+    else:   # 정기 공개 전(재시작 직후)에는 아직 안 고른 대상을 한 번만 채움
+        changed = list(changed) + [t for t in targets if t not in per_target]
+    for t in changed:
+        per_target[t] = pick(t)
+    if partial:
+        seen = _seen_keys(holder)
+        if all(_court_key(c) in seen for t in changed for c in per_target[t]):
+            return
+    notify_slots = [c for t in targets for c in per_target.get(t, ())]
+    if not partial:
+        logging.info(f"{label} 알림 대상 슬롯: {len(notify_slots)}개")
+    _notify_if_changed(label, notify_slots, holder, build_msg_fn, only_new=partial)
+
+
+def _sn_publish(partial=False, changed=None):
+    """캐시를 합쳐 성남 공개 스냅샷 갱신 + 알림 평가 → (avail, courts).
+    partial=True 이면 changed(결과가 바뀐 fac_id, 없으면 전체) 만 알림 평가하고,
+    공개 목록은 읽힐 때 합친다 (_flush_published) — 반환값 None"""
+    global _sn_available, _sn_courts, _sn_last_update, _sn_stale
+    _note_first_snapshot("sungnam")
+    changed = _sn_targets if changed is None else [fid for fid in changed if fid in _sn_cache]
+    if _cluster:
+        # 샤딩 모드: 자기 샤드만 저장, 병합/알림은 _cluster_loop (리더)
+        avail, courts = _merge_cache(_sn_targets, _sn_cache)
+        _cluster_publish("sungnam", {"available": avail, "all_courts": courts,
+                                     "last_update": datetime.now(KST).isoformat()})
+        return avail, courts
+    avail = courts = None
+    if not partial:
+        avail, courts = _merge_cache(_sn_targets, _sn_cache)
+    with _lock:
+        if partial:
+            _publish_pending["sungnam"] = True
+        else:
+            _sn_available, _sn_courts   = avail, courts
+            _publish_pending["sungnam"] = False
+        _sn_last_update = datetime.now(KST).isoformat()
+        _sn_stale       = False
+    _mark_published("sungnam")
+    # 알림 체크: courts 에서 notify 조건 맞는 가용 슬롯 추출
+    if _sn_notify:
+        _notify_update("[SN]", _sn_notify_slots, _sn_targets, changed if partial else _sn_targets,
+                       lambda fid: [c for c in _sn_cache.get(fid, ([], []))[1]
+                                    if c.get("is_available") and sn_passes_notify(c, _sn_notify)],
+                       _sn_prev_key, _sn_build_msg, partial)
+    return (avail, courts) if not partial else None
+
+
+def _yn_publish(period=None, partial=False, changed=None):
+    """캐시를 합쳐 용인 공개 스냅샷 갱신 + 알림 평가 → (avail, courts).
+    partial=True 이면 changed(결과가 바뀐 resve_id, 없으면 전체) 만 알림 평가하고,
+    공개 목록은 읽힐 때 합친다 (_flush_published) — 반환값 None"""
+    global _yn_available, _yn_courts, _yn_last_update, _yn_period, _yn_stale
+    _note_first_snapshot("yongin")
+    changed = _yn_targets if changed is None else [rid for rid in changed if rid in _yn_cache]
+    if _cluster:
+        avail, courts = _merge_cache(_yn_targets, _yn_cache)
+        _cluster_publish("yongin", {"available": avail, "all_courts": courts,
+                                    "last_update": datetime.now(KST).isoformat(),
+                                    "period": period or "", "partial": partial})
+        return avail, courts
+    avail = courts = None
+    if not partial:
+        avail, courts = _merge_cache(_yn_targets, _yn_cache)
+    with _lock:
+        if partial:
+            _publish_pending["yongin"] = True
+        else:
+            _yn_available, _yn_courts  = avail, courts
+            _publish_pending["yongin"] = False
+        _yn_last_update = datetime.now(KST).isoformat()
+        _yn_stale       = False
+        if period is not None:
+            _yn_period  = period
+    _mark_published("yongin")
+    # 알림 체크: avail 중 notify 조건 맞는 슬롯 (MonitoringTable 이미 필터됨)
+    if _yn_notify:
+        _notify_update("[YN]", _yn_notify_slots, _yn_targets, changed if partial else _yn_targets,
+                       lambda rid: [e for e in _yn_cache.get(rid, ([], []))[0] if yn_passes_filter(e, _yn_notify)],
+                       _yn_prev_key, _yn_build_msg, partial)
+    return (avail, courts) if not partial else None
+
+
 def sungnam_loop():
-    global _sn_available, _sn_courts, _sn_last_update
+    global _sn_facilities, _sn_accounts, _sn_notify
     accounts     = sn_load_accounts()
     facilities   = sn_load_monitoring_table()
     notify_facs  = sn_load_notify_table()
@@ -896,54 +3667,1232 @@ def sungnam_loop():
         logging.info(f"[SN] NotifyTable 로드: {[f['name'] for f in notify_facs]}")
     else:
         logging.warning("[SN] NotifyTable.txt 없음 – 성남 텔레그램 알림 비활성화")
-    sn_prev_key = [""]
+    _sn_accounts, _sn_facilities, _sn_notify = accounts, facilities, notify_facs
+    _sn_targets[:] = [f["id"] for f in facilities]
+    _session_pools["sungnam"].prewarm_async(1)
+    _start_rescan("sungnam")
+    _start_release("sungnam")
+
+    def _on_date(due, avail, courts):
+        with _publish_lock:
+            for fid in due:
+                _sn_cache[fid] = ([a for a in avail if a["fac_id"] == fid],
+                                  [c for c in courts if c["fac_id"] == fid])
+            _sn_publish(partial=True, changed=due)
+
+    sched = CycleScheduler("sungnam", SN_INTERVAL)
     while True:
+        sched.begin()
         try:
             logging.info("[SN] ======= 성남 모니터링 시작 =======")
-            avail, courts = sn_run_once(accounts, facilities)
+            t_cycle = time.perf_counter()
+            due = (_analytics.due_targets("sungnam", _sn_targets, SN_INTERVAL, slack=sched.slack(),
+                                          full=sched.full)
+                   if _analytics else _sn_targets)
+            owns = _cluster.owner_fn("sungnam") if _cluster else None
+            # 대시보드가 비어 있는 첫 회차는 가까운 날짜부터 끝나는 대로 공개 (콜드 스타트)
             with _lock:
-                _sn_available   = avail
-                _sn_courts      = courts
-                _sn_last_update = datetime.now(KST).isoformat()
+                cold = not _sn_last_update
+            res = sn_run_once(accounts, [f for f in facilities if f["id"] in due], owns,
+                              on_date_done=(lambda a, c: _on_date(due, a, c)) if cold else None,
+                              budget=sched)
+            if res is None:   # 로그인 실패 → 대시보드는 지난 결과 유지, 다음 회차에 재시도
+                raise RuntimeError("로그인 가능한 계정 없음")
+            avail, courts = res
+            with _publish_lock:
+                for fid in due:
+                    fac_courts   = [c for c in courts if c["fac_id"] == fid]
+                    old_a, old_c = _sn_cache.get(fid, ([], []))
+                    kept         = sched.deferred_days(fid)
+                    _sn_cache[fid] = (_keep_deferred(old_a, [a for a in avail if a["fac_id"] == fid], kept),
+                                      _keep_deferred(old_c, fac_courts, kept))
+                    if _analytics and fac_courts:
+                        _analytics.observe("sungnam", fid, fac_courts)
+                avail, courts = _sn_publish()
+            _record_cycle("sungnam", time.perf_counter() - t_cycle)
             logging.info(f"[SN] 완료: 예약가능 {len(avail)}개 / 전체 {len(courts)}개")
-            # 알림 체크: courts 에서 notify 조건 맞는 가용 슬롯 추출
-            if notify_facs:
-                notify_slots = [c for c in courts
-                                if c.get("is_available")
-                                and sn_passes_notify(c, notify_facs)]
-                logging.info(f"[SN] 알림 대상 슬롯: {len(notify_slots)}개")
-                _notify_if_changed("[SN]", notify_slots, sn_prev_key, _sn_build_msg)
+            _cycle_done("sungnam", sched.full)
         except Exception as e:
             logging.error(f"[SN] 루프 오류: {e}")
-        time.sleep(90)
+        sched.end()
+        sched.wait(_analytics.next_wakeup("sungnam", _sn_targets, SN_INTERVAL) if _analytics else None)
 
 
 def yongin_loop():
-    global _yn_available, _yn_courts, _yn_last_update, _yn_period
-    notify_table = yn_load_notify_table()
-    if notify_table:
-        logging.info(f"[YN] NotifyTable 로드: {list(notify_table.keys())}")
+    global _yn_notify
+    _yn_notify = yn_load_notify_table()
+    if _yn_notify:
+        logging.info(f"[YN] NotifyTable 로드: {list(_yn_notify.keys())}")
     else:
         logging.warning("[YN] NotifyTable.txt 없음 – 용인 텔레그램 알림 비활성화")
-    yn_prev_key = [""]
+    _session_pools["yongin"].prewarm_async(YN_WORKERS)   # 코트 목록 로드와 동시에 로그인
+    _start_rescan("yongin")
+    _start_release("yongin")
+
+    def _select(court_list):
+        _yn_targets[:] = [c["resve_id"] for c in court_list]
+        _yn_known.update((c["resve_id"], c) for c in court_list)
+        due = (_analytics.due_targets("yongin", _yn_targets, YN_INTERVAL, slack=sched.slack(),
+                                      full=sched.full)
+               if _analytics else _yn_targets)
+        with _lock:
+            _yn_progress.update(done=0, total=len(due))
+        return [c for c in court_list if c["resve_id"] in due]
+
+    def _on_court(court, a, d, done, total):
+        rid = court["resve_id"]
+        if _analytics and d:
+            _analytics.observe("yongin", rid, d)
+        with _lock:
+            _yn_progress.update(done=done, total=total)
+        with _publish_lock:
+            old_a, old_c = _yn_cache.get(rid, ([], []))
+            kept         = sched.deferred_days(rid)
+            _yn_cache[rid] = (_keep_deferred(old_a, a, kept), _keep_deferred(old_c, d, kept))
+            _yn_publish(partial=True, changed=(rid,))
+
+    sched = CycleScheduler("yongin", YN_INTERVAL)
     while True:
+        sched.begin()
         try:
             logging.info("[YN] ======= 용인 모니터링 시작 =======")
-            avail, courts, period = yn_run_once()
+            t_cycle = time.perf_counter()
             with _lock:
-                _yn_available   = avail
-                _yn_courts      = courts
-                _yn_last_update = datetime.now(KST).isoformat()
-                _yn_period      = period
+                _yn_progress.update(running=True, done=0, total=0,
+                                    started=datetime.now(KST).isoformat())
+            owns = _cluster.owner_fn("yongin") if _cluster else None
+            # 부분 회차(빠른 대상만)는 지난 정기 회차의 코트 목록을 재사용 — 목록 페이지 요청 생략
+            known = None if sched.full else [_yn_known[r] for r in _yn_targets if r in _yn_known]
+            _, _, period  = yn_run_once(select_courts=_select, on_court_done=_on_court, include_target=owns,
+                                        courts=known, budget=sched)
+            with _publish_lock:
+                avail, courts = _yn_publish(period)
+            _record_cycle("yongin", time.perf_counter() - t_cycle)
             logging.info(f"[YN] 완료: 예약가능 {len(avail)}개 / 전체 {len(courts)}개")
-            # 알림 체크: avail 중 notify 조건 맞는 슬롯 (MonitoringTable 이미 필터됨)
-            if notify_table:
-                notify_slots = [e for e in avail if yn_passes_filter(e, notify_table)]
-                logging.info(f"[YN] 알림 대상 슬롯: {len(notify_slots)}개")
-                _notify_if_changed("[YN]", notify_slots, yn_prev_key, _yn_build_msg)
+            _cycle_done("yongin", sched.full)
         except Exception as e:
             logging.error(f"[YN] 루프 오류: {e}")
-        time.sleep(300)
+        with _lock:
+            _yn_progress["running"] = False
+        sched.end()
+        sched.wait(_analytics.next_wakeup("yongin", _yn_targets, YN_INTERVAL) if _analytics else None)
+
+
+# ─────────────────────────────────────────────────────────
+# 부분 재스캔 (POST /api/<city>/rescan, 대시보드 🔄 버튼)
+# ─────────────────────────────────────────────────────────
+RESCAN_DEBOUNCE     = 1.0    # 첫 요청 후 이만큼 더 모아서 한 번에 스캔(초)
+RESCAN_COOLDOWN     = 10.0   # 같은 도시 재스캔 사이 최소 간격(초)
+RESCAN_MAX_PAIRS    = 120    # 1회 최대 (대상, 날짜) 수 — 초과분은 다음 회차로
+RESCAN_DEFAULT_DAYS = 3      # 날짜 미지정 시 오늘부터 며칠
+
+metrics.describe("tcm_rescan_requests_total", "counter",   "재스캔 요청 수")
+metrics.describe("tcm_rescan_batches_total",  "counter",   "실제 수행한 재스캔 회차 수")
+metrics.describe("tcm_rescan_seconds",        "histogram", "재스캔 요청 → 결과 공개까지 시간")
+
+
+class RescanQueue:
+    """도시별 재스캔 요청을 모아(debounce) 한 번에 처리.
+    여러 클라이언트가 같은 (대상, 날짜) 를 요청해도 한 번만 스캔하고, 가까운 날짜부터 처리한다."""
+
+    def __init__(self, city, resolve_fn, scan_fn):
+        self.city       = city
+        self.resolve_fn = resolve_fn   # (targets, dates) → [(target, "YYYY-MM-DD"), ...]
+        self.scan_fn    = scan_fn      # [(target, "YYYY-MM-DD"), ...] → 스캔 + 공개
+        self._cond      = threading.Condition()
+        self._pending   = {}           # (target, date) → 최초 요청 시각
+        self._last      = 0.0          # 마지막 재스캔 종료 시각
+        threading.Thread(target=self._run, daemon=True, name=f"rescan-{city}").start()
+
+    def submit(self, cmd):
+        pairs = self.resolve_fn(cmd.get("targets"), cmd.get("dates"))
+        if not pairs:
+            raise ValueError("재스캔할 대상이 없습니다")
+        now = time.time()
+        metrics.inc("tcm_rescan_requests_total", city=self.city)
+        with self._cond:
+            for p in pairs:
+                self._pending.setdefault(p, now)
+            eta = max(now + RESCAN_DEBOUNCE, self._last + RESCAN_COOLDOWN) - now
+            self._cond.notify()
+        self._set_status()
+        return {"queued": len(pairs), "eta_s": round(eta, 1)}
+
+    def _set_status(self, **kw):
+        with _lock:
+            _rescan_status[self.city].update(pending=len(self._pending), **kw)
+        _mark_published(self.city)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                first = min(self._pending.values())
+            # 첫 요청 후 RESCAN_DEBOUNCE 만큼 더 모으고, 직전 재스캔과 RESCAN_COOLDOWN 간격 유지
+            wait = max(first + RESCAN_DEBOUNCE, self._last + RESCAN_COOLDOWN) - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            with self._cond:
+                pairs  = sorted(self._pending, key=lambda p: (p[1], p[0]))[:RESCAN_MAX_PAIRS]
+                queued = [self._pending.pop(p) for p in pairs]
+            self._set_status(running=True)
+            try:
+                self.scan_fn(pairs)
+                metrics.inc("tcm_rescan_batches_total", city=self.city)
+                now = time.time()
+                for t in queued:
+                    metrics.observe("tcm_rescan_seconds", now - t, city=self.city)
+                logging.info(f"[RESCAN] {self.city} {len(pairs)}건 완료 ({now - min(queued):.1f}초)")
+            except Exception as e:
+                logging.error(f"[RESCAN] {self.city} 오류: {e}")
+            self._last = time.time()
+            self._set_status(running=False, finished=datetime.now(KST).isoformat())
+
+
+def _rescan_dates(dates, valid):
+    """요청 날짜(YYYY-MM-DD) 검증. 미지정이면 오늘부터 RESCAN_DEFAULT_DAYS 일"""
+    if not dates:
+        return valid[:RESCAN_DEFAULT_DAYS]
+    bad = [d for d in dates if d not in valid]
+    if bad:
+        raise ValueError(f"조회 가능 기간({valid[0]} ~ {valid[-1]}) 밖의 날짜: {bad}")
+    return list(dict.fromkeys(dates))
+
+
+def _rescan_resolve(city, known, valid_dates, targets, dates):
+    if targets:
+        unknown = [t for t in targets if t not in known]
+        if unknown:
+            raise ValueError(f"모니터링 대상이 아닙니다: {unknown}")
+    pairs = [(t, d) for t in (targets or known) for d in _rescan_dates(dates, valid_dates)]
+    if _cluster:
+        # 샤딩 모드: 이 노드 담당분만 (다른 노드 샤드를 덮어쓰지 않도록)
+        owns  = _cluster.owner_fn(city, count=False)
+        pairs = [(t, d) for t, d in pairs if owns(t, d if city == "sungnam" else d.replace("-", ""))]
+    return pairs
+
+
+def _replace_dates(old, new, dates):
+    """old 중 dates 에 해당하는 항목을 new 로 교체 (날짜순 유지)"""
+    return sorted([e for e in old if e["date"] not in dates] + new, key=lambda e: e["date"])
+
+
+def _keep_deferred(old, new, deferred):
+    """회차 결과 new + old 중 예산 초과로 이번 회차에 미룬 날짜(deferred, YYYYMMDD) 의 항목.
+    미룬 날짜가 대시보드에서 잠깐 사라졌다 돌아오며 알림이 반복되지 않도록 이전 결과를 유지"""
+    if not deferred:
+        return new
+    return sorted([e for e in old if _date_key(e["date"]) in deferred] + new, key=lambda e: e["date"])
+
+
+def _sn_rescan(pairs):
+    wanted  = set(pairs)
+    fac_ids = {t for t, _ in pairs}
+    res = sn_run_once(_sn_accounts, [f for f in _sn_facilities if f["id"] in fac_ids],
+                      include_target=lambda fid, d: (fid, d) in wanted)
+    if res is None:
+        return
+    avail, courts = res
+    with _publish_lock:
+        for fid in fac_ids:
+            fresh = [c for c in courts if c["fac_id"] == fid]
+            got   = {c["date"] for c in fresh}   # 받아오지 못한 날짜는 기존 결과 유지
+            old_a, old_c = _sn_cache.get(fid, ([], []))
+            _sn_cache[fid] = (_replace_dates(old_a, [a for a in avail if a["fac_id"] == fid], got),
+                              _replace_dates(old_c, fresh, got))
+        _sn_publish(partial=True, changed=fac_ids)
+
+
+def _yn_rescan(pairs):
+    wanted = {(rid, d.replace("-", "")) for rid, d in pairs}
+    courts = [_yn_known[rid] for rid in dict.fromkeys(rid for rid, _ in pairs)]
+
+    def _on_court(court, a, d, done, total):
+        rid = court["resve_id"]
+        got = {e["date"] for e in d}
+        with _publish_lock:
+            old_a, old_c = _yn_cache.get(rid, ([], []))
+            _yn_cache[rid] = (_replace_dates(old_a, a, got), _replace_dates(old_c, d, got))
+            _yn_publish(partial=True, changed=(rid,))
+
+    yn_run_once(on_court_done=_on_court, include_target=lambda rid, d: (rid, d) in wanted, courts=courts)
+
+
+def _sn_rescan_resolve(targets, dates):
+    today = datetime.now(KST)
+    valid = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(SN_OPEN_DAYS)]
+    return _rescan_resolve("sungnam", _sn_targets, valid, targets, dates)
+
+
+def _yn_rescan_resolve(targets, dates):
+    valid = [d.strftime("%Y-%m-%d") for d in yn_dates_until_end_of_month()]
+    return _rescan_resolve("yongin", [rid for rid in _yn_targets if rid in _yn_known], valid, targets, dates)
+
+
+def _start_rescan(city):
+    """스캔 루프가 설정을 읽은 뒤 호출: 이 프로세스에서 재스캔 명령을 처리하도록 등록"""
+    if city == "sungnam":
+        q = RescanQueue(city, _sn_rescan_resolve, _sn_rescan)
+    else:
+        q = RescanQueue(city, _yn_rescan_resolve, _yn_rescan)
+    _cmd_handlers[("rescan", city)] = q.submit
+
+
+# ─────────────────────────────────────────────────────────
+# 핫 워치 (특정 시설/코트·날짜·시간대를 몇 초 간격으로 집중 감시)
+# ─────────────────────────────────────────────────────────
+HOTWATCH_FILE             = os.path.join(STATE_DIR, "hotwatch.json")
+HOTWATCH_BUDGET           = float(os.environ.get("TCM_HOTWATCH_BUDGET", "1.0"))   # 모든 워치 합산 초당 요청 수
+HOTWATCH_MIN_INTERVAL     = 2.0
+HOTWATCH_DEFAULT_INTERVAL = 5.0
+
+metrics.describe("tcm_hotwatch_polls_total",  "counter",   "핫 워치 폴링 수 (result=ok/error)")
+metrics.describe("tcm_hotwatch_alerts_total", "counter",   "핫 워치 상태 변화 알림 수")
+metrics.describe("tcm_hotwatch_lag_seconds",  "histogram", "예정 폴링 시각 대비 지연 (예산 부족 시 증가)")
+metrics.describe("tcm_hotwatch_active",       "gauge",     "등록된 핫 워치 수")
+
+
+class TokenBucket:
+    """초당 rate 개, 최대 burst 개까지 모이는 토큰 버킷"""
+
+    def __init__(self, rate, burst=None):
+        if not rate > 0:
+            raise ValueError(f"토큰 버킷 rate 는 0 보다 커야 합니다: {rate!r}")
+        self.rate   = rate
+        self.burst  = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self._t     = time.monotonic()
+        self._lock  = threading.Lock()
+
+    def acquire(self):
+        """토큰 1개를 쓸 수 있을 때까지 대기"""
+        while True:
+            with self._lock:
+                now         = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+                self._t     = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HotWatcher:
+    """핫 워치 등록/폴링. 가장 먼저 due 가 되는 워치부터 1건씩 폴링하고,
+    모든 워치의 요청은 하나의 토큰 버킷(HOTWATCH_BUDGET)을 나눠 쓴다.
+    예약 가능 여부가 바뀌면 정기 회차를 기다리지 않고 바로 텔레그램으로 알린다."""
+
+    _FIELDS = ("id", "city", "target", "date", "time", "interval", "created", "available", "last_check")
+
+    def __init__(self, path=HOTWATCH_FILE, budget=HOTWATCH_BUDGET):
+        self.path     = path
+        self.bucket   = TokenBucket(budget)
+        self._lock    = threading.Lock()
+        self._wake    = threading.Event()
+        self._sess    = {}   # city → 로그인된 세션
+        self.watches  = {}   # id → watch dict (+ 내부용 next_due)
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for w in json.load(f):
+                        w["next_due"] = 0.0
+                        self.watches[w["id"]] = w
+            except (OSError, ValueError) as e:
+                logging.warning(f"[HOT] 워치 파일 로드 실패: {e}")
+        metrics.set_gauge("tcm_hotwatch_active", lambda: len(self.watches))
+        threading.Thread(target=self._run, daemon=True, name="hotwatch").start()
+
+    # ── 등록/해제 ─────────────────────────────────────────
+    def add(self, cmd):
+        city, target, date = cmd.get("city"), str(cmd.get("target") or "").strip(), cmd.get("date") or ""
+        if city not in ("sungnam", "yongin"):
+            raise ValueError("city 는 sungnam / yongin")
+        if not target:
+            raise ValueError("target(시설 ID / resveId) 이 필요합니다")
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"날짜 형식 오류: {date!r} (YYYY-MM-DD)")
+        if day < datetime.now(KST).date():
+            raise ValueError("지난 날짜입니다")
+        slot_time = (cmd.get("time") or "").strip() or None
+        if slot_time and slot_time.upper() == "ALL":
+            slot_time = None
+        if slot_time and not re.fullmatch(r"(\d{1,2}:\d{2})?\s*~\s*(\d{1,2}:\d{2})?", slot_time.replace("～", "~")):
+            raise ValueError(f"시간 형식 오류: {slot_time!r} ('HH:MM ~ HH:MM', '~HH:MM', 'HH:MM~')")
+        interval = max(HOTWATCH_MIN_INTERVAL, float(cmd.get("interval") or HOTWATCH_DEFAULT_INTERVAL))
+        w = {"id": os.urandom(4).hex(), "city": city, "target": target, "date": date, "time": slot_time,
+             "interval": interval, "created": datetime.now(KST).isoformat(),
+             "available": None, "last_check": "", "next_due": 0.0}
+        with self._lock:
+            self.watches[w["id"]] = w
+            demand = sum(1 / x["interval"] for x in self.watches.values())
+        self._save()
+        self._wake.set()
+        logging.info(f"[HOT] 워치 등록 {w['id']}: {city} {target} {date} {slot_time or '전체'} / {interval:g}초")
+        out = self._public(w)
+        if demand > self.bucket.rate:
+            out["budget_limited"] = True   # 요청 합이 예산 초과 → 실제 간격이 늘어남
+            logging.warning(f"[HOT] 워치 요청 합 {demand:.2f}/s > 예산 {self.bucket.rate:g}/s")
+        return out
+
+    def remove(self, cmd):
+        with self._lock:
+            w = self.watches.pop(cmd.get("id"), None)
+        if w is None:
+            raise ValueError(f"워치 없음: {cmd.get('id')}")
+        self._save()
+        self._wake.set()
+        logging.info(f"[HOT] 워치 해제 {w['id']}")
+        return {"removed": w["id"]}
+
+    def list(self, cmd=None):
+        with self._lock:
+            return {"watches": [self._public(w) for w in self.watches.values()]}
+
+    def _public(self, w):
+        return {k: w.get(k) for k in self._FIELDS}
+
+    def _save(self):
+        with self._lock:
+            data = [self._public(w) for w in self.watches.values()]
+        try:
+            _atomic_write(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+        except OSError as e:
+            logging.warning(f"[HOT] 워치 파일 저장 실패: {e}")
+
+    # ── 폴링 ──────────────────────────────────────────────
+    def _run(self):
+        while True:
+            try:
+                self._step()
+            except Exception as e:   # 스레드가 조용히 죽어 워치가 멈추지 않도록
+                logging.error(f"[HOT] 워치 루프 오류: {e!r}")
+                time.sleep(1)
+
+    def _step(self):
+        today = datetime.now(KST).strftime("%Y-%m-%d")
+        with self._lock:
+            for wid in [k for k, w in self.watches.items() if w["date"] < today]:
+                logging.info(f"[HOT] 워치 만료 {wid}")
+                del self.watches[wid]
+            live = list(self.watches.values())
+        if not live:
+            self._wake.wait(timeout=60)
+            self._wake.clear()
+            return
+        w     = min(live, key=lambda x: x["next_due"])
+        delay = w["next_due"] - time.time()
+        if delay > 0 and self._wake.wait(timeout=delay):
+            self._wake.clear()   # 목록이 바뀜 → 다시 고름
+            return
+        if w["next_due"]:
+            metrics.observe("tcm_hotwatch_lag_seconds", max(0.0, time.time() - w["next_due"]), city=w["city"])
+        try:
+            with request_budget(self.bucket):   # 폴링 1회가 보내는 요청(재로그인·워밍업·재시도) 모두 예산에서 차감
+                self._check(w)
+        except Exception as e:
+            logging.error(f"[HOT] {w['id']} 오류: {e}")
+        w["next_due"] = time.time() + w["interval"]
+
+    def _check(self, w):
+        slots = self._poll(w)
+        if slots is None:
+            metrics.inc("tcm_hotwatch_polls_total", city=w["city"], result="error")
+            return
+        metrics.inc("tcm_hotwatch_polls_total", city=w["city"], result="ok")
+        first = w["available"] is None
+        prev  = set(w["available"] or [])
+        w["available"], w["last_check"] = sorted(slots), datetime.now(KST).isoformat()
+        if first:   # 등록 직후 첫 결과는 기준으로만 기록 — 이미 열려 있던 슬롯을 새로 열린 것처럼 알리지 않음
+            logging.info(f"[HOT] {w['id']} 첫 확인: 예약가능 {sorted(slots)}")
+            self._save()
+            return
+        opened, closed = slots - prev, prev - slots
+        if opened or closed:
+            metrics.inc("tcm_hotwatch_alerts_total", city=w["city"])
+            logging.info(f"[HOT] {w['id']} 변화: +{sorted(opened)} -{sorted(closed)}")
+            send_telegram(_hotwatch_msg(w, opened, closed))
+            self._save()
+
+    def _session(self, city, relogin=False):
+        sess = self._sess.get(city)
+        if sess is None or relogin:
+            _session_pools[city].drop(sess)
+            sess = self._sess[city] = _session_pools[city].login()
+        return sess
+
+    def _poll(self, w):
+        """현재 예약 가능한 (시간대 조건에 맞는) 슬롯 집합. 실패 시 None"""
+        def match(t):
+            return not w["time"] or sn_time_match(t, w["time"])
+
+        for relogin in (False, True):
+            sess = self._session(w["city"], relogin)
+            if w["city"] == "sungnam":
+                html = sn_get_timetable(sess, w["target"], w["date"], max_age=0)
+                if html is not None:
+                    avail, _ = sn_parse_timetable(html)
+                    return {f"{s['court']} {s['time']}" for s in avail if match(s["time"])}
+            else:
+                apply_url = (f"{YN_BASE_URL}/sports/selectFcltyRceptResveApplyListU.do"
+                             f"?key=4292&searchResveId={w['target']}")
+                _yn_warm(sess, w["target"], apply_url)
+                r = yn_get_time_slots(sess, w["target"], apply_url, w["date"].replace("-", ""), max_age=0)
+                if r is not None:
+                    return {s["time"] for s in r["available"] if match(s["time"])}
+        return None
+
+
+def _hotwatch_msg(w, opened, closed):
+    if w["city"] == "sungnam":
+        fac   = next((f for f in _sn_facilities if f["id"] == w["target"]), None)
+        label = f"[성남] {fac['name'] if fac else w['target']}"
+        link  = "https://res.isdc.co.kr/"
+    else:
+        court = _yn_known.get(w["target"])
+        label = f"[용인] {court['name'] if court else w['target']}"
+        link  = "https://publicsports.yongin.go.kr/"
+    lines = [_tg_escape(f"🔥 {label} 핫 워치"), f"*{_tg_escape(w['date'])}*"]
+    lines += [f"  ✓ {_tg_escape(s)}  예약가능" for s in sorted(opened)]
+    lines += [f"  ✗ {_tg_escape(s)}  마감" for s in sorted(closed)]
+    lines += ["", _tg_escape(link)]
+    return "\n".join(lines)
+
+
+_hotwatch = None
+
+
+def _start_hotwatch(budget=HOTWATCH_BUDGET, specs=()):
+    """핫 워치 시작 + 명령 등록. specs: --watch 'city:target:YYYY-MM-DD[:시간대]'"""
+    global _hotwatch
+    _hotwatch = HotWatcher(budget=budget)
+    _cmd_handlers[("watch_add", None)]  = _hotwatch.add
+    _cmd_handlers[("watch_del", None)]  = _hotwatch.remove
+    _cmd_handlers[("watch_list", None)] = _hotwatch.list
+    existing = {(w["city"], w["target"], w["date"], w["time"]) for w in _hotwatch.watches.values()}
+    for spec in specs:
+        parts = spec.split(":", 3)
+        if len(parts) < 3:
+            raise ValueError(f"--watch 형식 오류: {spec!r}")
+        cmd = {"city": parts[0], "target": parts[1], "date": parts[2],
+               "time": parts[3] if len(parts) > 3 else None}
+        if (cmd["city"], cmd["target"], cmd["date"], (cmd["time"] or "").strip() or None) not in existing:
+            _hotwatch.add(cmd)
+
+
+# ─────────────────────────────────────────────────────────
+# 예약 오픈 버스트 (ReleaseTable.txt: 새 예약 기간이 열리는 순간 집중 폴링)
+# ─────────────────────────────────────────────────────────
+RELEASE_TABLE     = os.path.join(_HERE, "ReleaseTable.txt")
+RELEASE_PREWARM   = 60.0   # 오픈 몇 초 전에 세션을 미리 로그인
+RELEASE_EARLY     = 2.0    # 서버 시계 오차 대비: 오픈 몇 초 전부터 폴링 시작
+RELEASE_WINDOW    = 120.0  # 오픈 후 버스트 유지 시간(초), 이후 정기 주기로 복귀
+RELEASE_INTERVAL  = 0.5    # 버스트 라운드 간격(초)
+RELEASE_MAX_PAIRS = 64     # 라운드당 최대 (대상, 날짜) 수 — 넘으면 라운드마다 돌아가며 폴링
+
+metrics.describe("tcm_release_next_seconds",    "gauge",     "다음 예약 오픈까지 남은 시간")
+metrics.describe("tcm_release_burst_active",    "gauge",     "예약 오픈 버스트 진행 중 여부")
+metrics.describe("tcm_release_prewarm_seconds", "histogram", "오픈 전 세션 미리 로그인 소요 시간")
+metrics.describe("tcm_release_polls_total",     "counter",   "버스트 폴링 수 (result=open/closed/error)")
+metrics.describe("tcm_release_open_seconds",    "histogram", "오픈 시각 → 새 날짜가 열린 것을 처음 확인할 때까지")
+metrics.describe("tcm_release_detect_seconds",  "histogram", "오픈 시각 → 새 날짜의 예약가능 슬롯을 처음 발견할 때까지")
+
+
+def load_release_table(path=None):
+    """ReleaseTable.txt → [{"city", "kind", "day", "hour", "minute"}]
+      [sungnam]  daily HH:MM       매일 HH:MM 에 SN_OPEN_DAYS 번째 날짜가 새로 열림
+      [yongin]   monthly D HH:MM   매월 D 일 HH:MM 에 다음 달 전체가 열림"""
+    path  = path or RELEASE_TABLE
+    rules = []
+    for city, kind in (("sungnam", "daily"), ("yongin", "monthly")):
+        for line in _section_lines(path, city):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            m = (re.fullmatch(r"daily\s+(\d{1,2}):(\d{2})", line) if kind == "daily"
+                 else re.fullmatch(r"monthly\s+(\d{1,2})\s+(\d{1,2}):(\d{2})", line))
+            if not m:
+                logging.warning(f"[REL] {city} 형식 오류 (예: {kind} {'' if kind == 'daily' else '25 '}10:00): {line!r}")
+                continue
+            nums = [int(x) for x in m.groups()]
+            day  = nums.pop(0) if kind == "monthly" else None
+            if not (0 <= nums[0] < 24 and 0 <= nums[1] < 60 and (day is None or 1 <= day <= 31)):
+                logging.warning(f"[REL] {city} 시각 범위 오류: {line!r}")
+                continue
+            rules.append({"city": city, "kind": kind, "day": day, "hour": nums[0], "minute": nums[1]})
+    return rules
+
+
+def _release_times(rule, now):
+    """now 전후의 오픈 시각 후보 (어제/오늘/내일 또는 지난달/이번 달/다음 달)"""
+    import calendar
+    at = dict(hour=rule["hour"], minute=rule["minute"], second=0, microsecond=0)
+    if rule["kind"] == "daily":
+        base = now.replace(**at)
+        return [base + timedelta(days=i) for i in (-1, 0, 1)]
+    out   = []
+    first = now.replace(day=1)
+    for month in ((first - timedelta(days=1)).replace(day=1), first, (first + timedelta(days=32)).replace(day=1)):
+        day = min(rule["day"], calendar.monthrange(month.year, month.month)[1])
+        out.append(month.replace(day=day, **at))
+    return out
+
+
+def _next_release(rule, now):
+    """아직 끝나지 않은(오픈 + RELEASE_WINDOW 전) 가장 가까운 오픈 시각"""
+    return min(t for t in _release_times(rule, now) if t + timedelta(seconds=RELEASE_WINDOW) > now)
+
+
+def _release_dates(rule, at):
+    """오픈 시각 at 에 새로 열리는 날짜 목록 (datetime, KST)"""
+    import calendar
+    day0 = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if rule["kind"] == "daily":
+        return [day0 + timedelta(days=SN_OPEN_DAYS - 1)]
+    nxt = (day0.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return [nxt + timedelta(days=i) for i in range(calendar.monthrange(nxt.year, nxt.month)[1])]
+
+
+def _yn_open_next_month(at):
+    """용인 다음 달 오픈 → 정기 회차/재스캔이 다음 달 말일까지 스캔"""
+    global _yn_open_until
+    import calendar
+    nxt  = (at.replace(day=1) + timedelta(days=32)).replace(day=1)
+    last = nxt.replace(day=calendar.monthrange(nxt.year, nxt.month)[1]).date()
+    if _yn_open_until != last:
+        _yn_open_until = last
+        logging.info(f"[REL] 용인 스캔 기간 확장: ~ {last}")
+
+
+def _release_pairs(city, dates):
+    """버스트 대상 [(target, date)] — 알림 조건에 걸릴 수 있는 것 전부, 가까운 날짜 순"""
+    pairs = []
+    for date in dates:
+        weekend = date.weekday() >= 5
+        if city == "sungnam":
+            for fac in _sn_facilities:
+                if fac["weekend_times" if weekend else "weekday_times"]:
+                    pairs.append((fac["id"], date))
+        else:
+            for rid in _yn_targets:
+                court = _yn_known.get(rid)
+                if court is None:
+                    continue
+                if _yn_notify:
+                    spec = next((v for g, v in _yn_notify.items() if g in court["location"]), None)
+                    if spec is None or not (spec["weekend_all"] if weekend else spec["weekday"]):
+                        continue
+                pairs.append((rid, date))
+    if _cluster:
+        owns  = _cluster.owner_fn(city, count=False)
+        fmt   = "%Y-%m-%d" if city == "sungnam" else "%Y%m%d"
+        pairs = [(t, d) for t, d in pairs if owns(t, d.strftime(fmt))]
+    return pairs
+
+
+def _release_rounds(city, pairs):
+    """라운드별 폴링 목록을 끝없이 생성.
+    자동 예약 규칙에 걸리는 대상은 (최대 RELEASE_MAX_PAIRS 절반까지) 매 라운드 폴링하고,
+    나머지는 남은 자리만큼 라운드마다 이어서 돌아가며 폴링 → 한 달치가 열려도 모든 날짜를 훑음"""
+    fixed  = [p for p in pairs if _autohold and _autohold.wants(city, *p)][:RELEASE_MAX_PAIRS // 2]
+    rotate = [p for p in pairs if p not in fixed]
+    width  = min(len(rotate), RELEASE_MAX_PAIRS - len(fixed))
+    off    = 0
+    while True:
+        yield fixed + [rotate[(off + i) % len(rotate)] for i in range(width)]
+        off = (off + width) % max(1, len(rotate))
+
+
+def _sn_release_poll(holder, fid, date):
+    """→ (available, courts) / 아직 안 열림: ([], []) / 실패: None"""
+    fac      = next(f for f in _sn_facilities if f["id"] == fid)
+    date_str = date.strftime("%Y-%m-%d")
+    html     = sn_get_timetable(holder[0], fid, date_str, max_age=0)
+    if html is None and _session_pools["sungnam"].relogin(holder) is not None:
+        html = sn_get_timetable(holder[0], fid, date_str, max_age=0)
+    if html is None:
+        return None
+    t_fetched = time.perf_counter()
+    avail, courts = sn_build_entries(fac, date, html)
+    if _autohold:
+        _autohold.offer("sungnam", [c for c in courts if c["is_available"]], t_fetched)
+    return avail, courts
+
+
+def _yn_release_poll(holder, rid, date, mon_table):
+    court     = _yn_known[rid]
+    apply_url = (f"{YN_BASE_URL}/sports/selectFcltyRceptResveApplyListU.do"
+                 f"?key=4292&searchResveId={rid}")
+    ymd = date.strftime("%Y%m%d")
+    _yn_warm(holder[0], rid, apply_url)
+    r   = yn_fetch_court_date(holder, rid, apply_url, ymd, max_age=0)
+    if r is None:
+        return None
+    t_fetched = time.perf_counter()
+    if r.get("outside_range"):
+        return [], []
+    courts = [e for e in yn_merge_slots(court, r) if not mon_table or yn_passes_filter(e, mon_table)]
+    avail  = [e for e in courts if e["is_available"]]
+    if _autohold and avail:
+        _autohold.offer("yongin", avail, t_fetched)
+    return avail, courts
+
+
+def _release_merge(city, results):
+    """버스트 라운드 결과 {(target, date): (avail, courts)} → 캐시 교체 후 부분 공개"""
+    cache = _sn_cache if city == "sungnam" else _yn_cache
+    with _publish_lock:
+        for (target, _), (a, c) in results.items():
+            got          = {e["date"] for e in c}   # 용인 날짜 형식은 업스트림 formatedDate 를 따름
+            old_a, old_c = cache.get(target, ([], []))
+            cache[target] = (_replace_dates(old_a, a, got), _replace_dates(old_c, c, got))
+        changed = {target for target, _ in results}
+        if city == "sungnam":
+            _sn_publish(partial=True, changed=changed)
+        else:
+            _yn_publish(partial=True, changed=changed)
+
+
+def run_release_burst(city, rule, at):
+    """오픈 시각 at 전후로 새 날짜만 RELEASE_INTERVAL 간격으로 병렬 폴링.
+    결과가 바뀐 라운드만 캐시에 반영해 공개/알림하고, RELEASE_WINDOW 가 지나면 종료"""
+    pool  = _session_pools[city]
+    t_at  = at.timestamp()
+    pairs = _release_pairs(city, _release_dates(rule, at))
+    while not pairs:
+        # 시작 직후라 코트 목록이 아직 없을 수 있음 → 윈도우가 끝날 때까지 기다려 봄
+        if time.time() > t_at + RELEASE_WINDOW - 5:
+            logging.warning(f"[REL] {city} {at:%m-%d %H:%M} 버스트 대상 없음")
+            return
+        time.sleep(1)
+        pairs = _release_pairs(city, _release_dates(rule, at))
+    rounds_of = _release_rounds(city, pairs)
+    first_set = next(rounds_of)
+    n_workers = min(YN_WORKERS, len(first_set))
+    t0 = time.perf_counter()
+    pool.prewarm(n_workers)
+    metrics.observe("tcm_release_prewarm_seconds", time.perf_counter() - t0, city=city)
+    logging.info(f"[REL] {city} {at:%m-%d %H:%M} 오픈 대비: 대상 {len(pairs)}건 "
+                 f"(라운드당 {len(first_set)}건), 세션 {n_workers}개 준비")
+
+    delay = t_at - RELEASE_EARLY - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    if city == "yongin":
+        _yn_open_next_month(at)
+    mon_table = yn_load_monitoring_table() if city == "yongin" else None
+    sessions  = queue.Queue()
+    for _ in range(n_workers):
+        sessions.put([pool.acquire()])
+
+    def _poll(pair):
+        holder = sessions.get()
+        try:
+            if city == "sungnam":
+                res = _sn_release_poll(holder, *pair)
+            else:
+                res = _yn_release_poll(holder, *pair, mon_table)
+        except Exception as e:
+            logging.warning(f"[REL] {city} {pair[0]} {pair[1]:%Y-%m-%d} 폴링 오류: {e}")
+            res = None
+        finally:
+            sessions.put(holder)
+        return res, time.time()
+
+    opened, detected, last = {}, {}, {}
+    rounds = 0
+    metrics.set_gauge("tcm_release_burst_active", 1, city=city)
+    try:
+        with ThreadPoolExecutor(max_workers=n_workers) as ex:
+            batch = first_set
+            while time.time() < t_at + RELEASE_WINDOW:
+                t_round = time.time()
+                changed = {}
+                for pair, (res, t_done) in zip(batch, ex.map(_poll, batch)):
+                    if res is None:
+                        metrics.inc("tcm_release_polls_total", city=city, result="error")
+                        continue
+                    a, c = res
+                    metrics.inc("tcm_release_polls_total", city=city, result="open" if c else "closed")
+                    if c and pair not in opened:
+                        opened[pair] = t_done - t_at
+                        metrics.observe("tcm_release_open_seconds", max(0.0, opened[pair]), city=city)
+                    if a and pair not in detected:
+                        detected[pair] = t_done - t_at
+                        metrics.observe("tcm_release_detect_seconds", max(0.0, detected[pair]), city=city)
+                    if c and last.get(pair) != c:
+                        last[pair] = changed[pair] = (a, c)
+                if changed:
+                    _release_merge(city, changed)
+                rounds += 1
+                batch   = next(rounds_of)
+                time.sleep(max(0.0, RELEASE_INTERVAL - (time.time() - t_round)))
+    finally:
+        metrics.set_gauge("tcm_release_burst_active", 0, city=city)
+        while not sessions.empty():
+            pool.release(sessions.get()[0])
+
+    first = min(detected.values(), default=None)
+    logging.info(f"[REL] {city} {at:%m-%d %H:%M} 버스트 종료: {rounds}라운드, "
+                 f"열림 {len(opened)}/{len(pairs)}건, 예약가능 발견 {len(detected)}건"
+                 + (f", 첫 발견 +{first:.2f}초" if first is not None else ""))
+
+
+def _release_loop(city, rules):
+    now = datetime.now(KST)
+    if city == "yongin":
+        # 이번 달 오픈이 이미 지났으면 다음 달도 바로 스캔 대상
+        passed = [t for r in rules for t in _release_times(r, now) if t.month == now.month and t <= now]
+        if passed:
+            _yn_open_next_month(max(passed))
+    while True:
+        now      = datetime.now(KST)
+        at, rule = min(((_next_release(r, now), r) for r in rules), key=lambda x: x[0])
+        metrics.set_gauge("tcm_release_next_seconds", lambda at=at: max(0.0, at.timestamp() - time.time()),
+                          city=city)
+        lead = at.timestamp() - RELEASE_PREWARM - time.time()
+        if lead > 0:
+            logging.info(f"[REL] {city} 다음 예약 오픈: {at:%Y-%m-%d %H:%M} ({lead / 60:.0f}분 후 준비)")
+            time.sleep(lead)
+        try:
+            run_release_burst(city, rule, at)
+        except Exception as e:
+            logging.error(f"[REL] {city} 버스트 오류: {e}")
+        # 같은 오픈을 다시 잡지 않도록 윈도우가 끝날 때까지 대기
+        time.sleep(max(0.0, at.timestamp() + RELEASE_WINDOW - time.time()) + 1)
+
+
+def _start_release(city):
+    """스캔 루프가 설정을 읽은 뒤 호출: ReleaseTable.txt 에 이 도시 일정이 있으면 버스트 스레드 시작"""
+    rules = [r for r in load_release_table() if r["city"] == city]
+    if not rules:
+        return
+    logging.info(f"[REL] {city} 예약 오픈 일정 {len(rules)}건 "
+                 f"(사전 로그인 {RELEASE_PREWARM:g}초 전, {RELEASE_INTERVAL:g}초 간격 {RELEASE_WINDOW:g}초간)")
+    threading.Thread(target=_release_loop, args=(city, rules), daemon=True, name=f"release-{city}").start()
+
+
+# ─────────────────────────────────────────────────────────
+# 자동 예약 신청 (--auto-hold, AutoHoldTable.txt 의 우선순위 규칙)
+# ─────────────────────────────────────────────────────────
+AUTOHOLD_ENABLED  = False
+AUTOHOLD_TABLE    = os.path.join(_HERE, "AutoHoldTable.txt")
+AUTOHOLD_FILE     = os.path.join(STATE_DIR, "autohold.json")
+AUTOHOLD_MAX_WINS = 1     # 규칙·날짜별 성공 최대 건수 (같은 날 여러 코트를 잡지 않도록)
+AUTOHOLD_HISTORY  = 200   # 보관할 최근 신청 기록 수
+AUTOHOLD_WORKERS  = 4     # 동시에 보낼 수 있는 신청 수 (도시별로 이만큼 세션을 미리 로그인)
+
+metrics.describe("tcm_autohold_attempts_total",  "counter",   "자동 예약 신청 수 (result=ok/fail/error)")
+metrics.describe("tcm_autohold_latency_seconds", "histogram",
+                 "응답 수신 → 신청 (stage=queue: 신청 시작까지, submit: 신청 왕복, total: 전체)")
+
+
+def load_autohold_table(path=None):
+    """AutoHoldTable.txt → [{"city", "target", "days", "time", "line"}]
+      한 줄에 규칙 1개: <대상> <요일> <시간대>
+        대상:   성남 FAC코드 / 용인 resveId 또는 구 이름
+        요일:   주중 / 주말 / All / YYYY-MM-DD
+        시간대: All / 'HH:MM ~ HH:MM' / '~HH:MM' / 'HH:MM~'"""
+    rules = []
+    for city in ("sungnam", "yongin"):
+        for line in _section_lines(path or AUTOHOLD_TABLE, city):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split(None, 2)
+            if len(parts) < 3:
+                logging.warning(f"[HOLD] {city} 형식 오류 (<대상> <요일> <시간대>): {line!r}")
+                continue
+            target, days, slot_time = parts
+            if days not in ("주중", "주말", "All") and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", days):
+                logging.warning(f"[HOLD] {city} 요일 오류 (주중/주말/All/YYYY-MM-DD): {line!r}")
+                continue
+            if slot_time != "All" and not re.fullmatch(r"(\d{1,2}:\d{2})?\s*~\s*(\d{1,2}:\d{2})?",
+                                                       slot_time.replace("～", "~")):
+                logging.warning(f"[HOLD] {city} 시간대 오류: {line!r}")
+                continue
+            rules.append({"city": city, "target": target, "days": days, "time": slot_time, "line": line})
+    return rules
+
+
+class AutoHolder:
+    """우선순위 규칙에 맞는 예약가능 슬롯이 보이면 바로 예약 신청.
+    스캔 경로는 offer() 로 후보만 넘기고, 신청은 미리 띄워 둔 전용 스레드가
+    세션 풀의 로그인된 세션으로 보낸다. 같은 슬롯은 다시 신청하지 않는다."""
+
+    def __init__(self, rules, path=AUTOHOLD_FILE, max_wins=AUTOHOLD_MAX_WINS):
+        self.rules    = rules
+        self.path     = path
+        self.max_wins = max_wins
+        self._lock    = threading.Lock()
+        self._tried   = set()   # (city, target, date, court, time)
+        self._wins    = {}      # (규칙 번호, date) → 성공 건수
+        self._flight  = {}      # (규칙 번호, date) → 신청 중인 건수
+        self.history  = []
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.history = json.load(f)[-AUTOHOLD_HISTORY:]
+            except (OSError, ValueError) as e:
+                logging.warning(f"[HOLD] 기록 파일 로드 실패: {e}")
+        lines = [r["line"] for r in rules]
+        for h in self.history:
+            if h["result"] != "error":
+                self._tried.add((h["city"], h["target"], h["date"], h["court"], h["time"]))
+            if h["ok"] and h["rule"] in lines:   # 재시작 후에도 규칙·날짜별 한도 유지
+                quota = (lines.index(h["rule"]), h["date"])
+                self._wins[quota] = self._wins.get(quota, 0) + 1
+        self._executor = ThreadPoolExecutor(max_workers=AUTOHOLD_WORKERS, thread_name_prefix="autohold")
+        for city in {r["city"] for r in rules}:
+            # 첫 신청이 로그인을 기다리지 않도록 세션을 미리 만들어 둠
+            self._executor.submit(_session_pools[city].prewarm, AUTOHOLD_WORKERS)
+
+    def _match(self, city, entry):
+        target = entry.get("fac_id") if city == "sungnam" else entry.get("resve_id")
+        dkey   = _date_key(entry.get("date"))   # 용인 날짜는 업스트림 formatedDate ('2025.03.01' 등)
+        try:
+            day = datetime.strptime(dkey or "", "%Y%m%d")
+        except ValueError:
+            logging.debug("[HOLD] 날짜 형식을 알 수 없어 건너뜀: %r", entry.get("date"))
+            return None
+        for i, r in enumerate(self.rules):
+            if not self._covers(r, city, target, entry.get("location", ""), day):
+                continue
+            if r["time"] != "All" and not sn_time_match(entry["time"], r["time"]):
+                continue
+            return i
+        return None
+
+    @staticmethod
+    def _covers(r, city, target, location, day):
+        """규칙 r 이 (대상, 날짜)에 걸리는지 — 시간 조건은 보지 않음"""
+        if r["city"] != city:
+            return False
+        if r["target"] != target and not (city == "yongin" and r["target"] in location):
+            return False
+        if r["days"] == "주중" and day.weekday() >= 5 or r["days"] == "주말" and day.weekday() < 5:
+            return False
+        return r["days"] in ("주중", "주말", "All") or _date_key(r["days"]) == day.strftime("%Y%m%d")
+
+    def wants(self, city, target, day):
+        """예약 오픈 버스트 우선순위용: (대상, 날짜)에 걸리는 규칙이 하나라도 있는지"""
+        location = _yn_known.get(target, {}).get("location", "") if city == "yongin" else ""
+        return any(self._covers(r, city, target, location, day) for r in self.rules)
+
+    def offer(self, city, entries, t_fetched):
+        """스캔 경로에서 응답 직후 호출 (t_fetched = 응답 수신 perf_counter).
+        자동 예약 쪽 오류가 스캔을 멈추지 않도록 예외는 여기서 기록만 하고 삼킨다."""
+        try:
+            self._offer(city, entries, t_fetched)
+        except Exception as e:
+            logging.error(f"[HOLD] {city} 후보 처리 오류 (스캔은 계속): {e!r}")
+
+    def _offer(self, city, entries, t_fetched):
+        for e in entries:
+            idx = self._match(city, e)
+            if idx is None:
+                continue
+            target = e.get("fac_id") if city == "sungnam" else e.get("resve_id")
+            key    = (city, target, e["date"], e.get("court", ""), e["time"])
+            quota  = (idx, e["date"])
+            with self._lock:
+                if key in self._tried:
+                    continue
+                if self._wins.get(quota, 0) + self._flight.get(quota, 0) >= self.max_wins:
+                    continue   # 신청 중인 건이 실패하면 다음에 보일 때 다시 시도
+                self._tried.add(key)
+                self._flight[quota] = self._flight.get(quota, 0) + 1
+            self._executor.submit(self._submit, city, idx, target, e, t_fetched)
+
+    def _submit(self, city, idx, target, e, t_fetched):
+        submit = sn_submit_reservation if city == "sungnam" else yn_submit_reservation
+        pool   = _session_pools[city]
+        t0     = time.perf_counter()
+        with pool.lease() as holder:
+            ok, msg = submit(holder[0], e) if holder[0] is not None else (None, "로그인 실패")
+            if ok is None and pool.relogin(holder) is not None:
+                ok, msg = submit(holder[0], e)
+        t1 = time.perf_counter()
+        result = "ok" if ok else ("error" if ok is None else "fail")
+        metrics.inc("tcm_autohold_attempts_total", city=city, result=result)
+        metrics.observe("tcm_autohold_latency_seconds", t0 - t_fetched, city=city, stage="queue")
+        metrics.observe("tcm_autohold_latency_seconds", t1 - t0, city=city, stage="submit")
+        metrics.observe("tcm_autohold_latency_seconds", t1 - t_fetched, city=city, stage="total")
+        rec = {"at": datetime.now(KST).isoformat(), "city": city, "target": target,
+               "name": e.get("facility_name") or e.get("court_name", ""), "date": e["date"],
+               "court": e.get("court", ""), "time": e["time"], "rule": self.rules[idx]["line"],
+               "ok": bool(ok), "result": result, "message": msg,
+               "queue_ms": round((t0 - t_fetched) * 1000, 2), "total_ms": round((t1 - t_fetched) * 1000, 1)}
+        quota = (idx, e["date"])
+        with self._lock:
+            self._flight[quota] -= 1
+            if ok:
+                self._wins[quota] = self._wins.get(quota, 0) + 1
+            elif ok is None:
+                # 로그인 실패 등 신청 자체를 못 함 → 다음에 보이면 다시 시도
+                self._tried.discard((city, target, e["date"], e.get("court", ""), e["time"]))
+            self.history = (self.history + [rec])[-AUTOHOLD_HISTORY:]
+        self._save()
+        logging.info(f"[HOLD] {'✅' if ok else '❌'} {city} {rec['name']} {e['date']} {rec['court']} {e['time']}"
+                     f" → {msg!r} (응답 후 {rec['queue_ms']}ms 에 신청, 총 {rec['total_ms']}ms)")
+        if ok:
+            send_telegram(_autohold_msg(rec))
+
+    def _save(self):
+        with self._lock:
+            data = json.dumps(self.history, ensure_ascii=False, indent=1).encode("utf-8")
+        try:
+            _atomic_write(self.path, data)
+        except OSError as e:
+            logging.warning(f"[HOLD] 기록 저장 실패: {e}")
+
+    def drain(self):
+        """대기 중인 신청이 모두 끝날 때까지 대기 (벤치용)"""
+        self._executor.shutdown(wait=True)
+        self._executor = ThreadPoolExecutor(max_workers=AUTOHOLD_WORKERS, thread_name_prefix="autohold")
+
+
+def _autohold_msg(rec):
+    label = "[성남]" if rec["city"] == "sungnam" else "[용인]"
+    link  = "https://res.isdc.co.kr/" if rec["city"] == "sungnam" else "https://publicsports.yongin.go.kr/"
+    slot  = " ".join(x for x in (rec["court"], rec["time"]) if x)
+    return "\n".join([_tg_escape(f"🎯 {label} 자동 예약 신청 완료"),
+                      f"*{_tg_escape(rec['date'])}*  {_tg_escape(rec['name'])}",
+                      f"  ✓ {_tg_escape(slot)}",
+                      _tg_escape(f"  규칙: {rec['rule']} / 응답 후 {rec['total_ms']}ms"),
+                      "", _tg_escape("결제/확정은 사이트에서 직접 진행하세요: " + link)])
+
+
+_autohold = None
+
+
+def _start_autohold(city=None):
+    """--auto-hold 일 때 스캔하는 프로세스에서 호출. 규칙이 없으면 비활성
+    city: --scanner-procs 자식은 자기 도시 규칙만, 기록도 도시별 파일(autohold.<city>.json)"""
+    global _autohold
+    if not AUTOHOLD_ENABLED or _autohold is not None:
+        return
+    rules = [r for r in load_autohold_table() if city in (None, r["city"])]
+    if not rules:
+        logging.warning(f"[HOLD] --auto-hold 지정됐지만 규칙 없음: {AUTOHOLD_TABLE}")
+        return
+    # 경로와 검증한 폼 필드가 모두 있어야 신청 — 하나라도 없으면 실제 사이트가 받지 않을 요청을 보내게 됨
+    book  = {"sungnam": ("SN", SN_BOOK_PATH, SN_BOOK_FIELDS, SN_BOOK_VARS),
+             "yongin":  ("YN", YN_BOOK_PATH, YN_BOOK_FIELDS, YN_BOOK_VARS)}
+    ready = set()
+    for c in sorted({r["city"] for r in rules}):
+        tag, path, spec, names = book[c]
+        if not path:
+            logging.warning(f"[HOLD] {c} 신청 엔드포인트 미설정 (TCM_{tag}_BOOK_PATH) → {c} 자동 신청 비활성화")
+            continue
+        try:
+            book_fields(spec, names)
+        except ValueError as e:
+            logging.warning(f"[HOLD] {c} 신청 폼 필드 TCM_{tag}_BOOK_FIELDS {e} → {c} 자동 신청 비활성화")
+            continue
+        ready.add(c)
+    rules = [r for r in rules if r["city"] in ready]
+    if not rules:
+        return
+    path = AUTOHOLD_FILE if city is None else AUTOHOLD_FILE.replace(".json", f".{city}.json")
+    _autohold = AutoHolder(rules, path)
+    logging.info(f"[HOLD] 자동 예약 신청 활성화: 규칙 {len(rules)}개 "
+                 f"(규칙·날짜별 최대 {AUTOHOLD_MAX_WINS}건)")
+
+
+# ─────────────────────────────────────────────────────────
+# 디버그: 샘플링 프로파일러 / tracemalloc
+# ─────────────────────────────────────────────────────────
+_profile_lock  = threading.Lock()
+_mem_prev_snap = None
+
+
+def sample_stacks(seconds, interval=0.01):
+    """모든 스레드의 스택을 interval 마다 샘플링 → collapsed stack {stack: count}.
+    요청된 동안에만 도는 별도 스레드 없이 호출 스레드에서 수행하므로 평소 오버헤드 없음."""
+    me     = threading.get_ident()
+    counts = {}
+    end    = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+        time.sleep(interval)
+    return counts
+
+
+def _debug_allowed(request):
+    """TCM_DEBUG_TOKEN 이 설정되어 있고 요청 토큰이 일치할 때만 허용"""
+    token = os.environ.get("TCM_DEBUG_TOKEN", "")
+    given = request.headers.get("X-Debug-Token") or request.args.get("token", "")
+    return bool(token) and hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8"))
+
+
+def memory_report(top=20, stop=False):
+    """tracemalloc 상위 할당 위치 + 직전 스냅샷 대비 증감"""
+    global _mem_prev_snap
+    if stop:
+        tracemalloc.stop()
+        _mem_prev_snap = None
+        return {"tracing": False}
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+        return {"tracing": True, "message": "tracemalloc 시작 – 다시 호출하면 스냅샷/비교 반환"}
+    snap = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),))
+    cur, peak = tracemalloc.get_traced_memory()
+    report = {
+        "tracing":  True,
+        "current":  cur,
+        "peak":     peak,
+        "top":      [{"where": str(st.traceback[0]), "size": st.size, "count": st.count}
+                     for st in snap.statistics("lineno")[:top]],
+    }
+    if _mem_prev_snap is not None:
+        report["diff"] = [{"where": str(st.traceback[0]), "size_diff": st.size_diff,
+                           "count_diff": st.count_diff}
+                          for st in snap.compare_to(_mem_prev_snap, "lineno")[:top]]
+    _mem_prev_snap = snap
+    return report
+
+
+# ─────────────────────────────────────────────────────────
+# 대시보드 부하 테스트 (--loadtest)
+# ─────────────────────────────────────────────────────────
+_LT_SCENARIOS = [   # (가중치, 이름, 요청 경로 목록)
+    (50, "poll_yongin",   ["/api/yongin"]),
+    (20, "poll_sungnam",  ["/api/sungnam"]),
+    (20, "page_load",     ["/", "/api/sungnam", "/api/yongin"]),
+    (10, "refresh_burst", ["/api/yongin"] * 5),
+]
+
+
+def _scrape_stage_means(base_url):
+    """/metrics 에서 (city, stage) 별 (sum, count) 와 회차 시간 수집"""
+    out = {}
+    try:
+        with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as r:
+            text = r.read().decode("utf-8")
+    except Exception as e:
+        logging.warning(f"[LT] /metrics 조회 실패: {e}")
+        return out
+    for line in text.splitlines():
+        m = re.match(r'(tcm_stage_seconds|tcm_cycle_seconds)_(sum|count)\{([^}]*)\} ([0-9.eE+-]+)', line)
+        if not m:
+            continue
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', m.group(3)))
+        key    = (labels.get("city", ""), labels.get("stage", "cycle"))
+        acc    = out.setdefault(key, [0.0, 0.0])
+        acc[0 if m.group(2) == "sum" else 1] += float(m.group(4))
+    return out
+
+
+def _stage_delta(before, after):
+    res = {}
+    for key, (s1, c1) in after.items():
+        s0, c0 = before.get(key, (0.0, 0.0))
+        if c1 > c0:
+            res[key] = ((s1 - s0) / (c1 - c0), int(c1 - c0))
+    return res
+
+
+def run_loadtest(base_url, concurrency=50, duration=30.0, think=0.5, idle_window=30.0):
+    """동시 사용자 concurrency 명으로 duration 초 동안 대시보드 트래픽 재현 → 결과 dict.
+    idle_window > 0 이면 부하 전 같은 시간 동안 스캔 단계 시간을 측정해 부하 중과 비교."""
+    base_url = base_url.rstrip("/")
+    target   = urlparse(base_url)
+    weights  = [w for w, _, _ in _LT_SCENARIOS]
+
+    idle = None
+    if idle_window > 0:
+        logging.info(f"[LT] 무부하 기준 측정 {idle_window:.0f}초")
+        m0   = _scrape_stage_means(base_url)
+        time.sleep(idle_window)
+        idle = _stage_delta(m0, _scrape_stage_means(base_url))
+
+    results = []   # 스레드별 [(path, latency_s, ok)]
+    stop_at = time.perf_counter() + duration
+
+    def _user(seed):
+        rnd  = random.Random(seed)
+        conn = None
+        rec  = []
+        results.append(rec)
+        while time.perf_counter() < stop_at:
+            _, _, paths = rnd.choices(_LT_SCENARIOS, weights)[0]
+            for path in paths:
+                t0 = time.perf_counter()
+                ok = False
+                try:
+                    if conn is None:
+                        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                    conn.request("GET", path)
+                    resp = conn.getresponse()
+                    resp.read()
+                    ok = resp.status == 200
+                except Exception:
+                    if conn is not None:
+                        conn.close()
+                    conn = None
+                rec.append((path, time.perf_counter() - t0, ok))
+            time.sleep(rnd.expovariate(1 / think) if think > 0 else 0)
+
+    logging.info(f"[LT] 부하 시작: {base_url} 동시 {concurrency} × {duration:.0f}초")
+    m0      = _scrape_stage_means(base_url)
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=_user, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+    loaded  = _stage_delta(m0, _scrape_stage_means(base_url))
+
+    def _pct(vals, p):
+        if not vals:
+            return None
+        return round(vals[min(len(vals) - 1, int(len(vals) * p))] * 1000, 2)
+
+    samples = [s for rec in results for s in rec]
+    by_path = {}
+    for path, lat, ok in samples:
+        by_path.setdefault(path, []).append((lat, ok))
+    report  = {"requests": len(samples), "elapsed_s": round(elapsed, 2),
+               "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0,
+               "error_rate": round(sum(1 for s in samples if not s[2]) / len(samples), 4) if samples else 0,
+               "endpoints": {}}
+    lats = sorted(s[1] for s in samples)
+    report["p50_ms"], report["p99_ms"] = _pct(lats, 0.50), _pct(lats, 0.99)
+    for path, rows in sorted(by_path.items()):
+        ls = sorted(r[0] for r in rows)
+        report["endpoints"][path] = {"requests": len(rows), "p50_ms": _pct(ls, 0.50),
+                                     "p99_ms": _pct(ls, 0.99),
+                                     "errors": sum(1 for r in rows if not r[1])}
+
+    # 스캔 스레드 영향: 단계별 평균 시간 (무부하 vs 부하)
+    scan = {}
+    for key, (mean, n) in loaded.items():
+        entry = {"loaded_ms": round(mean * 1000, 2), "samples": n}
+        if idle and key in idle:
+            entry["idle_ms"]  = round(idle[key][0] * 1000, 2)
+            entry["slowdown"] = f"{(mean / idle[key][0] - 1) * 100:+.1f}%" if idle[key][0] else None
+        scan["/".join(key)] = entry
+    report["scan_stages"] = scan
+    if not scan:
+        report["scan_note"] = "측정 구간 동안 스캔 활동 없음 – --duration 을 스캔 간격 이상으로 늘릴 것"
+    return report
 
 
 # ─────────────────────────────────────────────────────────
@@ -1020,7 +4969,7 @@ _TEMPLATE = """<!DOCTYPE html>
       마지막 갱신: <span id="lastUpdate">-</span>
       &nbsp;|&nbsp;<span id="periodInfo"></span>
     </div>
-    <button class="btn btn-refresh btn-sm mt-2" onclick="doRefresh()">🔄 새로고침</button>
+    <button class="btn btn-refresh btn-sm mt-2" id="btnRefresh" onclick="doRescan()">🔄 새로고침</button>
   </div>
 
   <!-- ─── 성남 뷰 ─── -->
@@ -1132,6 +5081,29 @@ function doRefresh() {
   else yn_refresh();
 }
 
+// 🔄: 현재 도시 즉시 재스캔 요청 → 결과가 공개되면 다시 그림 (실패 시 캐시만 다시 읽음)
+var _rescanTimer = null;
+function doRescan() {
+  var city = _city, btn = document.getElementById('btnRefresh');
+  fetch('/api/' + city + '/rescan', {method: 'POST'}).then(function(r){ return r.json(); }).then(function(res) {
+    if (!res.requested_at) { doRefresh(); return; }
+    btn.disabled = true; btn.textContent = '⏳ 재스캔 중…';
+    var deadline = Date.now() + 60000;
+    clearInterval(_rescanTimer);
+    _rescanTimer = setInterval(function() {
+      fetch('/api/' + city).then(function(r){ return r.json(); }).then(function(data) {
+        var rs = data.rescan || {};
+        var done = rs.finished && rs.finished >= res.requested_at && !rs.running && !rs.pending;
+        if (done || Date.now() > deadline) {
+          clearInterval(_rescanTimer);
+          btn.disabled = false; btn.textContent = '🔄 새로고침';
+          if (city === _city) doRefresh();
+        }
+      }).catch(function(){});
+    }, 1500);
+  }).catch(function(){ doRefresh(); });
+}
+
 // ══════════════════════════════════════════════════════════
 // 성남 렌더링
 // ══════════════════════════════════════════════════════════
@@ -1140,7 +5112,7 @@ function sn_refresh() {
     document.getElementById(id).innerHTML = '<div class="text-center"><div class="spinner-border"></div></div>';
   });
   fetch('/api/sungnam').then(function(r){ return r.json(); }).then(function(data) {
-    document.getElementById('lastUpdate').textContent = data.last_update || '-';
+    document.getElementById('lastUpdate').textContent = (data.last_update || '-') + (data.stale ? ' (이전 실행 스냅샷)' : '');
     document.getElementById('periodInfo').textContent = '오늘 ~ +3일';
     sn_renderInterest(data.available   || []);
     sn_renderAvail(data.all_courts     || []);
@@ -1287,8 +5259,10 @@ function yn_refresh() {
     if (el) el.innerHTML = '<div class="text-center"><div class="spinner-border"></div></div>';
   });
   fetch('/api/yongin').then(function(r){ return r.json(); }).then(function(data) {
-    document.getElementById('lastUpdate').textContent = data.last_update || '-';
-    document.getElementById('periodInfo').textContent = data.period || '';
+    document.getElementById('lastUpdate').textContent = (data.last_update || '-') + (data.stale ? ' (이전 실행 스냅샷)' : '');
+    var pg = data.progress || {};
+    document.getElementById('periodInfo').textContent = (data.period || '') +
+      (pg.running && pg.total ? ' | 스캔 중 ' + pg.done + '/' + pg.total : '');
     _yn_avail = data.available  || [];
     _yn_all   = data.all_courts || [];
     yn_renderInterest(_yn_avail);
@@ -1546,30 +5520,264 @@ fetch('/api/yongin').then(function(r){ return r.json(); }).then(function(data){
 # ─────────────────────────────────────────────────────────
 # Flask 라우트
 # ─────────────────────────────────────────────────────────
-@app.route("/")
-def index():
-    return _TEMPLATE
+def create_app():
+    """대시보드/API Flask 앱. Flask 는 여기서만 import (--once 같은 헤드리스 실행은 불러오지 않음)"""
+    from flask import Flask, Response, g, jsonify, request
+    app = Flask(__name__)
+
+    @app.before_request
+    def _req_start():
+        g.t_start = time.perf_counter()
+
+    @app.after_request
+    def _req_done(resp):
+        t0 = g.get("t_start")
+        if t0 is not None:
+            metrics.observe("tcm_http_request_seconds", time.perf_counter() - t0,
+                            endpoint=request.endpoint or "unknown", status=resp.status_code)
+        return resp
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        if _shared_reader is not None:
+            # 워커: 메인이 모든 워커·스캐너 메트릭을 합쳐 공유 스냅샷에 쓴 것 (어느 워커가 받아도 같은 값)
+            return Response(_shared_reader.read().get("metrics", b""), mimetype="text/plain; version=0.0.4")
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/debug/profile")
+    def debug_profile():
+        """?seconds=N (최대 60) 동안 전체 스레드 샘플링 → flamegraph 용 collapsed stacks"""
+        if not _debug_allowed(request):
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            seconds = float(request.args.get("seconds", 5))
+        except ValueError:
+            seconds = math.nan
+        if not math.isfinite(seconds):
+            return jsonify({"error": "seconds 는 숫자여야 합니다"}), 400
+        seconds = max(0.1, min(seconds, 60.0))
+        if not _profile_lock.acquire(blocking=False):
+            return jsonify({"error": "profile already running"}), 409
+        try:
+            counts = sample_stacks(seconds)
+        finally:
+            _profile_lock.release()
+        body = "\n".join(f"{k} {v}" for k, v in sorted(counts.items(), key=lambda kv: -kv[1]))
+        return Response(body + "\n", mimetype="text/plain")
+
+    @app.route("/debug/memory")
+    def debug_memory():
+        """첫 호출: tracemalloc 시작 / 이후: 상위 할당 + 직전 대비 diff / ?stop=1: 중지"""
+        if not _debug_allowed(request):
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            top = int(request.args.get("top", 20))
+        except ValueError:
+            top = 0
+        if top < 1:
+            return jsonify({"error": "top 은 1 이상의 정수여야 합니다"}), 400
+        return jsonify(memory_report(top=top, stop=request.args.get("stop") == "1"))
+
+    @app.route("/debug/accounts")
+    def debug_accounts():
+        """도시별 계정 사용 통계 (로그인 ID 포함이라 토큰 필요)"""
+        if not _debug_allowed(request):
+            return jsonify({"error": "forbidden"}), 403
+        if _shared_reader is not None:
+            return Response(_shared_reader.read().get("accounts", b"{}"), mimetype="application/json")
+        return jsonify({c: _accounts_payload(c) for c in ("sungnam", "yongin")})
+
+    @app.route("/")
+    def index():
+        return _TEMPLATE
+
+    @app.route("/api/sungnam")
+    def api_sungnam():
+        if _shared_reader is not None:
+            return Response(_shared_reader.read().get("sungnam", b"{}"), mimetype="application/json")
+        return jsonify(_sn_payload())
+
+    @app.route("/api/yongin")
+    def api_yongin():
+        if _shared_reader is not None:
+            return Response(_shared_reader.read().get("yongin", b"{}"), mimetype="application/json")
+        return jsonify(_yn_payload())
+
+    @app.route("/api/<city>/rescan", methods=["POST"])
+    def api_rescan(city):
+        """body(JSON) 또는 쿼리: targets=시설ID/resveId 목록, dates=YYYY-MM-DD 목록 (모두 선택)"""
+        if city not in ("sungnam", "yongin"):
+            return jsonify({"error": "unknown city"}), 404
+        body = request.get_json(silent=True) or {}
+        cmd  = {"op": "rescan", "city": city}
+        for key in ("targets", "dates"):
+            val = request.args.get(key) or body.get(key)
+            if isinstance(val, str):
+                val = [v.strip() for v in val.split(",") if v.strip()]
+            if val is not None and not (isinstance(val, list) and all(isinstance(v, str) for v in val)):
+                return jsonify({"error": f"{key} 는 문자열 목록이어야 합니다"}), 400
+            cmd[key] = val or None
+        for d in cmd["dates"] or []:
+            try:
+                datetime.strptime(d, "%Y-%m-%d")
+            except ValueError:
+                return jsonify({"error": f"날짜 형식 오류: {d} (YYYY-MM-DD)"}), 400
+        requested_at = datetime.now(KST).isoformat()
+        try:
+            result = dispatch_command(cmd)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (LookupError, OSError) as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify({"requested_at": requested_at, **result}), 202
+
+    @app.route("/api/watches", methods=["GET", "POST"])
+    def api_watches():
+        """GET: 목록, POST(JSON): {city, target, date, time?, interval?} 등록"""
+        if request.method == "GET":
+            if _hotwatch is not None:
+                return jsonify(_hotwatch.list())
+            try:   # HTTP 워커: 메인 프로세스가 저장한 파일 기준
+                with open(HOTWATCH_FILE, encoding="utf-8") as f:
+                    return jsonify({"watches": json.load(f)})
+            except (OSError, ValueError):
+                return jsonify({"watches": []})
+        body = request.get_json(silent=True) or {}
+        cmd  = {"op": "watch_add", **{k: body.get(k) for k in ("city", "target", "date", "time", "interval")}}
+        try:
+            return jsonify(dispatch_command(cmd)), 201
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (LookupError, OSError) as e:
+            return jsonify({"error": str(e)}), 503
+
+    @app.route("/api/watches/<wid>", methods=["DELETE"])
+    def api_watch_delete(wid):
+        try:
+            return jsonify(dispatch_command({"op": "watch_del", "id": wid}))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 404
+        except (LookupError, OSError) as e:
+            return jsonify({"error": str(e)}), 503
+
+    @app.route("/api/autohold")
+    def api_autohold():
+        """자동 예약 신청 기록 (최근 AUTOHOLD_HISTORY 건, 최신순)"""
+        # 신청은 스캔하는 프로세스가 하므로 파일 기준 (prefork/--scanner-procs 공통)
+        head, tail = os.path.split(AUTOHOLD_FILE)
+        stem       = tail.rsplit(".", 1)[0]
+        history    = []
+        for name in (os.listdir(head) if os.path.isdir(head) else []):
+            if name.startswith(stem) and name.endswith(".json"):
+                try:
+                    with open(os.path.join(head, name), encoding="utf-8") as f:
+                        history += json.load(f)
+                except (OSError, ValueError):
+                    pass
+        history.sort(key=lambda h: h["at"], reverse=True)
+        return jsonify({"history": history[:AUTOHOLD_HISTORY]})
+
+    @app.route("/api/analytics")
+    def api_analytics():
+        """취소 패턴 통계 + 대상별 추천 폴링 간격. ?city=sungnam|yongin"""
+        city = request.args.get("city") or None
+        if _shared_reader is not None:
+            # 워커: 메인이 공유 스냅샷에 쓴 전체 통계 (최대 1분 지연)를 도시로 거름
+            raw = _shared_reader.read().get("analytics")
+            if not raw:
+                return jsonify({"error": "analytics disabled"}), 503
+            data = json.loads(raw)
+            if city:
+                data = {"stats": [s for s in data["stats"] if s["city"] == city],
+                        "recommended_interval_s": {k: v for k, v in data["recommended_interval_s"].items()
+                                                   if k.startswith(city + "/")}}
+            return jsonify(data)
+        if _analytics is None:
+            return jsonify({"error": "analytics disabled"}), 503
+        return jsonify(_analytics_payload(city))
+
+    @app.route("/api/cluster")
+    def api_cluster():
+        if _cluster is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, "node": _cluster.node_id, "members": _cluster.members,
+                        "leader": _cluster.members[0], "is_leader": _cluster.is_leader})
+
+    return app
 
 
-@app.route("/api/sungnam")
-def api_sungnam():
-    with _lock:
-        return jsonify({
-            "available":   _sn_available,
-            "all_courts":  _sn_courts,
-            "last_update": _sn_last_update,
-        })
+# ─────────────────────────────────────────────────────────
+# 헤드리스 1회 실행 (--once, 결과를 stdout 에 NDJSON 으로)
+# ─────────────────────────────────────────────────────────
+def _upstream_requests(city):
+    return sum(v for (name, labels), v in metrics.snapshot()["series"].items()
+               if name == "tcm_upstream_requests_total" and ("city", city) in labels)
 
 
-@app.route("/api/yongin")
-def api_yongin():
-    with _lock:
-        return jsonify({
-            "available":   _yn_available,
-            "all_courts":  _yn_courts,
-            "last_update": _yn_last_update,
-            "period":      _yn_period,
-        })
+def run_once_cli(cities, out=None):
+    """도시별 1회차를 병렬로 실행하고 결과를 NDJSON 으로 출력 → 종료 코드.
+    (성남 시설·날짜 / 용인 코트) 하나가 끝날 때마다 {"event": "target"} 1줄, 도시마다 {"event": "summary"},
+    마지막에 {"event": "done"} (시간/CPU/메모리). 계정·설정이 없거나 로그인에 실패한 도시가 있으면 1"""
+    out   = out or sys.stdout
+    wlock = threading.Lock()
+    t0    = time.perf_counter()
+
+    def emit(doc):
+        line = json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+        with wlock:
+            out.write(line + "\n")
+            out.flush()
+
+    def run_city(city, ok):
+        t_city, first = time.perf_counter(), []
+
+        def target(doc):
+            elapsed = round(time.perf_counter() - t_city, 3)
+            first[:] = first or [elapsed]
+            emit({"event": "target", "city": city, **doc, "elapsed_s": elapsed})
+
+        try:
+            if city == "sungnam":
+                accounts   = sn_load_accounts()
+                facilities = sn_load_monitoring_table() or sn_load_notify_table()
+                if not accounts or not facilities:
+                    raise RuntimeError("auth.txt 계정 또는 MonitoringTable/NotifyTable 시설 없음")
+                names = {f["id"]: f["name"] for f in facilities}
+                res = sn_run_once(accounts, facilities, on_target_done=lambda fid, day, a, c: target(
+                    {"target": fid, "name": names[fid], "date": day, "available": a, "courts": c}))
+                if res is None:
+                    raise RuntimeError("로그인 가능한 계정 없음 (모두 실패/쿨다운)")
+                avail, courts = res
+                period = ""
+            else:
+                avail, courts, period = yn_run_once(on_court_done=lambda court, a, d, done, total: target(
+                    {"target": court["resve_id"], "name": court["name"], "location": court["location"],
+                     "done": done, "total": total, "available": a, "courts": d}))
+                if not period:
+                    raise RuntimeError("auth.txt 의 [yongin] 계정 또는 코트 목록 없음")
+        except Exception as e:
+            emit({"event": "error", "city": city, "error": str(e)})
+            return
+        ok.append(city)
+        emit({"event": "summary", "city": city, "available": len(avail), "slots": len(courts),
+              **({"period": period} if period else {}), "requests": _upstream_requests(city),
+              "first_result_s": first[0] if first else None,
+              "wall_s": round(time.perf_counter() - t_city, 3)})
+
+    ok      = []
+    threads = [threading.Thread(target=run_city, args=(c, ok), name=c) for c in cities]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if _autohold:
+        _autohold.drain()
+    usage = _rusage()
+    emit({"event": "done", "cities": cities, "ok": sorted(ok),
+          "wall_s": round(time.perf_counter() - t0, 3),
+          "cpu_s": round(usage["cpu_user"] + usage["cpu_sys"], 3), "max_rss_bytes": usage["rss"],
+          "flask_loaded": "flask" in sys.modules})
+    return 0 if len(ok) == len(cities) else 1
 
 
 # ─────────────────────────────────────────────────────────
@@ -1578,21 +5786,153 @@ def api_yongin():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="성남+용인 테니스 코트 통합 모니터링")
     parser.add_argument("--port", type=int, default=8000, help="Flask 포트 (기본: 8000)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="업스트림 요청/응답을 gzip NDJSON 으로 기록 (계정/쿠키 스크럽)")
+    parser.add_argument("--replay", metavar="FILE", help="기록된 archive 로 업스트림 대체")
+    parser.add_argument("--replay-timing", choices=["fast", "recorded"], default="fast",
+                        help="재생 속도: fast=즉시, recorded=기록된 지연 재현")
+    parser.add_argument("--serve-mode", choices=["dev", "prefork"], default="dev",
+                        help="dev=Flask 단일 서버, prefork=HTTP 워커 프로세스 N개 + 공유 스냅샷")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="prefork 워커 수 (기본: CPU 수)")
+    parser.add_argument("--scanner-procs", action="store_true",
+                        help="성남/용인 스캐너를 각각 별도 프로세스로 실행 (크래시 시 자동 재시작)")
+    parser.add_argument("--shard-node", metavar="NAME",
+                        help="샤딩 모드: 이 노드 이름. 같은 --cluster-db 를 쓰는 노드끼리 스캔 대상을 나눔")
+    parser.add_argument("--cluster-db", default=CLUSTER_DB, help=f"클러스터 SQLite 경로 (기본: {CLUSTER_DB})")
+    parser.add_argument("--auth-file", default=ROOT_AUTH_FILE, help="계정 파일 (노드별 계정 분리용)")
+    parser.add_argument("--cache-ttl", type=float, default=UPSTREAM_CACHE_TTL,
+                        help=f"업스트림 응답 캐시 TTL(초), 0 = 동시 요청 합치기만 (기본: {UPSTREAM_CACHE_TTL:g})")
+    parser.add_argument("--parse-procs", type=int, default=PARSE_PROCS,
+                        help=f"파싱 워커 프로세스 수, 0 = 스캔 스레드에서 직접 파싱 (기본: {PARSE_PROCS})")
+    parser.add_argument("--cycle-budget", type=float, default=CYCLE_BUDGET,
+                        help=f"회차 예산 = 주기 × 비율, 넘으면 먼 날짜는 다음 회차로 (기본: {CYCLE_BUDGET:g})")
+    parser.add_argument("--cycle-jitter", type=float, default=CYCLE_JITTER,
+                        help=f"회차 시작 시각 흔들기 ±주기 × 비율 (기본: {CYCLE_JITTER:g})")
+    parser.add_argument("--log-levels", default=LOG_LEVELS, metavar="COMP=LEVEL,...",
+                        help="구성요소별 로그 레벨, 예: 'SN=DEBUG,YN=DEBUG,TG=WARNING' (시설·코트별 로그는 DEBUG)")
+    parser.add_argument("--log-format", choices=["json", "text"], default=LOG_FORMAT,
+                        help=f"로그 파일 형식 (기본: {LOG_FORMAT})")
+    parser.add_argument("--watch", action="append", default=[], metavar="CITY:TARGET:DATE[:TIME]",
+                        help="핫 워치 등록 (반복 가능), 예: 'sungnam:FAC26:2026-10-20:19:00 ~ 20:50'")
+    parser.add_argument("--watch-budget", type=float, default=HOTWATCH_BUDGET,
+                        help=f"핫 워치 전체 초당 요청 수 상한 (기본: {HOTWATCH_BUDGET:g})")
+    parser.add_argument("--release-table", default=RELEASE_TABLE,
+                        help="예약 오픈 일정 파일 (성남 daily HH:MM / 용인 monthly D HH:MM)")
+    parser.add_argument("--release-prewarm", type=float, default=RELEASE_PREWARM,
+                        help=f"오픈 몇 초 전에 세션을 미리 로그인 (기본: {RELEASE_PREWARM:g})")
+    parser.add_argument("--release-window", type=float, default=RELEASE_WINDOW,
+                        help=f"오픈 후 집중 폴링 유지 시간(초) (기본: {RELEASE_WINDOW:g})")
+    parser.add_argument("--release-interval", type=float, default=RELEASE_INTERVAL,
+                        help=f"집중 폴링 라운드 간격(초) (기본: {RELEASE_INTERVAL:g})")
+    parser.add_argument("--auto-hold", action="store_true",
+                        help="AutoHoldTable.txt 규칙에 맞는 슬롯이 보이면 즉시 예약 신청 (기본: 꺼짐)")
+    parser.add_argument("--auto-hold-table", default=AUTOHOLD_TABLE, help="자동 예약 신청 규칙 파일")
+    parser.add_argument("--once", action="store_true",
+                        help="웹 서버 없이 1회차만 실행하고 결과를 stdout 에 NDJSON 으로 출력한 뒤 종료")
+    parser.add_argument("--city", choices=["sungnam", "yongin", "all"], default="all",
+                        help="--once 로 실행할 도시 (기본: all)")
+    parser.add_argument("--loadtest", metavar="URL",
+                        help="모니터를 띄우지 않고 URL 의 대시보드에 부하 테스트만 수행")
+    parser.add_argument("--concurrency", type=int, default=50, help="부하 테스트 동시 사용자 수")
+    parser.add_argument("--duration", type=float, default=30, help="부하 테스트 시간(초)")
+    parser.add_argument("--think", type=float, default=0.5, help="사용자별 평균 대기(초)")
+    parser.add_argument("--idle-window", type=float, default=30,
+                        help="부하 전 스캔 단계 시간 기준 측정(초), 0 = 생략")
     args = parser.parse_args()
-
-    setup_logging()
-    load_telegram_config()
+    exit_on_sigterm()
+    if args.shard_node and args.scanner_procs:
+        parser.error("--shard-node 는 --scanner-procs 와 함께 쓸 수 없습니다")
+    if not args.watch_budget > 0:
+        parser.error(f"--watch-budget 는 0 보다 커야 합니다 (받은 값: {args.watch_budget:g})")
+    ROOT_AUTH_FILE = args.auth_file
+    _upstream_cache.ttl = args.cache_ttl
+    _parse_exec.procs   = args.parse_procs
+    CYCLE_BUDGET, CYCLE_JITTER = args.cycle_budget, args.cycle_jitter
+    LOG_LEVELS, LOG_FORMAT     = args.log_levels, args.log_format
+    try:
+        parse_log_levels(LOG_LEVELS)
+    except ValueError as e:
+        parser.error(str(e))
+    RELEASE_TABLE, RELEASE_PREWARM = args.release_table, args.release_prewarm
+    RELEASE_WINDOW, RELEASE_INTERVAL = args.release_window, args.release_interval
+    AUTOHOLD_ENABLED, AUTOHOLD_TABLE = args.auto_hold, args.auto_hold_table
+
+    if args.loadtest:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        print(json.dumps(run_loadtest(args.loadtest, args.concurrency, args.duration,
+                                      args.think, args.idle_window),
+                         ensure_ascii=False, indent=2))
+        sys.exit(0)
+
+    if args.once:
+        if args.watch:
+            parser.error("--watch 는 --once 와 함께 쓸 수 없습니다 (핫 워치는 상시 실행에서만 동작)")
+        # Flask·스냅샷·알림·백그라운드 스레드 없이 스캔만. 로그는 stderr (stdout 은 NDJSON 전용)
+        logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    else:
+        setup_logging()
+        load_telegram_config()
+    if args.record:
+        _transport_adapter = TrafficRecorder(args.record)
+        logging.info(f"[REC] 업스트림 트래픽 기록: {args.record}")
+    elif args.replay:
+        _transport_adapter = ReplayAdapter(args.replay, args.replay_timing)
+        logging.info(f"[REC] 재생 모드: {args.replay} ({len(_transport_adapter.entries)}건, "
+                     f"{args.replay_timing})")
+    if args.once:
+        _start_autohold()
+        sys.exit(run_once_cli(["sungnam", "yongin"] if args.city == "all" else [args.city]))
+    _analytics = CancelAnalytics()
+    load_snapshot()
+    try:
+        _start_hotwatch(args.watch_budget, args.watch)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shard_node:
+        _cluster = ShardCluster(args.shard_node, args.cluster_db)
+        atexit.register(_cluster.leave)
+        metrics.set_gauge("tcm_cluster_members", lambda: len(_cluster.members))
+        metrics.set_gauge("tcm_cluster_leader", lambda: int(_cluster.is_leader))
+        for c in ("sungnam", "yongin"):
+            metrics.set_gauge("tcm_cluster_owned_targets", lambda c=c: _cluster.owned.get(c), city=c)
+        threading.Thread(target=_cluster_loop, daemon=True, name="cluster").start()
+        logging.info(f"[CLU] 샤드 노드 '{args.shard_node}' ({args.cluster_db}), 멤버: {_cluster.members}")
+    if args.serve_mode == "prefork" and not hasattr(socket, "SO_REUSEPORT"):
+        logging.warning("[SRV] SO_REUSEPORT 미지원 플랫폼 – dev 모드로 실행")
+        args.serve_mode = "dev"
+    if args.serve_mode == "prefork":
+        _shared_writer = SharedSnapshot(create=True)
+        _shared_dirty.set()
+        threading.Thread(target=_shared_writer_loop, daemon=True, name="shm-writer").start()
     logging.info("=" * 60)
     logging.info("🎾 테니스 코트 통합 모니터링 시작")
     logging.info(f"   성남 설정: {SUNGNAM_DIR}")
     logging.info(f"   용인 설정: {YONGIN_DIR}")
     logging.info("=" * 60)
 
-    # 백그라운드 모니터링 스레드 시작
-    t_sn = threading.Thread(target=sungnam_loop, daemon=True, name="sungnam")
-    t_yn = threading.Thread(target=yongin_loop,  daemon=True, name="yongin")
-    t_sn.start()
-    t_yn.start()
+    # 백그라운드 모니터링 시작 (스레드 또는 도시별 프로세스)
+    if args.scanner_procs:
+        opts = {"record": args.record, "replay": args.replay, "replay_timing": args.replay_timing,
+                "cache_ttl": args.cache_ttl, "parse_procs": args.parse_procs,
+                # spawn 자식은 모듈을 새로 import 하므로 명령행으로 바꾼 설정을 다시 적용
+                "settings": {k: globals()[k] for k in ("_T_START", "ROOT_AUTH_FILE", "RELEASE_TABLE",
+                                                       "RELEASE_PREWARM", "RELEASE_WINDOW", "RELEASE_INTERVAL",
+                                                       "AUTOHOLD_ENABLED", "AUTOHOLD_TABLE",
+                                                       "CYCLE_BUDGET", "CYCLE_JITTER", "LOG_LEVELS", "LOG_FORMAT")}}
+        threading.Thread(target=supervise_scanners, args=(["sungnam", "yongin"], opts),
+                         daemon=True, name="supervisor").start()
+    else:
+        _start_autohold()
+        t_sn = threading.Thread(target=sungnam_loop, daemon=True, name="sungnam")
+        t_yn = threading.Thread(target=yongin_loop,  daemon=True, name="yongin")
+        t_sn.start()
+        t_yn.start()
 
     logging.info(f"🌐 통합 웹 UI: http://localhost:{args.port}")
-    app.run(host="0.0.0.0", port=args.port, debug=False)
+    if args.serve_mode == "prefork":
+        logging.info(f"[SRV] prefork 워커 {args.workers}개 (공유 스냅샷: {SHARED_SNAPSHOT_FILE})")
+        serve_prefork(args.port, args.workers)
+    else:
+        app = create_app()
+        app.run(host="0.0.0.0", port=args.port, debug=False)